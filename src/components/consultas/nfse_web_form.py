@@ -2,11 +2,6 @@ import os
 import datetime
 import flet as ft
 
-try:
-    import tomllib
-except ImportError:
-    import tomli as tomllib
-
 from components.file_input import FileInput, FileType
 from components.load_profile_btn import LoadProfileBtn
 from components.empresas_editor_dialog import EmpresasEditorDialog
@@ -17,6 +12,8 @@ from components.toml_editor_dialog import (
 )
 
 from config.paths import PROFILE_PATH, EMPRESAS_NFSE_PATH
+from services.config_watcher import ConfigSnapshot, config_watcher
+from utils.ui_batch import batch_updates, request_update
 
 
 class NfseWebForm(ft.Column):
@@ -84,9 +81,9 @@ class NfseWebForm(ft.Column):
             title="Gerenciar Empresas",
         )
 
-        # Botão para abrir editor de empresas
-        btn_edit_empresas = ft.Button(
-            content=ft.Text("Empresas"),
+        # Botão para abrir editor de empresas (mostra quantas estão selecionadas)
+        self.btn_edit_empresas = ft.Button(
+            content=ft.Text(self._empresas_label()),
             icon=ft.Icons.BUSINESS,
             on_click=self.empresas_editor.open,
             width=150,
@@ -171,7 +168,7 @@ class NfseWebForm(ft.Column):
 
         # Linha 2: Usuário | Senha | Botão Empresas
         row2 = ft.Row(
-            [self.usuario_input, self.senha_input, btn_edit_empresas],
+            [self.usuario_input, self.senha_input, self.btn_edit_empresas],
             alignment=ft.MainAxisAlignment.CENTER,
             spacing=20,
         )
@@ -189,6 +186,13 @@ class NfseWebForm(ft.Column):
 
         self.controls.extend([row1, row2, row3])
 
+        # Credenciais carregadas por último (seção [nfse] do profile.toml)
+        self._loaded_nfse: dict | None = None
+
+        # Arquivos editados fora do app (ou salvos por outra instância)
+        config_watcher.subscribe(PROFILE_PATH, self._on_profile_changed)
+        config_watcher.subscribe(EMPRESAS_NFSE_PATH, self._on_empresas_changed)
+
     def get_values(self):
         """
         Retorna os valores dos campos.
@@ -205,31 +209,50 @@ class NfseWebForm(ft.Column):
 
     def _load_profile(self, e):
         """Carrega o perfil de credenciais do arquivo profile.toml"""
-        try:
-            # Lê o arquivo TOML
-            with open(PROFILE_PATH, "rb") as f:
-                profile_data = tomllib.load(f)
+        snapshot = config_watcher.snapshot(PROFILE_PATH)
+        if snapshot.error:
+            print(f"Erro ao carregar perfil: {snapshot.error}")
+            return
+        if snapshot.size < 0:
+            print(f"Arquivo profile.toml não encontrado em: {PROFILE_PATH}")
+            return
 
-            # Obtém os dados da seção [nfse]
-            nfse_data = profile_data.get("nfse", {})
+        self._fill_credentials(snapshot.data.get("nfse", {}))
+        print("Perfil carregado com sucesso!")
 
-            # Preenche os campos do formulário
+    def _fill_credentials(self, nfse_data: dict):
+        """Preenche os campos e envia tudo em uma única atualização."""
+        self._loaded_nfse = dict(nfse_data)
+        with batch_updates(self._page):
             self.usuario_input.value = nfse_data.get("usuario", "")
             self.senha_input.value = nfse_data.get("senha", "")
             self.download_folder_input.value = nfse_data.get("pasta_relatorio", "")
+            request_update(self)
+
+    def _on_profile_changed(self, snapshot: ConfigSnapshot):
+        """Credenciais alteradas no arquivo: atualiza os campos se não foram editados."""
+        loaded = self._loaded_nfse
+        if loaded is None:
+            return
+        untouched = (
+            (self.usuario_input.value or "") == loaded.get("usuario", "")
+            and (self.senha_input.value or "") == loaded.get("senha", "")
+            and (self.download_folder_input.value or "") == loaded.get("pasta_relatorio", "")
+        )
+        if untouched:
+            self._fill_credentials(snapshot.data.get("nfse", {}))
 
-            # Atualiza a interface
-            self.usuario_input.update()
-            self.senha_input.update()
-            self.download_folder_input.update()
-            self.update()
-
-            print("Perfil carregado com sucesso!")
+    def _empresas_label(self) -> str:
+        count = len(self.empresas_editor.get_selected_cnpj_cpf())
+        return f"Empresas ({count})"
 
-        except FileNotFoundError:
-            print(f"Arquivo profile.toml não encontrado em: {PROFILE_PATH}")
-        except Exception as ex:
-            print(f"Erro ao carregar perfil: {ex}")
+    def _on_empresas_changed(self, snapshot: ConfigSnapshot):
+        """Lista de empresas alterada: atualiza a contagem no botão."""
+        self.btn_edit_empresas.content.value = self._empresas_label()
+        try:
+            self.btn_edit_empresas.update()
+        except RuntimeError:
+            pass
 
     def _set_field_error(self, field: ft.TextField, has_error: bool):
         """Define borda vermelha em campos inválidos."""
@@ -237,7 +260,7 @@ class NfseWebForm(ft.Column):
             field.border_color = ft.Colors.RED
         else:
             field.border_color = None
-        field.update()
+        request_update(field)
 
     def validate_inputs(self) -> tuple[bool, str | None]:
         """
@@ -246,6 +269,12 @@ class NfseWebForm(ft.Column):
         Retorna (False, mensagem_erro) caso contrário.
         Campos inválidos ficam com borda vermelha.
         """
+        # Um único update para todas as bordas alteradas
+        with batch_updates(self._page):
+            return self._validate_fields()
+
+    def _validate_fields(self) -> tuple[bool, str | None]:
+        """Valida os campos e marca os inválidos (ver validate_inputs)."""
         errors = []
 
         # Validação Usuário (não vazio)
@@ -1,10 +1,7 @@
 import flet as ft
+import asyncio
 import re
-
-try:
-    import tomllib
-except ImportError:
-    import tomli as tomllib
+from typing import Callable
 
 from components.file_input import FileInput, FileType
 from components.toml_editor_dialog import (
@@ -13,16 +10,30 @@ from components.toml_editor_dialog import (
     FieldConfig,
 )
 from config.paths import EMPRESAS_NFE_PATH
+from services.config_watcher import ConfigSnapshot, config_watcher
+from services.nfe_consulta import nsu_sync_available
+from services.nfe_job import MODE_NSU, MODE_SHEET
+from services.nfe_worker import worker_available
+from services.nsu_store import NsuStore
+from services.planilha_cache import load_sheet_keys, SheetParseError
+from services.profile_index import ProfileEntry, ProfileIndex, load_profile_index
+from utils.ui_batch import batch_updates, request_update
+
+# Seletor de perfis: altura de cada item e quantos são desenhados por vez
+_PROFILE_TILE_HEIGHT = 56
+_PROFILE_PAGE_SIZE = 50
 
 
 class PlanilhaForm(ft.Column):
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, on_change: Callable[[], None] | None = None):
         """
         Formulário principal.
         Recebe 'page' para permitir que os FileInputs abram janelas nativas.
+        on_change é chamado quando o CNPJ/CPF ou a planilha mudam.
         """
         super().__init__()
         self._page = page
+        self._on_change = on_change
         self.spacing = 30
         self.alignment = ft.MainAxisAlignment.CENTER
 
@@ -69,7 +80,10 @@ class PlanilhaForm(ft.Column):
 
         # --- Campos de Entrada Simples ---
         self.cnpj_cpf_input = ft.TextField(
-            label="CNPJ/CPF", hint_text="Digite o CNPJ ou CPF", width=300
+            label="CNPJ/CPF",
+            hint_text="Digite o CNPJ ou CPF",
+            width=300,
+            on_blur=lambda e: self._notify_change(),
         )
 
         self.password_input = ft.TextField(
@@ -93,6 +107,37 @@ class PlanilhaForm(ft.Column):
             self._page, label="Planilha de Relação", icon=ft.Icons.TABLE_CHART
         )
         self.sheet_input.width = 300
+        self.sheet_input.text_field.on_blur = lambda e: self._schedule_sheet_preview()
+
+        # Prévia da planilha (quantidade de chaves, lida do cache)
+        self.sheet_info = ft.Text("", size=12, color=ft.Colors.GREY_400)
+
+        # Modo diferencial: baixa apenas chaves que ainda não estão na pasta
+        self.only_missing_checkbox = ft.Checkbox(
+            label="Somente faltantes",
+            value=False,
+            tooltip="Baixa apenas as chaves que ainda não estão na pasta de XMLs",
+        )
+
+        # Executa o ClientNfe em um processo separado, mantendo a janela responsiva.
+        # Indisponível no app do `flet build`, que não inicia processos filhos
+        self.isolated_process_checkbox = ft.Checkbox(
+            label="Processo isolado",
+            value=False,
+            visible=worker_available(),
+            tooltip="Executa a consulta em um processo separado da interface",
+        )
+
+        # Sincronização por NSU: baixa só o que chegou desde a última execução.
+        # Oculta quando a versão do auto_nfe não tem consulta_nsu
+        self.nsu_checkbox = ft.Checkbox(
+            label="Sincronizar por NSU",
+            value=False,
+            visible=nsu_sync_available(),
+            tooltip="Baixa os documentos novos desde a última sincronização, sem planilha",
+            on_change=lambda e: self._on_mode_changed(),
+        )
+        self.nsu_info = ft.Text("", size=12, color=ft.Colors.GREY_400, visible=False)
 
         # 3. Pasta de Destino
         self.folder_input = FileInput(
@@ -125,22 +170,43 @@ class PlanilhaForm(ft.Column):
             spacing=20,
         )
 
-        self.controls.extend([row0, row1, row2])
+        # Linha 3: Opções | Prévia da planilha
+        row3 = ft.Row(
+            [
+                self.only_missing_checkbox,
+                self.isolated_process_checkbox,
+                self.nsu_checkbox,
+                self.sheet_info,
+                self.nsu_info,
+            ],
+            alignment=ft.MainAxisAlignment.CENTER,
+            spacing=20,
+        )
 
-    def _get_profiles(self) -> list[dict]:
-        """Carrega lista de perfis do arquivo TOML."""
-        try:
-            with open(EMPRESAS_NFE_PATH, "rb") as f:
-                data = tomllib.load(f)
-            return data.get("empresas", [])
-        except Exception:
-            return []
+        self.controls.extend([row0, row1, row2, row3])
+
+        self._nsu_store = NsuStore()
+
+        # Perfil carregado por último (usado para identificar a execução no histórico)
+        self._loaded_profile: dict | None = None
+
+        # Quantidade de chaves da planilha selecionada (None = não lida)
+        self.sheet_key_count: int | None = None
+
+        # Estado do seletor de perfis
+        self._profile_index = ProfileIndex([])
+        self._profile_results: list[ProfileEntry] = []
+        self._profile_shown = 0
+        self._profile_search: ft.TextField | None = None
+
+        # Perfis editados fora do app: atualiza o seletor aberto
+        config_watcher.subscribe(EMPRESAS_NFE_PATH, self._on_profiles_changed)
 
     def _show_profile_selector(self, e):
-        """Exibe diálogo para selecionar perfil."""
-        profiles = self._get_profiles()
+        """Exibe diálogo para selecionar perfil, com busca por nome ou CNPJ/CPF."""
+        self._profile_index = load_profile_index(EMPRESAS_NFE_PATH)
 
-        if not profiles:
+        if not len(self._profile_index):
             self._page.snack_bar = ft.SnackBar(
                 ft.Text("Nenhum perfil encontrado. Clique em 'Editar Perfis' para criar.")
             )
@@ -148,55 +214,179 @@ class PlanilhaForm(ft.Column):
             self._page.update()
             return
 
-        # Cria lista de opções
-        options = []
-        for i, profile in enumerate(profiles):
-            nome = profile.get("nome", f"Perfil {i+1}")
-            cnpj = profile.get("cnpj_cpf", "")
-            options.append(
-                ft.ListTile(
-                    leading=ft.Icon(ft.Icons.BUSINESS),
-                    title=ft.Text(nome),
-                    subtitle=ft.Text(cnpj),
-                    on_click=lambda ev, idx=i: self._load_profile(idx),
-                )
-            )
+        self._profile_search = search_input = ft.TextField(
+            hint_text="Buscar por nome ou CNPJ/CPF",
+            prefix_icon=ft.Icons.SEARCH,
+            autofocus=True,
+            on_change=lambda ev: self._filter_profiles(ev.control.value),
+            on_submit=lambda ev: self._load_first_result(),
+        )
+        self._profile_count = ft.Text("", size=12, color=ft.Colors.GREY_400)
+        # ListView com altura fixa por item: só as linhas visíveis são desenhadas
+        self._profile_list = ft.ListView(item_extent=_PROFILE_TILE_HEIGHT, expand=True)
+        self._filter_profiles("", update=False)
 
         # Diálogo de seleção
         dlg = ft.AlertDialog(
             title=ft.Text("Selecionar Perfil"),
             content=ft.Container(
-                content=ft.Column(options, scroll=ft.ScrollMode.AUTO),
+                content=ft.Column(
+                    [search_input, self._profile_count, self._profile_list],
+                    spacing=5,
+                ),
                 width=400,
-                height=300,
+                height=360,
             ),
             actions=[ft.TextButton("Cancelar", on_click=lambda e: self._page.pop_dialog())],
         )
         self._page.show_dialog(dlg)
 
-    def _load_profile(self, index: int):
-        """Carrega os dados de um perfil específico nos campos."""
-        self._page.pop_dialog()
+    def _on_profiles_changed(self, snapshot: ConfigSnapshot):
+        """Reindexa os perfis e refaz a busca do seletor com o mesmo texto."""
+        self._profile_index = load_profile_index(EMPRESAS_NFE_PATH)
+        if self._profile_search is not None:
+            self._filter_profiles(self._profile_search.value or "")
+
+    def _filter_profiles(self, query: str, update: bool = True):
+        """Filtra os perfis pelo texto digitado (busca no índice em memória)."""
+        self._profile_results = self._profile_index.search(query)
+        self._profile_shown = 0
+        self._profile_list.controls = []
+        self._show_more_profiles(update=False)
+
+        total = len(self._profile_index)
+        found = len(self._profile_results)
+        self._profile_count.value = (
+            f"{total} perfis" if found == total else f"{found} de {total} perfis"
+        )
+        if update:
+            try:
+                self._profile_count.update()
+                self._profile_list.update()
+            except RuntimeError:
+                pass
 
-        profiles = self._get_profiles()
-        if 0 <= index < len(profiles):
-            profile = profiles[index]
+    def _show_more_profiles(self, update: bool = True):
+        """Desenha a próxima página de resultados."""
+        controls = self._profile_list.controls
+        if controls and controls[-1].data == "mais":
+            controls.pop()
 
-            # Preenche os campos
-            self.cnpj_cpf_input.value = profile.get("cnpj_cpf", "")
-            self.cert_input.value = profile.get("caminho_certificado", "")
-            self.password_input.value = profile.get("senha", "")
-            self.sheet_input.value = profile.get("caminho_relacao", "")
-            self.folder_input.value = profile.get("pasta_xml", "")
+        page_end = self._profile_shown + _PROFILE_PAGE_SIZE
+        for entry in self._profile_results[self._profile_shown : page_end]:
+            controls.append(
+                ft.ListTile(
+                    leading=ft.Icon(ft.Icons.BUSINESS),
+                    title=ft.Text(entry.name),
+                    subtitle=ft.Text(entry.cnpj_cpf),
+                    on_click=lambda ev, pid=entry.id: self._load_profile(pid),
+                )
+            )
+        self._profile_shown = min(page_end, len(self._profile_results))
 
-            # Atualiza a interface
+        remaining = len(self._profile_results) - self._profile_shown
+        if remaining > 0:
+            controls.append(
+                ft.ListTile(
+                    leading=ft.Icon(ft.Icons.EXPAND_MORE),
+                    title=ft.Text(f"Mostrar mais ({remaining} restantes)"),
+                    on_click=lambda ev: self._show_more_profiles(),
+                    data="mais",
+                )
+            )
+
+        if update:
             try:
-                self.cnpj_cpf_input.update()
-                self.password_input.update()
-                self.update()
+                self._profile_list.update()
             except RuntimeError:
                 pass
 
+    def _load_first_result(self):
+        """Enter na busca carrega o melhor resultado."""
+        if self._profile_results:
+            self._load_profile(self._profile_results[0].id)
+
+    def _load_profile(self, profile_id: str):
+        """Carrega os dados de um perfil (pelo ID estável do índice) nos campos."""
+        self._page.pop_dialog()
+
+        entry = self._profile_index.get(profile_id)
+        if entry is not None:
+            profile = entry.data
+            self._loaded_profile = profile
+
+            # Preenche os campos e envia tudo em uma única atualização
+            with batch_updates(self._page):
+                self.cnpj_cpf_input.value = profile.get("cnpj_cpf", "")
+                self.cert_input.value = profile.get("caminho_certificado", "")
+                self.password_input.value = profile.get("senha", "")
+                self.sheet_input.value = profile.get("caminho_relacao", "")
+                self.folder_input.value = profile.get("pasta_xml", "")
+                request_update(self)
+
+            self._schedule_sheet_preview()
+
+    def _schedule_sheet_preview(self):
+        """Agenda a atualização da prévia da planilha sem bloquear a UI."""
+        self._page.run_task(self._preview_sheet)
+
+    async def _preview_sheet(self):
+        """Exibe a quantidade de chaves da planilha selecionada."""
+        sheet_path = (self.sheet_input.value or "").strip()
+        self.sheet_key_count = None
+        if not sheet_path:
+            self.sheet_info.value = ""
+        else:
+            try:
+                keys = await asyncio.to_thread(load_sheet_keys, sheet_path)
+                self.sheet_key_count = len(keys)
+                self.sheet_info.value = f"{len(keys)} chaves na planilha"
+                self.sheet_info.color = ft.Colors.GREY_400
+            except SheetParseError as ex:
+                self.sheet_info.value = str(ex)
+                self.sheet_info.color = ft.Colors.ORANGE
+
+        try:
+            self.sheet_info.update()
+        except RuntimeError:
+            pass
+        self._notify_change()
+
+    def _notify_change(self):
+        self.refresh_nsu_state()
+        if self._on_change is not None:
+            self._on_change()
+
+    def _on_mode_changed(self):
+        """Alterna entre consulta por planilha e sincronização por NSU."""
+        nsu_mode = bool(self.nsu_checkbox.value)
+        with batch_updates(self._page):
+            self.sheet_input.disabled = nsu_mode
+            self.only_missing_checkbox.disabled = nsu_mode
+            self.sheet_info.visible = not nsu_mode
+            self.nsu_info.visible = nsu_mode
+            request_update(self)
+        self._notify_change()
+
+    def refresh_nsu_state(self):
+        """Agenda a atualização do último NSU exibido (modo NSU)."""
+        if self.nsu_checkbox.value:
+            self._page.run_task(self._show_nsu_state)
+
+    async def _show_nsu_state(self):
+        """Exibe o último NSU sincronizado do CNPJ/CPF informado."""
+        cnpj_cpf = self._clean_cnpj_cpf(self.cnpj_cpf_input.value)
+        if len(cnpj_cpf) not in (11, 14):
+            self.nsu_info.value = "Informe o CNPJ/CPF"
+        else:
+            state = await asyncio.to_thread(self._nsu_store.get, cnpj_cpf)
+            self.nsu_info.value = state.summary()
+
+        try:
+            self.nsu_info.update()
+        except RuntimeError:
+            pass
+
     def _clean_cnpj_cpf(self, value: str) -> str:
         """Remove caracteres não numéricos do CNPJ/CPF."""
         return re.sub(r"\D", "", value or "")
@@ -207,10 +397,7 @@ class PlanilhaForm(ft.Column):
             field.border_color = ft.Colors.RED_400
         else:
             field.border_color = None  # Volta ao padrão
-        try:
-            field.update()
-        except RuntimeError:
-            pass
+        request_update(field)
 
     def validate_inputs(self) -> tuple[bool, str | None]:
         """
@@ -219,6 +406,12 @@ class PlanilhaForm(ft.Column):
         Retorna (False, mensagem_erro) caso contrário.
         Campos inválidos ficam com borda vermelha.
         """
+        # Um único update para todas as bordas alteradas
+        with batch_updates(self._page):
+            return self._validate_fields()
+
+    def _validate_fields(self) -> tuple[bool, str | None]:
+        """Valida os campos e marca os inválidos (ver validate_inputs)."""
         errors = []
 
         # Validação CNPJ/CPF
@@ -240,8 +433,11 @@ class PlanilhaForm(ft.Column):
         if not password_valid:
             errors.append("Senha é obrigatória")
 
-        # Validação Planilha (não vazia)
-        sheet_valid = bool(self.sheet_input.value and self.sheet_input.value.strip())
+        # Validação Planilha (não vazia; dispensada na sincronização por NSU)
+        sheet_valid = bool(
+            self.nsu_checkbox.value
+            or (self.sheet_input.value and self.sheet_input.value.strip())
+        )
         self._set_field_error(self.sheet_input.text_field, not sheet_valid)
         if not sheet_valid:
             errors.append("Planilha é obrigatória")
@@ -261,12 +457,26 @@ class PlanilhaForm(ft.Column):
         Retorna os valores dos campos.
         Nota: O FileInput possui uma propriedade .value que retorna o texto interno.
         O CNPJ/CPF é retornado apenas com dígitos.
+        O nome do perfil é o do último perfil carregado, se o CNPJ/CPF não mudou.
         """
+        cnpj_cpf = self._clean_cnpj_cpf(self.cnpj_cpf_input.value)
+        profile_name = cnpj_cpf
+        if self._loaded_profile and cnpj_cpf == self._clean_cnpj_cpf(
+            self._loaded_profile.get("cnpj_cpf", "")
+        ):
+            profile_name = self._loaded_profile.get("nome") or cnpj_cpf
+
         return {
-            "cnpj_cpf": self._clean_cnpj_cpf(self.cnpj_cpf_input.value),
+            "mode": MODE_NSU if self.nsu_checkbox.value else MODE_SHEET,
+            "cnpj_cpf": cnpj_cpf,
+            "profile_name": profile_name,
             "cert_path": self.cert_input.value,
             "password": self.password_input.value,
             "sheet_path": self.sheet_input.value,
             "folder_path": self.folder_input.value,
+            "only_missing": bool(self.only_missing_checkbox.value)
+            and not self.nsu_checkbox.value,
+            "isolated_process": bool(self.isolated_process_checkbox.value)
+            and self.isolated_process_checkbox.visible,
         }
 
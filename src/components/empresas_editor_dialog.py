@@ -2,12 +2,11 @@
 Componente de diálogo para edição de lista de empresas armazenada em TOML.
 """
 
+import copy
+
 import flet as ft
 
-try:
-    import tomllib
-except ImportError:
-    import tomli as tomllib
+from services.config_watcher import ConfigSnapshot, config_watcher
 
 try:
     import tomli_w
@@ -41,6 +40,8 @@ class EmpresasEditorDialog:
         self._file_path = file_path
         self._root_key = root_key
         self._data: list[dict] = []
+        self._opened_data: list[dict] = []  # Dados ao abrir (detecta edições)
+        self._is_open = False
 
         # Container para os rows da lista de empresas
         self._list = ft.Column(
@@ -80,6 +81,9 @@ class EmpresasEditorDialog:
             ],
         )
 
+        # Mudanças no arquivo feitas fora do diálogo
+        config_watcher.subscribe(self._file_path, self._on_file_changed)
+
     @property
     def dialog(self) -> ft.AlertDialog:
         """Retorna o AlertDialog para uso externo se necessário."""
@@ -88,32 +92,34 @@ class EmpresasEditorDialog:
     def open(self, e=None):
         """Abre o diálogo e carrega dados do TOML."""
         self._load_data()
+        self._is_open = True
         self._refresh_list()
         self._page.show_dialog(self._dialog)
 
     def get_selected_cnpj_cpf(self) -> list[str]:
-        """Retorna lista de CNPJ/CPF onde selecionada=True."""
-        self._load_data()
+        """Retorna lista de CNPJ/CPF onde selecionada=True (do snapshot atual)."""
+        empresas = config_watcher.snapshot(self._file_path).data.get(self._root_key, [])
         return [
             emp.get("cnpj_cpf", "")
-            for emp in self._data
+            for emp in empresas
             if emp.get("selecionada", False)
         ]
 
     def _load_data(self):
-        """Carrega dados do arquivo TOML."""
-        try:
-            with open(self._file_path, "rb") as f:
-                data = tomllib.load(f)
-            self._data = data.get(self._root_key, [])
-        except FileNotFoundError:
-            self._data = []
-        except Exception as ex:
-            print(f"Erro ao ler {self._file_path}: {ex}")
-            self._data = []
+        """Carrega uma cópia editável dos dados do arquivo TOML."""
+        snapshot = config_watcher.snapshot(self._file_path)
+        self._data = snapshot.copy_data().get(self._root_key, [])
+        self._opened_data = copy.deepcopy(self._data)
+
+    def _on_file_changed(self, snapshot: ConfigSnapshot):
+        """Arquivo alterado fora do diálogo: recarrega se não houver edições."""
+        if self._is_open and self._data == self._opened_data:
+            self._load_data()
+            self._refresh_list()
 
     def _save(self, e):
         """Salva dados no arquivo TOML."""
+        self._is_open = False
         if tomli_w is None:
             print("Erro: tomli_w não está instalado. Execute: pip install tomli-w")
             self._page.pop_dialog()
@@ -126,10 +132,13 @@ class EmpresasEditorDialog:
         except Exception as ex:
             print(f"Erro ao salvar {self._file_path}: {ex}")
 
+        # Atualiza o snapshot na hora e avisa os formulários inscritos
+        config_watcher.refresh(self._file_path)
         self._page.pop_dialog()
 
     def _close(self, e):
         """Fecha o diálogo sem salvar."""
+        self._is_open = False
         self._page.pop_dialog()
 
     def _add_row(self, e):
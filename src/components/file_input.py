@@ -2,6 +2,8 @@ import flet as ft
 from typing import List
 from enum import Enum
 
+from utils.ui_batch import request_update
+
 
 class FileType(Enum):
     FILE = "file"
@@ -98,8 +100,5 @@ class FileInput(ft.Row):
     def value(self, new_value: str):
         """Atalho para settar o valor do texto de fora"""
         self.text_field.value = new_value
-        try:
-            self.text_field.update()
-        except RuntimeError:
-            # Warn
-            print("FileInput: Adicione o controle à pagina antes de settar o value")
+        # Dentro de batch_updates, entra no update único do lote
+        request_update(self.text_field)
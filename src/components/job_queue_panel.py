@@ -0,0 +1,197 @@
+"""
+Painel da fila de downloads.
+
+Lista os jobs de um tipo com progresso individual, permite reordenar os
+pendentes, cancelar qualquer job e ajustar quantos rodam ao mesmo tempo.
+"""
+
+import flet as ft
+
+from services.job_queue import Job, JobEvent, JobQueue, JobState
+
+_STATE_COLORS = {
+    JobState.PENDING: ft.Colors.GREY_400,
+    JobState.RUNNING: ft.Colors.BLUE_300,
+    JobState.SUCCESS: ft.Colors.GREEN,
+    JobState.ERROR: ft.Colors.RED,
+    JobState.CANCELLED: ft.Colors.ORANGE,
+}
+
+
+class _JobRow(ft.Container):
+    """Linha de um job no painel."""
+
+    def __init__(self, queue: JobQueue, job: Job):
+        super().__init__(
+            bgcolor=ft.Colors.SURFACE_CONTAINER_HIGH,
+            border_radius=8,
+            padding=ft.Padding(left=10, right=5, top=5, bottom=5),
+        )
+        self._queue = queue
+        self.job = job
+
+        self._label = ft.Text(job.label, weight=ft.FontWeight.W_500, no_wrap=True)
+        self._status = ft.Text("", size=12, no_wrap=True)
+        self._bar = ft.ProgressBar(value=0, width=260)
+
+        self._btn_up = ft.IconButton(
+            icon=ft.Icons.ARROW_UPWARD,
+            tooltip="Mover para cima",
+            icon_size=18,
+            on_click=lambda e: self._queue.move(self.job.id, -1),
+        )
+        self._btn_down = ft.IconButton(
+            icon=ft.Icons.ARROW_DOWNWARD,
+            tooltip="Mover para baixo",
+            icon_size=18,
+            on_click=lambda e: self._queue.move(self.job.id, 1),
+        )
+        self._btn_cancel = ft.IconButton(
+            icon=ft.Icons.CLOSE,
+            icon_color=ft.Colors.RED_400,
+            tooltip="Cancelar",
+            icon_size=18,
+            on_click=lambda e: self._queue.cancel(self.job.id),
+        )
+
+        self.content = ft.Row(
+            [
+                ft.Column(
+                    [self._label, self._status, self._bar],
+                    spacing=2,
+                    expand=True,
+                ),
+                self._btn_up,
+                self._btn_down,
+                self._btn_cancel,
+            ],
+            vertical_alignment=ft.CrossAxisAlignment.CENTER,
+        )
+        self.refresh(update=False)
+
+    def refresh(self, update: bool = True):
+        """Atualiza a linha com o estado atual do job."""
+        job = self.job
+        self._status.value = job.message or job.state.value
+        self._status.color = (
+            ft.Colors.ORANGE if job.waiting else _STATE_COLORS.get(job.state)
+        )
+
+        if job.state == JobState.RUNNING:
+            self._bar.value = job.progress  # None = indeterminado
+        elif job.state == JobState.SUCCESS:
+            self._bar.value = 1.0
+        else:
+            self._bar.value = job.progress or 0
+
+        is_pending = job.state == JobState.PENDING
+        self._btn_up.visible = is_pending
+        self._btn_down.visible = is_pending
+        self._btn_cancel.visible = not job.finished
+
+        if update:
+            self.update()
+
+
+class JobQueuePanel(ft.Container):
+    """
+    Painel com a fila de jobs de um tipo (NF-e ou NFS-e).
+
+    Atualiza apenas a linha do job que mudou; a lista só é recriada quando
+    a ordem ou o conjunto de jobs muda.
+    """
+
+    def __init__(self, queue: JobQueue, kind: str, title: str = "Fila de downloads"):
+        """
+        Args:
+            queue: Fila de jobs do app.
+            kind: Tipo de job exibido no painel.
+            title: Título do painel.
+        """
+        super().__init__(
+            width=640,
+            padding=10,
+            border=ft.border.all(1, ft.Colors.OUTLINE),
+            border_radius=8,
+        )
+        self._queue = queue
+        self._kind = kind
+        self._rows: dict[int, _JobRow] = {}
+
+        self._parallelism_text = ft.Text("")
+        self._list = ft.Column(spacing=4, scroll=ft.ScrollMode.AUTO, height=200)
+        self._empty_text = ft.Text("Nenhum download na fila", color=ft.Colors.GREY_500)
+
+        header = ft.Row(
+            [
+                ft.Text(title, size=16, weight=ft.FontWeight.W_500),
+                ft.Container(expand=True),
+                ft.IconButton(
+                    icon=ft.Icons.REMOVE,
+                    tooltip="Menos downloads simultâneos",
+                    on_click=lambda e: self._change_parallelism(-1),
+                ),
+                self._parallelism_text,
+                ft.IconButton(
+                    icon=ft.Icons.ADD,
+                    tooltip="Mais downloads simultâneos",
+                    on_click=lambda e: self._change_parallelism(1),
+                ),
+                ft.TextButton(
+                    content=ft.Text("Limpar finalizados"),
+                    on_click=lambda e: self._queue.remove_finished(),
+                ),
+            ],
+            vertical_alignment=ft.CrossAxisAlignment.CENTER,
+        )
+
+        self.content = ft.Column([header, self._empty_text, self._list], spacing=5)
+
+        self._rebuild(update=False)
+        self._unsubscribe = self._queue.subscribe(self._on_job_event)
+
+    def will_unmount(self):
+        # Painel saiu da página: para de ouvir a fila
+        self._unsubscribe()
+
+    def _change_parallelism(self, delta: int):
+        """Altera o número de downloads simultâneos."""
+        self._queue.set_parallelism(self._queue.parallelism + delta)
+        self._parallelism_text.value = f"Simultâneos: {self._queue.parallelism}"
+        self._parallelism_text.update()
+
+    def _rebuild(self, update: bool = True):
+        """Recria a lista na ordem atual da fila."""
+        jobs = self._queue.jobs(self._kind)
+        self._rows = {
+            job.id: self._rows.get(job.id) or _JobRow(self._queue, job) for job in jobs
+        }
+        for row in self._rows.values():
+            row.refresh(update=False)
+
+        self._list.controls = list(self._rows.values())
+        self._list.visible = bool(jobs)
+        self._empty_text.visible = not jobs
+        self._parallelism_text.value = f"Simultâneos: {self._queue.parallelism}"
+
+        if update:
+            self.update()
+
+    def _on_job_event(self, job: Job, event: JobEvent, message: str | None):
+        """Recebe eventos da fila e atualiza somente o necessário."""
+        if job.kind != self._kind or event in (
+            JobEvent.INFO,
+            JobEvent.WARNING,
+            JobEvent.DETAIL,
+        ):
+            return
+
+        try:
+            order = [j.id for j in self._queue.jobs(self._kind)]
+            if event == JobEvent.UPDATE and order == list(self._rows):
+                self._rows[job.id].refresh()
+            else:
+                self._rebuild()
+        except RuntimeError:
+            # Painel saiu da página (troca de rota): para de ouvir a fila
+            self._unsubscribe()
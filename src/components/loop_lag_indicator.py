@@ -0,0 +1,38 @@
+"""
+Indicador discreto do lag do event loop (canto inferior esquerdo).
+"""
+
+import asyncio
+import flet as ft
+
+from utils.loop_monitor import LoopLagMonitor
+
+
+class LoopLagIndicator(ft.Container):
+    """Exibe o lag atual e máximo medidos pelo LoopLagMonitor."""
+
+    def __init__(self, monitor: LoopLagMonitor, refresh_s: float = 2.0):
+        """
+        Args:
+            monitor: Monitor de lag do app.
+            refresh_s: Intervalo de atualização do texto.
+        """
+        self._monitor = monitor
+        self._refresh_s = refresh_s
+        self._text = ft.Text("", size=11, color=ft.Colors.GREY_500)
+        super().__init__(content=self._text, left=10, bottom=5)
+
+    async def run(self):
+        """Atualiza o indicador periodicamente."""
+        while True:
+            current_ms = self._monitor.current_lag_s * 1000
+            max_ms = self._monitor.max_lag_s * 1000
+            self._text.value = f"Lag: {current_ms:.0f} ms (máx {max_ms:.0f} ms)"
+            self._text.color = (
+                ft.Colors.ORANGE if current_ms >= 250 else ft.Colors.GREY_500
+            )
+            try:
+                self._text.update()
+            except RuntimeError:
+                pass
+            await asyncio.sleep(self._refresh_s)
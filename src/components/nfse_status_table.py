@@ -0,0 +1,214 @@
+"""
+Tabela de status por CNPJ de um job de NFS-e.
+
+Mostra uma linha por empresa com estado, tempo, tentativas e tamanho do
+relatório. As mudanças só marcam a linha como pendente; um laço com taxa
+limitada atualiza apenas as linhas alteradas (e o tempo da que está
+rodando), então a tabela continua leve com centenas de empresas.
+"""
+
+import asyncio
+import flet as ft
+
+from services.job_queue import Job
+from services.nfse_job import (
+    CnpjStatus,
+    CNPJ_PENDING,
+    CNPJ_RUNNING,
+    CNPJ_RETRYING,
+    CNPJ_SUCCESS,
+    CNPJ_ERROR,
+    CNPJ_CANCELLED,
+)
+
+_STATE_COLORS = {
+    CNPJ_PENDING: ft.Colors.GREY_400,
+    CNPJ_RUNNING: ft.Colors.BLUE_300,
+    CNPJ_RETRYING: ft.Colors.ORANGE,
+    CNPJ_SUCCESS: ft.Colors.GREEN,
+    CNPJ_ERROR: ft.Colors.RED,
+    CNPJ_CANCELLED: ft.Colors.ORANGE,
+}
+
+_ROW_HEIGHT = 28
+_COLUMN_WIDTHS = (170, 140, 80, 80, 100)
+
+
+def _format_elapsed(seconds: float | None) -> str:
+    if seconds is None:
+        return "-"
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes:d}:{secs:02d}"
+
+
+def _format_size(size: int) -> str:
+    if size <= 0:
+        return "-"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def _cells(values: list[str], **text_kwargs) -> list[ft.Control]:
+    return [
+        ft.Container(ft.Text(v, size=12, no_wrap=True, **text_kwargs), width=w)
+        for v, w in zip(values, _COLUMN_WIDTHS)
+    ]
+
+
+class _StatusRow(ft.Container):
+    """Linha de um CNPJ."""
+
+    def __init__(self, status: CnpjStatus):
+        super().__init__(
+            height=_ROW_HEIGHT,
+            padding=ft.Padding(left=5, right=5, top=0, bottom=0),
+        )
+        self.status = status
+        cells = _cells(["", "", "", "", ""])
+        self._texts: list[ft.Text] = [c.content for c in cells]
+        self._texts[0].value = status.cnpj
+        self.content = ft.Row(cells, spacing=0)
+        self.refresh(update=False)
+
+    def refresh(self, update: bool = True):
+        """Atualiza a linha com o status atual."""
+        status = self.status
+        self._texts[1].value = status.state
+        self._texts[1].color = _STATE_COLORS.get(status.state)
+        self._texts[2].value = _format_elapsed(status.elapsed_s)
+        self._texts[3].value = str(status.retries) if status.retries else "-"
+        self._texts[4].value = _format_size(status.file_size)
+        if update:
+            self.update()
+
+
+class NfseStatusTable(ft.Container):
+    """
+    Tabela ao vivo com o status de cada CNPJ do job acompanhado.
+
+    Uso:
+        table = NfseStatusTable(page)
+        table.show(job)            # ao trocar o job acompanhado
+        table.mark_dirty(cnpj)     # a cada JobEvent.DETAIL (None = todos)
+    """
+
+    def __init__(self, page: ft.Page, refresh_s: float = 0.5):
+        """
+        Args:
+            page: Página do Flet (para rodar o laço de atualização).
+            refresh_s: Intervalo mínimo entre atualizações da tabela.
+        """
+        super().__init__(
+            width=640,
+            padding=10,
+            border=ft.border.all(1, ft.Colors.OUTLINE),
+            border_radius=8,
+            visible=False,
+        )
+        self._page = page
+        self._refresh_s = refresh_s
+        self._job: Job | None = None
+        self._rows: dict[str, _StatusRow] = {}
+        self._dirty: set[str] = set()
+        self._rebuild_pending = False
+        self._task = None
+
+        self._summary = ft.Text("", size=12, color=ft.Colors.GREY_400)
+        # ListView com altura fixa por item só renderiza as linhas visíveis
+        self._list = ft.ListView(item_extent=_ROW_HEIGHT, height=240, spacing=0)
+
+        header = ft.Container(
+            ft.Row(
+                _cells(
+                    ["CNPJ", "Estado", "Tempo", "Tentativas", "Relatório"],
+                    weight=ft.FontWeight.W_500,
+                ),
+                spacing=0,
+            ),
+            padding=ft.Padding(left=5, right=5, top=0, bottom=0),
+        )
+        self.content = ft.Column(
+            [
+                ft.Row(
+                    [
+                        ft.Text("Status por empresa", size=16, weight=ft.FontWeight.W_500),
+                        ft.Container(expand=True),
+                        self._summary,
+                    ],
+                ),
+                header,
+                self._list,
+            ],
+            spacing=5,
+        )
+
+    def show(self, job: Job | None, update: bool = True):
+        """Passa a exibir os CNPJs do job informado."""
+        self._job = job
+        self._rebuild(update=update)
+        if job is not None and not job.finished:
+            self._ensure_refresh_loop()
+
+    def mark_dirty(self, key: str | None):
+        """Marca uma linha (ou todas, com None) para a próxima atualização."""
+        if key is None or key not in self._rows:
+            self._rebuild_pending = True
+        else:
+            self._dirty.add(key)
+        self._ensure_refresh_loop()
+
+    def _rebuild(self, update: bool = True):
+        """Recria as linhas a partir de job.details."""
+        self._rebuild_pending = False
+        self._dirty.clear()
+        details = self._job.details if self._job is not None else {}
+        self._rows = {
+            key: _StatusRow(status)
+            for key, status in details.items()
+            if isinstance(status, CnpjStatus)
+        }
+        self._list.controls = list(self._rows.values())
+        self.visible = bool(self._rows)
+        self._refresh_summary()
+        if update:
+            self.update()
+
+    def _refresh_summary(self):
+        counts: dict[str, int] = {}
+        for row in self._rows.values():
+            counts[row.status.state] = counts.get(row.status.state, 0) + 1
+        self._summary.value = ", ".join(f"{n} {state}" for state, n in counts.items())
+
+    def _ensure_refresh_loop(self):
+        if self._task is None or self._task.done():
+            self._task = self._page.run_task(self._refresh_loop)
+
+    async def _refresh_loop(self):
+        """Atualiza as linhas alteradas em taxa limitada enquanto o job roda."""
+        try:
+            while True:
+                await asyncio.sleep(self._refresh_s)
+
+                if self._rebuild_pending:
+                    self._rebuild()
+                    continue
+
+                # O tempo da linha em andamento muda a cada ciclo
+                running = {
+                    key
+                    for key, row in self._rows.items()
+                    if row.status.state in (CNPJ_RUNNING, CNPJ_RETRYING)
+                }
+                dirty, self._dirty = self._dirty | running, set()
+                for key in dirty:
+                    self._rows[key].refresh()
+                if dirty:
+                    self._refresh_summary()
+                    self._summary.update()
+
+                if not running and (self._job is None or self._job.finished):
+                    return
+        except RuntimeError:
+            # Tabela saiu da página (troca de rota)
+            return
@@ -3,16 +3,13 @@ Componente genérico de diálogo para edição de arquivos TOML.
 Suporta seções com campos key-value e tabelas com linhas editáveis.
 """
 
+import copy
 from dataclasses import dataclass, field
 from typing import Any
 import flet as ft
 
 from components.file_input import FileInput, FileType
-
-try:
-    import tomllib
-except ImportError:
-    import tomli as tomllib
+from services.config_watcher import ConfigSnapshot, config_watcher
 
 try:
     import tomli_w
@@ -81,6 +78,8 @@ class TomlEditorDialog:
         self._file_path = file_path
         self._config = config or []
         self._data: dict[str, Any] = {}
+        self._opened_data: dict[str, Any] = {}  # Dados ao abrir (detecta edições)
+        self._is_open = False
         self._field_refs: dict[str, ft.TextField] = {}  # Referências para campos de seção
         self._table_lists: dict[str, ft.Column] = {}  # Referências para listas de tabela
 
@@ -110,8 +109,12 @@ class TomlEditorDialog:
                     expand=True,
                 ),
             ],
+            on_dismiss=self._on_dismiss,
         )
 
+        # Mudanças no arquivo feitas fora do diálogo
+        config_watcher.subscribe(self._file_path, self._on_file_changed)
+
     @property
     def dialog(self) -> ft.AlertDialog:
         """Retorna o AlertDialog."""
@@ -120,27 +123,43 @@ class TomlEditorDialog:
     def open(self, e=None):
         """Abre o diálogo e carrega dados do TOML."""
         self._load_data()
+        self._is_open = True
         self._build_content()
         self._page.show_dialog(self._dialog)
 
     def get_data(self) -> dict[str, Any]:
-        """Retorna os dados atuais do TOML."""
-        self._load_data()
-        return self._data
+        """Retorna uma cópia dos dados atuais do TOML."""
+        return config_watcher.snapshot(self._file_path).copy_data()
 
     def _load_data(self):
-        """Carrega dados do arquivo TOML."""
-        try:
-            with open(self._file_path, "rb") as f:
-                self._data = tomllib.load(f)
-        except FileNotFoundError:
-            self._data = {}
-        except Exception as ex:
-            print(f"Erro ao ler {self._file_path}: {ex}")
-            self._data = {}
+        """Carrega uma cópia editável dos dados do arquivo TOML."""
+        self._data = config_watcher.snapshot(self._file_path).copy_data()
+        self._opened_data = copy.deepcopy(self._data)
+
+    def _has_local_changes(self) -> bool:
+        """Indica se o usuário alterou algo desde que abriu o diálogo."""
+        if self._data != self._opened_data:
+            return True
+        for ref_key, text_field in self._field_refs.items():
+            section, key = ref_key.split(".", 1)
+            original = str(self._opened_data.get(section, {}).get(key, ""))
+            if (text_field.value or "") != original:
+                return True
+        return False
+
+    def _on_file_changed(self, snapshot: ConfigSnapshot):
+        """Arquivo alterado fora do diálogo: recarrega se não houver edições."""
+        if self._is_open and not self._has_local_changes():
+            self._load_data()
+            self._build_content()
+            try:
+                self._content.update()
+            except RuntimeError:
+                pass
 
     def _save(self, e):
         """Salva dados no arquivo TOML."""
+        self._is_open = False
         if tomli_w is None:
             print("Erro: tomli_w não instalado. Execute: pip install tomli-w")
             self._page.pop_dialog()
@@ -163,12 +182,19 @@ class TomlEditorDialog:
         except Exception as ex:
             print(f"Erro ao salvar: {ex}")
 
+        # Atualiza o snapshot na hora e avisa os formulários inscritos
+        config_watcher.refresh(self._file_path)
         self._page.pop_dialog()
 
     def _close(self, e):
         """Fecha o diálogo sem salvar."""
+        self._is_open = False
         self._page.pop_dialog()
 
+    def _on_dismiss(self, e):
+        """Diálogo fechado por qualquer meio (Esc, pop_dialog, navegação)."""
+        self._is_open = False
+
     def _build_content(self):
         """Constrói o conteúdo do diálogo baseado na configuração."""
         self._content.controls.clear()
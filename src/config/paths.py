@@ -67,3 +67,24 @@ EMPRESAS_NFE_PATH = get_appdata_file_path("empresas_nfe.toml")
 
 # Chrome Profile (for nfse web)
 CHROME_PROFILE_PATH = get_appdata_file_path("chrome_profile_nfse")
+
+# Histórico de execuções (SQLite)
+RUN_HISTORY_PATH = get_appdata_file_path("historico_execucoes.sqlite3")
+
+# Cache de chaves extraídas das planilhas de relação
+SHEET_CACHE_DIR = get_appdata_file_path("cache_planilhas")
+
+# Cache dos totais extraídos dos relatórios PDF de NFS-e
+NFSE_TOTALS_CACHE_PATH = get_appdata_file_path("cache_totais_nfse.json")
+
+# Catálogo local dos documentos baixados (SQLite)
+DOC_CATALOG_PATH = get_appdata_file_path("catalogo_documentos.sqlite3")
+
+# Token da API HTTP local (gerado na primeira execução)
+API_TOKEN_PATH = get_appdata_file_path("api_token.txt")
+
+# Orçamento de requisições ao SEFAZ por CNPJ (SQLite)
+RATE_LIMIT_PATH = get_appdata_file_path("limites_sefaz.sqlite3")
+
+# Último NSU sincronizado por CNPJ/CPF (SQLite)
+NSU_STATE_PATH = get_appdata_file_path("sincronizacao_nsu.sqlite3")
@@ -1,5 +1,11 @@
 import sys
 
+# Executáveis congelados: os filhos dos pools de processos voltam por aqui
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+
 # Força encoding UTF-8 no console do Windows para suportar caracteres Unicode
 # Necessário para apps bundled (Flet build) onde o console não usa UTF-8 por padrão
 if sys.stdout and hasattr(sys.stdout, "reconfigure"):
@@ -13,6 +19,21 @@ if sys.stderr and hasattr(sys.stderr, "reconfigure"):
     except Exception:
         pass
 
+# Executável congelado iniciado como processo de trabalho de NF-e
+# (services.nfe_worker): não carrega a interface
+if __name__ == "__main__" and "--nfe-worker" in sys.argv:
+    from services.nfe_worker_child import main as worker_main
+
+    worker_main()
+    sys.exit(0)
+
+# Profiler de inicialização: criado antes dos imports pesados para medi-los
+from utils.startup_profiler import StartupProfiler
+
+startup_profiler = StartupProfiler()
+if __name__ == "__main__":
+    startup_profiler.install_import_hook()
+
 # Compatibilidade com Python 3.12+ (distutils foi removido do stdlib)
 # Precisa vir ANTES de qualquer import que use undetected_chromedriver
 import types
@@ -28,71 +49,132 @@ except ImportError:
     sys.modules["distutils"] = types.ModuleType("distutils")
     sys.modules["distutils.version"] = distutils_version
 
-import flet as ft
+with startup_profiler.step("Importando flet"):
+    import flet as ft
 import asyncio
 import os
 import logging
 from datetime import datetime
 
-# Configura logging para arquivo (útil para debug em PCs sem console)
-LOG_DIR = os.path.join(os.environ.get("LOCALAPPDATA", "."), "AutoNfe", "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
-LOG_FILE = os.path.join(LOG_DIR, f"app_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler(),  # Também mostra no console se disponível
-    ],
-)
-logger = logging.getLogger(__name__)
-logger.info(f"=== App iniciando - Log: {LOG_FILE} ===")
+# Filhos dos pools de processos (spawn) reimportam este módulo como
+# __mp_main__: não precisam do log em arquivo nem da interface
+if __name__ != "__mp_main__":
+    # Configura logging para arquivo (útil para debug em PCs sem console)
+    LOG_DIR = os.path.join(os.environ.get("LOCALAPPDATA", "."), "AutoNfe", "logs")
+    os.makedirs(LOG_DIR, exist_ok=True)
+    LOG_FILE = os.path.join(LOG_DIR, f"app_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
 
-try:
-    logger.info("Importando config.paths...")
-    from config.paths import (
-        APPDATA_DIR,
-        PROFILE_PATH,
-        EMPRESAS_NFSE_PATH,
-        EMPRESAS_NFE_PATH,
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler(LOG_FILE, encoding="utf-8"),
+            logging.StreamHandler(),  # Também mostra no console se disponível
+        ],
     )
+    logger = logging.getLogger(__name__)
+    logger.info(f"=== App iniciando - Log: {LOG_FILE} ===")
+
+    try:
+        logger.info("Importando config.paths...")
+        with startup_profiler.step("Importando config.paths"):
+            from config.paths import (
+                APPDATA_DIR,
+                PROFILE_PATH,
+                EMPRESAS_NFSE_PATH,
+                EMPRESAS_NFE_PATH,
+            )
 
-    logger.info("Importando config.template_utils...")
-    from config.template_utils import ensure_config_file
+        logger.info("Importando config.template_utils...")
+        with startup_profiler.step("Importando config.template_utils"):
+            from config.template_utils import ensure_config_file
 
-    logger.info(f"APPDATA_DIR: {APPDATA_DIR}")
+        logger.info(f"APPDATA_DIR: {APPDATA_DIR}")
 
-    logger.info("Importando views...")
-    from views.home import HomeView
-    from views.nfe import NfeView
-    from views.nfse import NfseView
+        logger.info("Importando views...")
+        with startup_profiler.step("Importando views"):
+            from views.home import HomeView
+            from views.nfe import NfeView
+            from views.nfse import NfseView
+            from views.historico import HistoricoView
+            from views.catalogo import CatalogoView
 
-    logger.info("Views importadas com sucesso")
+        logger.info("Views importadas com sucesso")
 
-    logger.info("Importando auto_nfe...")
-    from auto_nfe import ClientNfe
+        logger.info("Importando auto_nfe...")
+        with startup_profiler.step("Importando auto_nfe"):
+            from auto_nfe import ClientNfe
 
-    logger.info("auto_nfe importado com sucesso")
+        logger.info("auto_nfe importado com sucesso")
 
-except Exception as e:
-    logger.exception(f"ERRO FATAL durante imports: {e}")
-    raise
+        logger.info("Importando services...")
+        with startup_profiler.step("Importando services"):
+            from services.client_pool import ClientPool
+            from services.config_watcher import config_watcher
+            from services.job_queue import JobQueue
+            from services.local_api import LocalApiServer, local_api_enabled
+            from services.nfe_job import NfeJobRunner
+            from services.nfse_job import NfseJobRunner
+            from services.nfe_worker import IsolatedNfeJobRunner
+            from services.run_history import KIND_NFE, KIND_NFSE
+
+        logger.info("Importando utils...")
+        with startup_profiler.step("Importando utils"):
+            from utils.loop_monitor import LoopLagMonitor
+            from utils.memory_diagnostics import (
+                MemoryDiagnostics,
+                memory_diagnostics_enabled,
+            )
+            from components.loop_lag_indicator import LoopLagIndicator
+
+    except Exception as e:
+        logger.exception(f"ERRO FATAL durante imports: {e}")
+        raise
 
 
 async def main(page: ft.Page):
+    # Diagnóstico de memória (opcional): tracemalloc ligado o quanto antes
+    memory_diagnostics = None
+    if memory_diagnostics_enabled():
+        memory_diagnostics = MemoryDiagnostics(page, LOG_DIR)
+        memory_diagnostics.start()
+
     # --- Configurações ---
     # Garante que arquivos de configuração existam no AppData
     os.makedirs(APPDATA_DIR, exist_ok=True)
 
     # Cria configs a partir dos templates se não existirem
-    if ensure_config_file(PROFILE_PATH, "profile_template.toml"):
-        logger.info(f"Criado: {PROFILE_PATH}")
-    if ensure_config_file(EMPRESAS_NFSE_PATH, "empresas_nfse_template.toml"):
-        logger.info(f"Criado: {EMPRESAS_NFSE_PATH}")
-    if ensure_config_file(EMPRESAS_NFE_PATH, "empresas_nfe_template.toml"):
-        logger.info(f"Criado: {EMPRESAS_NFE_PATH}")
+    with startup_profiler.step("ensure_config_file"):
+        if ensure_config_file(PROFILE_PATH, "profile_template.toml"):
+            logger.info(f"Criado: {PROFILE_PATH}")
+        if ensure_config_file(EMPRESAS_NFSE_PATH, "empresas_nfse_template.toml"):
+            logger.info(f"Criado: {EMPRESAS_NFSE_PATH}")
+        if ensure_config_file(EMPRESAS_NFE_PATH, "empresas_nfe_template.toml"):
+            logger.info(f"Criado: {EMPRESAS_NFE_PATH}")
+
+    # --- Serviços do app (sobrevivem à troca de rotas) ---
+    with startup_profiler.step("Inicializando serviços"):
+        # Monitor de travamentos do event loop
+        loop_monitor = LoopLagMonitor()
+        loop_monitor.start()
+
+        client_pool = ClientPool()
+        client_pool.start()
+
+        job_queue = JobQueue()
+        job_queue.register_runner(
+            KIND_NFE, IsolatedNfeJobRunner(NfeJobRunner(client_pool))
+        )
+        job_queue.register_runner(KIND_NFSE, NfseJobRunner())
+        job_queue.start()
+
+        # Recarrega os TOMLs do AppData quando mudam fora do app
+        config_watcher.start()
+
+        # API HTTP local (opcional): outros programas enfileiram na mesma fila
+        if local_api_enabled():
+            local_api = LocalApiServer(job_queue)
+            await local_api.start()
 
     # --- Janela ---
     page.title = "Auto Nfe"
@@ -101,6 +183,11 @@ async def main(page: ft.Page):
     page.vertical_alignment = ft.MainAxisAlignment.START
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
 
+    # Indicador de lag do event loop
+    lag_indicator = LoopLagIndicator(loop_monitor)
+    page.overlay.append(lag_indicator)
+    page.run_task(lag_indicator.run)
+
     # --- Roteamento ---
     async def go_back(e):
         # Option 1: Pop the view
@@ -112,6 +199,11 @@ async def main(page: ft.Page):
             await page.push_route(top_view.route)
 
     def route_change():
+        # Views antigas param de ouvir serviços compartilhados antes de sair
+        for view in page.views:
+            dispose = getattr(view, "dispose", None)
+            if callable(dispose):
+                dispose()
         page.views.clear()
 
         logger.info(f"Rota alterada para: {page.route}")
@@ -121,16 +213,29 @@ async def main(page: ft.Page):
             logger.info("Entrou na HomeView")
             page.views.append(home_view)
         elif page.route == "/nfe":
-            nfe_view = NfeView(page)
+            nfe_view = NfeView(page, job_queue)
             logger.info("Entrou na NfeView")
             page.views.append(nfe_view)
         elif page.route == "/nfse":
-            nfse_view = NfseView(page)
+            nfse_view = NfseView(page, job_queue)
             logger.info("Entrou na NfseView")
             page.views.append(nfse_view)
+        elif page.route == "/historico":
+            historico_view = HistoricoView(page)
+            logger.info("Entrou na HistoricoView")
+            page.views.append(historico_view)
+        elif page.route == "/catalogo":
+            catalogo_view = CatalogoView(page)
+            logger.info("Entrou na CatalogoView")
+            page.views.append(catalogo_view)
 
         page.update()
 
+        # Snapshot a cada troca de rota: views recriadas que não são liberadas
+        # aparecem como controles fora da página
+        if memory_diagnostics is not None:
+            page.run_task(memory_diagnostics.snapshot, f"troca de rota {page.route}")
+
     async def view_pop(view):
         page.views.pop()
         top_view = page.views[-1]
@@ -144,12 +249,20 @@ async def main(page: ft.Page):
     # --- Inicializa App ---
     logger.info("Inicializando aplicação...")
 
-    route_change()
+    with startup_profiler.step("Primeiro route_change"):
+        route_change()
 
+    # Grava o relatório de inicialização e avisa se passou do orçamento
+    startup_profiler.finish(LOG_DIR)
 
-try:
-    logger.info("Iniciando ft.run()...")
-    ft.run(main=main, assets_dir="assets")
-except Exception as e:
-    logger.exception(f"ERRO FATAL em ft.run(): {e}")
-    raise
+    if memory_diagnostics is not None:
+        page.run_task(memory_diagnostics.run)
+
+
+if __name__ == "__main__":
+    try:
+        logger.info("Iniciando ft.run()...")
+        ft.run(main=main, assets_dir="assets")
+    except Exception as e:
+        logger.exception(f"ERRO FATAL em ft.run(): {e}")
+        raise
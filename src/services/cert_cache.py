@@ -0,0 +1,233 @@
+"""
+Cache de sessão dos certificados carregados (ClientNfe).
+
+Construir um ClientNfe descriptografa o PFX e monta o contexto TLS, o que é
+caro. Como o mesmo certificado é usado várias vezes ao dia, os clientes
+construídos ficam em memória, identificados pelo caminho do certificado,
+mtime/tamanho do arquivo e um digest da senha.
+
+A senha nunca é guardada: o digest usa HMAC com um sal aleatório gerado por
+processo. Entradas ociosas expiram e, ao serem descartadas, têm o material
+sensível apagado.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+
+from auto_nfe import ClientNfe
+
+logger = logging.getLogger(__name__)
+
+# Sal por processo: digests de senha não sobrevivem à sessão
+_SALT = secrets.token_bytes(32)
+
+# Atributos do cliente que podem conter material sensível
+_SENSITIVE_ATTRS = ("password", "senha", "cert_password", "_password", "pfx", "_pfx")
+
+
+def password_digest(password: str) -> str:
+    """Gera o digest (HMAC-SHA256 com sal de sessão) da senha do certificado."""
+    return hmac.new(_SALT, (password or "").encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+@dataclass(frozen=True)
+class CertKey:
+    """Identifica um certificado carregado."""
+
+    cnpj_cpf: str
+    cert_path: str
+    mtime_ns: int
+    size: int
+    password_digest: str
+
+
+@dataclass
+class _CacheEntry:
+    """Cliente carregado, instante do último uso e se está emprestado."""
+
+    client: ClientNfe
+    last_used: float
+    leased: bool = False
+
+
+def build_client(cnpj_cpf: str, cert_path: str, password: str) -> ClientNfe:
+    """
+    Constrói um ClientNfe para CNPJ (14 dígitos) ou CPF (11 dígitos).
+
+    Raises:
+        ValueError: Se o CNPJ/CPF não tiver 11 ou 14 dígitos.
+    """
+    if len(cnpj_cpf) == 14:
+        return ClientNfe(cnpj=cnpj_cpf, cert_pfx_path=cert_path, cert_password=password)
+    if len(cnpj_cpf) == 11:
+        return ClientNfe(cpf=cnpj_cpf, cert_pfx_path=cert_path, cert_password=password)
+    raise ValueError("CNPJ/CPF inválido. Deve conter 11 ou 14 dígitos.")
+
+
+def wipe_client(client: ClientNfe):
+    """
+    Descarta um cliente apagando o material sensível que ele mantém.
+
+    Fecha a sessão HTTP, zera buffers mutáveis (bytearray) e remove
+    referências a senha/PFX. É um esforço de melhor caso: objetos imutáveis
+    (str/bytes) só são liberados pelo coletor de lixo.
+    """
+    for closer in ("close", "_close"):
+        close = getattr(client, closer, None)
+        if callable(close):
+            try:
+                close()
+            except Exception as ex:
+                logger.debug(f"Erro ao fechar cliente: {ex}")
+            break
+    else:
+        session = getattr(client, "session", None)
+        if session is not None and hasattr(session, "close"):
+            session.close()
+
+    attrs = getattr(client, "__dict__", {})
+    for name, value in list(attrs.items()):
+        if isinstance(value, bytearray):
+            value[:] = b"\x00" * len(value)
+        if name in _SENSITIVE_ATTRS or isinstance(value, bytearray):
+            try:
+                setattr(client, name, None)
+            except Exception:
+                pass
+
+
+class CertificateCache:
+    """
+    Cache em memória de clientes NF-e por certificado.
+
+    Uso:
+        client = certificate_cache.get_client(cnpj_cpf, cert_path, password)
+    """
+
+    def __init__(self, idle_ttl_s: float = 1800.0, max_entries: int = 16):
+        """
+        Args:
+            idle_ttl_s: Tempo ocioso até a entrada expirar.
+            max_entries: Número máximo de certificados em memória.
+        """
+        self._idle_ttl_s = idle_ttl_s
+        self._max_entries = max_entries
+        self._entries: dict[CertKey, _CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, cnpj_cpf: str, cert_path: str, password: str) -> CertKey:
+        """
+        Monta a chave do cache a partir dos dados do certificado.
+
+        Raises:
+            OSError: Se o arquivo do certificado não existir.
+        """
+        norm_path = os.path.normcase(os.path.abspath(cert_path))
+        stat = os.stat(norm_path)
+        return CertKey(
+            cnpj_cpf=cnpj_cpf,
+            cert_path=norm_path,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            password_digest=password_digest(password),
+        )
+
+    def get_client(self, cnpj_cpf: str, cert_path: str, password: str) -> ClientNfe:
+        """
+        Retorna um cliente carregado, construindo-o apenas se necessário.
+
+        Bloqueante na construção: chame via asyncio.to_thread a partir da UI.
+        """
+        self.evict_idle()
+        key = self.make_key(cnpj_cpf, cert_path, password)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                logger.info(f"Certificado reutilizado do cache: {key.cert_path}")
+                return entry.client
+
+        start = time.perf_counter()
+        client = build_client(cnpj_cpf, cert_path, password)
+        logger.info(
+            f"Certificado carregado em {time.perf_counter() - start:.2f}s: {key.cert_path}"
+        )
+
+        with self._lock:
+            self._entries[key] = _CacheEntry(client=client, last_used=time.monotonic())
+            self._evict_overflow()
+        return client
+
+    def entries(self) -> list[tuple[CertKey, ClientNfe]]:
+        """Retorna uma cópia das entradas atuais (chave, cliente)."""
+        with self._lock:
+            return [(k, e.client) for k, e in self._entries.items()]
+
+    def set_leased(self, client: ClientNfe, leased: bool):
+        """
+        Marca o cliente como emprestado (não expira) ou devolvido.
+
+        A devolução conta como uso: a ociosidade é medida a partir dela.
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.client is client:
+                    entry.leased = leased
+                    entry.last_used = time.monotonic()
+
+    def discard(self, client: ClientNfe):
+        """Remove (e apaga) um cliente do cache, ex: após sessão abortada."""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e.client is client]
+            entries = [self._entries.pop(k) for k in keys]
+        for entry in entries:
+            wipe_client(entry.client)
+
+    def evict_idle(self) -> int:
+        """
+        Remove entradas ociosas há mais de idle_ttl_s (exceto as emprestadas).
+
+        Returns:
+            Número de entradas removidas.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                k
+                for k, e in self._entries.items()
+                if not e.leased and now - e.last_used > self._idle_ttl_s
+            ]
+            entries = [self._entries.pop(k) for k in expired]
+        for entry in entries:
+            wipe_client(entry.client)
+        if entries:
+            logger.info(f"{len(entries)} certificado(s) expirado(s) removido(s) do cache")
+        return len(entries)
+
+    def _evict_overflow(self):
+        """Remove as entradas menos usadas acima de max_entries (com lock)."""
+        while len(self._entries) > self._max_entries:
+            idle = [k for k, e in self._entries.items() if not e.leased]
+            if not idle:
+                break
+            oldest = min(idle, key=lambda k: self._entries[k].last_used)
+            wipe_client(self._entries.pop(oldest).client)
+
+    def clear(self):
+        """Remove e apaga todas as entradas."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            wipe_client(entry.client)
+
+
+# Instância da sessão do app
+certificate_cache = CertificateCache()
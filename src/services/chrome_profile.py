@@ -0,0 +1,281 @@
+"""
+Manutenção do perfil do Chrome usado pelo ClientNfseWeb.
+
+O perfil em CHROME_PROFILE_PATH só precisa guardar a sessão do portal
+(cookies, local storage e preferências). Caches, service workers,
+histórico e relatórios de falha crescem sem limite e deixam a abertura do
+navegador mais lenta com o passar dos meses.
+
+`prune_chrome_profile` roda antes de cada abertura do navegador: se o
+perfil passou do orçamento de tamanho, apaga primeiro os caches e depois
+os dados descartáveis (histórico, service workers), do maior para o
+menor, até voltar ao orçamento. O que mantém o login nunca é apagado.
+"""
+
+import logging
+import os
+import shutil
+import socket
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Orçamento padrão de tamanho do perfil
+DEFAULT_BUDGET_BYTES = 200 * 1024 * 1024
+
+# Nunca apagados: sessão, login e preferências
+_KEEP = {
+    "Cookies",
+    "Cookies-journal",
+    "Network",  # Chrome recente guarda os cookies em Default/Network/Cookies
+    "Local Storage",
+    "Session Storage",
+    "IndexedDB",
+    "Login Data",
+    "Login Data-journal",
+    "Preferences",
+    "Secure Preferences",
+    "Local State",
+    "First Run",
+}
+
+# Camada 1: caches, recriados pelo Chrome sem perda nenhuma
+_CACHE_ENTRIES = {
+    "Cache",
+    "Code Cache",
+    "GPUCache",
+    "DawnCache",
+    "DawnGraphiteCache",
+    "DawnWebGPUCache",
+    "GrShaderCache",
+    "GraphiteDawnCache",
+    "ShaderCache",
+    "Media Cache",
+    "Application Cache",
+    "component_crx_cache",
+    "extensions_crx_cache",
+}
+
+# Camada 2: dados descartáveis que não afetam o login
+_DISPOSABLE_ENTRIES = {
+    "Service Worker",
+    "History",
+    "History-journal",
+    "Visited Links",
+    "Top Sites",
+    "Top Sites-journal",
+    "Favicons",
+    "Favicons-journal",
+    "Shortcuts",
+    "Shortcuts-journal",
+    "Network Action Predictor",
+    "Network Action Predictor-journal",
+    "Crashpad",
+    "BrowserMetrics",
+    "optimization_guide_model_store",
+    "optimization_guide_prediction_model_downloads",
+    "Safe Browsing",
+    "blob_storage",
+}
+
+# Arquivos de trava criados pelo Chrome enquanto o perfil está aberto
+_LOCK_FILES = ("lockfile", "SingletonLock")
+
+
+@dataclass
+class ProfilePruneResult:
+    """Resultado da manutenção do perfil."""
+
+    size_before: int = 0
+    size_after: int = 0
+    removed: list[str] = field(default_factory=list)
+    skipped_reason: str | None = None
+
+    @property
+    def freed(self) -> int:
+        return max(self.size_before - self.size_after, 0)
+
+    def summary(self) -> str:
+        """Texto curto para log e status."""
+        before = self.size_before / 1024 / 1024
+        after = self.size_after / 1024 / 1024
+        if self.skipped_reason:
+            return f"Perfil do Chrome com {before:.0f} MB ({self.skipped_reason})"
+        if not self.removed:
+            return f"Perfil do Chrome com {before:.0f} MB (dentro do orçamento)"
+        return (
+            f"Perfil do Chrome reduzido de {before:.0f} MB para {after:.0f} MB "
+            f"({len(self.removed)} itens removidos)"
+        )
+
+
+def _entry_size(path: str) -> int:
+    """Tamanho de um arquivo ou pasta (recursivo), ignorando erros de acesso."""
+    try:
+        if not os.path.isdir(path) or os.path.islink(path):
+            return os.path.getsize(path)
+    except OSError:
+        return 0
+
+    total = 0
+    pending = [path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+def _profile_dirs(profile_path: str) -> list[str]:
+    """Pasta raiz (user data dir) e as pastas de perfil dentro dela."""
+    dirs = [profile_path]
+    try:
+        with os.scandir(profile_path) as it:
+            for entry in it:
+                if entry.is_dir() and (
+                    entry.name == "Default" or entry.name.startswith("Profile ")
+                ):
+                    dirs.append(entry.path)
+    except OSError:
+        pass
+    return dirs
+
+
+def _candidates(profile_path: str, names: set[str]) -> list[tuple[int, str]]:
+    """Entradas com os nomes informados, do maior para o menor."""
+    found = []
+    for folder in _profile_dirs(profile_path):
+        for name in names - _KEEP:
+            path = os.path.join(folder, name)
+            if os.path.lexists(path):
+                found.append((_entry_size(path), path))
+    return sorted(found, reverse=True)
+
+
+def _lockfile_held(lock_path: str) -> bool:
+    """
+    Windows: o Chrome mantém o lockfile aberto sem compartilhamento.
+
+    Se o arquivo abre, nenhum processo o segura e ele é sobra.
+    """
+    try:
+        fd = os.open(lock_path, os.O_RDWR)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        return True
+    os.close(fd)
+    return False
+
+
+def _singleton_lock_held(lock_path: str) -> bool:
+    """
+    POSIX: o SingletonLock é um link simbólico para "<host>-<pid>".
+
+    O perfil está em uso se o pid ainda existe nesta máquina; travas de
+    outra máquina (perfil em pasta de rede) são consideradas em uso.
+    """
+    try:
+        host, _, pid = os.readlink(lock_path).rpartition("-")
+        pid = int(pid)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError):
+        # Não é o link esperado: na dúvida, não mexe no perfil
+        return True
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # PermissionError: o processo existe, mas é de outro usuário
+        return True
+    return True
+
+
+def _is_in_use(profile_path: str) -> bool:
+    """
+    Indica se algum Chrome está com o perfil aberto.
+
+    A verificação não altera nada; só depois de confirmar que nenhuma trava
+    está de fato segura é que as sobras de uma execução encerrada à força
+    são apagadas.
+    """
+    stale = []
+    for name in _LOCK_FILES:
+        lock_path = os.path.join(profile_path, name)
+        if not os.path.lexists(lock_path):
+            continue
+        held = (
+            _singleton_lock_held(lock_path)
+            if name == "SingletonLock"
+            else _lockfile_held(lock_path)
+        )
+        if held:
+            return True
+        stale.append(lock_path)
+
+    for lock_path in stale:
+        try:
+            os.remove(lock_path)
+        except OSError as ex:
+            logger.debug(f"Não foi possível remover trava antiga {lock_path}: {ex}")
+    return False
+
+
+def prune_chrome_profile(
+    profile_path: str, budget_bytes: int = DEFAULT_BUDGET_BYTES
+) -> ProfilePruneResult:
+    """
+    Reduz o perfil do Chrome ao orçamento, preservando o login.
+
+    Args:
+        profile_path: Pasta do perfil (user data dir do Chrome).
+        budget_bytes: Tamanho máximo desejado do perfil.
+
+    Returns:
+        Tamanhos antes/depois e itens removidos.
+    """
+    result = ProfilePruneResult()
+    if not os.path.isdir(profile_path):
+        return result
+
+    result.size_before = result.size_after = _entry_size(profile_path)
+    if result.size_before <= budget_bytes:
+        return result
+
+    if _is_in_use(profile_path):
+        result.skipped_reason = "em uso por outro Chrome"
+        return result
+
+    # Caches primeiro; dados descartáveis só se ainda estiver acima do orçamento
+    for names in (_CACHE_ENTRIES, _DISPOSABLE_ENTRIES):
+        for size, path in _candidates(profile_path, names):
+            if result.size_after <= budget_bytes:
+                break
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError as ex:
+                logger.debug(f"Não foi possível remover {path}: {ex}")
+                continue
+            result.size_after -= size
+            result.removed.append(os.path.relpath(path, profile_path))
+
+    if result.removed:
+        result.size_after = _entry_size(profile_path)
+        logger.debug(f"Removidos do perfil do Chrome: {', '.join(result.removed)}")
+    return result
@@ -0,0 +1,154 @@
+"""
+Pool de clientes NF-e mantido pelo app entre execuções.
+
+Os clientes ficam vivos entre execuções (e entre perfis que usam o mesmo
+certificado e CNPJ), reaproveitando as conexões HTTP/TLS já abertas com o
+SEFAZ. Cada cliente é emprestado com exclusividade durante uma execução,
+passa por verificação de saúde antes de ser entregue e é descartado quando
+fica ocioso por muito tempo.
+"""
+
+import asyncio
+import atexit
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from auto_nfe import ClientNfe
+
+from services.cert_cache import CertificateCache, CertKey, certificate_cache
+
+logger = logging.getLogger(__name__)
+
+
+def is_client_healthy(client: ClientNfe) -> bool:
+    """
+    Verifica se o cliente ainda pode ser reutilizado.
+
+    Usa health_check() do cliente quando disponível; caso contrário,
+    verifica se a sessão HTTP não foi fechada.
+    """
+    health_check = getattr(client, "health_check", None)
+    if callable(health_check):
+        try:
+            return bool(health_check())
+        except Exception:
+            return False
+
+    session = getattr(client, "session", None)
+    if session is None:
+        return True
+    return not (getattr(session, "closed", False) or getattr(session, "is_closed", False))
+
+
+class ClientPool:
+    """
+    Empresta clientes NF-e por certificado/CNPJ, mantendo-os aquecidos.
+
+    Uso:
+        async with pool.lease(cnpj_cpf, cert_path, password) as client:
+            await client.consulta_planilha(...)
+    """
+
+    def __init__(
+        self,
+        cache: CertificateCache = certificate_cache,
+        maintenance_interval_s: float = 60.0,
+    ):
+        """
+        Args:
+            cache: Cache de certificados que constrói e guarda os clientes.
+            maintenance_interval_s: Intervalo da verificação de saúde/ociosidade.
+        """
+        self._cache = cache
+        self._maintenance_interval_s = maintenance_interval_s
+        self._locks: dict[CertKey, asyncio.Lock] = {}
+        self._leased: dict[int, CertKey] = {}
+        self._maintenance_task: asyncio.Task | None = None
+
+    def start(self):
+        """Inicia a manutenção periódica (chamar dentro do event loop do app)."""
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+            atexit.register(self._cache.clear)
+
+    async def close(self):
+        """Para a manutenção e descarta todos os clientes."""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        self._cache.clear()
+
+    async def acquire(self, cnpj_cpf: str, cert_path: str, password: str) -> ClientNfe:
+        """
+        Empresta um cliente saudável para o certificado/CNPJ.
+
+        Execuções simultâneas para o mesmo certificado/CNPJ aguardam a vez.
+
+        Raises:
+            OSError: Se o certificado não existir.
+            ValueError: Se o CNPJ/CPF for inválido.
+        """
+        key = self._cache.make_key(cnpj_cpf, cert_path, password)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        await lock.acquire()
+
+        try:
+            client = await asyncio.to_thread(
+                self._cache.get_client, cnpj_cpf, cert_path, password
+            )
+            if not is_client_healthy(client):
+                logger.info("Cliente NF-e do pool não está saudável; recriando")
+                self._cache.discard(client)
+                client = await asyncio.to_thread(
+                    self._cache.get_client, cnpj_cpf, cert_path, password
+                )
+        except BaseException:
+            lock.release()
+            raise
+
+        self._leased[id(client)] = key
+        # Emprestado não expira por ociosidade, mesmo em execuções longas
+        self._cache.set_leased(client, True)
+        return client
+
+    def release(self, client: ClientNfe, healthy: bool = True):
+        """
+        Devolve o cliente ao pool.
+
+        Args:
+            client: Cliente obtido em acquire.
+            healthy: False para descartar (ex: sessão abortada no cancelamento).
+        """
+        key = self._leased.pop(id(client), None)
+        self._cache.set_leased(client, False)
+        if not healthy:
+            self._cache.discard(client)
+        if key is not None and key in self._locks and self._locks[key].locked():
+            self._locks[key].release()
+
+    @asynccontextmanager
+    async def lease(
+        self, cnpj_cpf: str, cert_path: str, password: str
+    ) -> AsyncIterator[ClientNfe]:
+        """Context manager de acquire/release."""
+        client = await self.acquire(cnpj_cpf, cert_path, password)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    async def _maintenance_loop(self):
+        """Remove clientes ociosos e descarta os que falham na verificação de saúde."""
+        while True:
+            await asyncio.sleep(self._maintenance_interval_s)
+            try:
+                self._cache.evict_idle()
+                for key, client in self._cache.entries():
+                    if id(client) in self._leased:
+                        continue
+                    if not is_client_healthy(client):
+                        logger.info(f"Removendo cliente não saudável: {key.cert_path}")
+                        self._cache.discard(client)
+            except Exception as ex:
+                logger.warning(f"Erro na manutenção do pool de clientes: {ex}")
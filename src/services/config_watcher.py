@@ -0,0 +1,324 @@
+"""
+Observação dos arquivos de configuração do AppData (profile.toml,
+empresas_nfe.toml, empresas_nfse.toml).
+
+Cada arquivo é lido uma vez e guardado como um snapshot imutável. Quando
+ele muda no disco (edição fora do app, outra instância salvando), a
+mudança é agrupada por um intervalo curto (debounce), o arquivo é relido
+uma única vez e o novo snapshot é enviado aos inscritos, na thread do
+event loop. Quem precisa dos dados usa `snapshot(path)` em vez de reler o
+arquivo a cada chamada.
+
+Com o pacote opcional `watchdog`, a pasta é observada por eventos do
+sistema de arquivos; sem ele, o mtime/tamanho dos arquivos inscritos é
+conferido a cada segundo.
+"""
+
+import asyncio
+import copy
+import logging
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from config.paths import APPDATA_DIR
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Conteúdo de um arquivo de configuração em um momento."""
+
+    path: str
+    data: dict[str, Any] = field(default_factory=dict)
+    mtime_ns: int = 0
+    size: int = -1
+    error: str | None = None
+
+    def copy_data(self) -> dict[str, Any]:
+        """Cópia profunda dos dados (para edição sem alterar o snapshot)."""
+        return copy.deepcopy(self.data)
+
+
+def _stat_key(path: str) -> tuple[int, int]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0, -1
+    return st.st_mtime_ns, st.st_size
+
+
+def read_snapshot(path: str) -> ConfigSnapshot:
+    """Lê e interpreta o TOML (arquivo ausente = dados vazios)."""
+    mtime_ns, size = _stat_key(path)
+    try:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    except FileNotFoundError:
+        return ConfigSnapshot(path)
+    except Exception as ex:
+        logger.warning(f"Erro ao ler {path}: {ex}")
+        return ConfigSnapshot(path, mtime_ns=mtime_ns, size=size, error=str(ex))
+    return ConfigSnapshot(path, data, mtime_ns, size)
+
+
+class _Handler(FileSystemEventHandler):
+    """Repassa eventos do watchdog ao ConfigWatcher."""
+
+    def __init__(self, watcher: "ConfigWatcher"):
+        super().__init__()
+        self._watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self._watcher._touch(event.src_path)
+        dest_path = getattr(event, "dest_path", None)
+        if dest_path:
+            # Editores que salvam em temporário e renomeiam
+            self._watcher._touch(dest_path)
+
+
+class ConfigWatcher:
+    """
+    Snapshots dos arquivos de configuração, atualizados quando mudam.
+
+    Uso:
+        config_watcher.start()  # no event loop do app
+        unsubscribe = config_watcher.subscribe(PROFILE_PATH, self._on_profile)
+        data = config_watcher.snapshot(PROFILE_PATH).data
+        config_watcher.refresh(PROFILE_PATH)  # após salvar pelo próprio app
+    """
+
+    def __init__(
+        self,
+        folder: str = APPDATA_DIR,
+        debounce_s: float = 0.3,
+        poll_interval_s: float = 1.0,
+    ):
+        """
+        Args:
+            folder: Pasta observada.
+            debounce_s: Tempo sem novas mudanças antes de reler o arquivo.
+            poll_interval_s: Intervalo da conferência sem watchdog.
+        """
+        self._folder = folder
+        self._debounce_s = debounce_s
+        self._poll_interval_s = poll_interval_s
+
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, ConfigSnapshot] = {}
+        # Callbacks por arquivo; métodos ficam em referência fraca para que
+        # views descartadas na troca de rota não sejam mantidas vivas
+        self._subscribers: dict[str, list[Callable[[], Callable | None]]] = {}
+        self._changed: dict[str, float] = {}  # caminho -> última mudança (monotonic)
+        self._polled: dict[str, tuple[int, int]] = {}  # última stat vista na varredura
+        self._wake = threading.Event()
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        """Começa a observar (chamar de dentro do event loop do app)."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stop.clear()
+
+        if Observer is not None and os.path.isdir(self._folder):
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_Handler(self), self._folder, recursive=False)
+                self._observer.start()
+            except Exception as ex:
+                logger.warning(f"Observador de configurações indisponível: {ex}")
+                self._observer = None
+
+        self._thread = threading.Thread(
+            target=self._watch_loop, daemon=True, name="config-watcher"
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Para de observar."""
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def snapshot(self, path: str) -> ConfigSnapshot:
+        """
+        Retorna o snapshot atual do arquivo (lido só na primeira vez).
+
+        Com o observador parado, confere mtime/tamanho antes de devolver.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            current = self._snapshots.get(path)
+        if current is not None and (
+            self.running or _stat_key(path) == (current.mtime_ns, current.size)
+        ):
+            return current
+        return self._reload(path, notify=False)
+
+    def refresh(self, path: str) -> ConfigSnapshot:
+        """Relê o arquivo agora e avisa os inscritos (ex.: após salvar)."""
+        return self._reload(os.path.abspath(path), notify=True)
+
+    def subscribe(
+        self, path: str, callback: Callable[[ConfigSnapshot], None]
+    ) -> Callable[[], None]:
+        """
+        Inscreve um callback para receber os novos snapshots do arquivo.
+
+        O callback roda na thread do event loop. Métodos de objetos são
+        guardados em referência fraca e saem da lista quando o objeto some.
+
+        Returns:
+            Função que cancela a inscrição.
+        """
+        path = os.path.abspath(path)
+        if hasattr(callback, "__self__"):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback  # noqa: E731
+
+        with self._lock:
+            self._subscribers.setdefault(path, []).append(ref)
+            known = path in self._snapshots
+        if not known:
+            self.snapshot(path)
+
+        def unsubscribe():
+            with self._lock:
+                refs = self._subscribers.get(path, [])
+                if ref in refs:
+                    refs.remove(ref)
+
+        return unsubscribe
+
+    # --- Interno ---
+
+    def _touch(self, path: str):
+        """Registra uma mudança em um arquivo inscrito (thread do observador)."""
+        path = os.path.abspath(path)
+        with self._lock:
+            if path not in self._subscribers and path not in self._snapshots:
+                return
+            self._changed[path] = time.monotonic()
+        self._wake.set()
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(
+                self._debounce_s if self._changed else self._poll_interval_s
+            )
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                if self._observer is None:
+                    self._poll_stats()
+                self._flush_changes()
+            except Exception as ex:
+                logger.warning(f"Erro ao verificar configurações: {ex}")
+
+    def _poll_stats(self):
+        """Sem watchdog: registra mudança quando mtime/tamanho mudam entre varreduras."""
+        with self._lock:
+            known = list(self._snapshots.values())
+        for snapshot in known:
+            key = _stat_key(snapshot.path)
+            last = self._polled.get(snapshot.path, (snapshot.mtime_ns, snapshot.size))
+            if key != last:
+                self._touch(snapshot.path)
+            self._polled[snapshot.path] = key
+
+    def _flush_changes(self):
+        """Relê os arquivos cujas mudanças já se acalmaram."""
+        now = time.monotonic()
+        with self._lock:
+            ready = [
+                path
+                for path, changed_at in self._changed.items()
+                if now - changed_at >= self._debounce_s
+            ]
+            for path in ready:
+                del self._changed[path]
+
+        for path in ready:
+            with self._lock:
+                current = self._snapshots.get(path)
+            # Evento sem mudança real (ex.: só leitura, ou já relido por refresh)
+            if current is not None and _stat_key(path) == (current.mtime_ns, current.size):
+                continue
+            self._reload(path, notify=True)
+
+    def _reload(self, path: str, notify: bool) -> ConfigSnapshot:
+        snapshot = read_snapshot(path)
+        with self._lock:
+            previous = self._snapshots.get(path)
+            # Arquivo no meio de uma gravação: mantém o último válido
+            if snapshot.error is not None and previous is not None:
+                return previous
+            self._snapshots[path] = snapshot
+        if notify and (previous is None or previous.data != snapshot.data):
+            logger.info(f"Configuração alterada: {os.path.basename(path)}")
+            self._dispatch(snapshot)
+        return snapshot
+
+    def _dispatch(self, snapshot: ConfigSnapshot):
+        """Entrega o snapshot aos inscritos, na thread do event loop."""
+        if self._loop is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._notify, snapshot)
+                return
+            except RuntimeError:
+                pass  # Loop encerrado
+        self._notify(snapshot)
+
+    def _notify(self, snapshot: ConfigSnapshot):
+        with self._lock:
+            refs = list(self._subscribers.get(snapshot.path, []))
+        for ref in refs:
+            callback = ref()
+            if callback is None:
+                with self._lock:
+                    if ref in self._subscribers.get(snapshot.path, []):
+                        self._subscribers[snapshot.path].remove(ref)
+                continue
+            try:
+                callback(snapshot)
+            except Exception as ex:
+                logger.warning(f"Erro ao aplicar configuração alterada: {ex}")
+
+
+# Instância do app (compartilhada por formulários e diálogos)
+config_watcher = ConfigWatcher()
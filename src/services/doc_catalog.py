@@ -0,0 +1,342 @@
+"""
+Catálogo local dos documentos fiscais baixados.
+
+Os metadados de cada XML de NF-e (chave, número, emissão, emitente,
+destinatário e valor) são gravados em um banco SQLite no AppData com
+índices por emitente, destinatário, data e valor, respondendo consultas
+como "NF-e do emitente X em março acima de R$ 10 mil" em milissegundos
+sem abrir os arquivos.
+
+A indexação é incremental: arquivos com mtime/tamanho já registrados são
+ignorados. A leitura dos XMLs fica em services.xml_scanner (mmap, em
+paralelo), o que permite ingerir de uma vez pastas antigas inteiras. O resultado de uma consulta pode ser exportado para Parquet
+(pyarrow, opcional) ou CSV.
+"""
+
+import csv
+import logging
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable
+
+from config.paths import DOC_CATALOG_PATH
+from services.sqlite_store import SqliteStore
+from services.xml_scanner import ScanStats, iter_xml_files, scan_files
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Gravações em lote: uma transação a cada N documentos
+_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    chave TEXT PRIMARY KEY,
+    modelo TEXT,
+    serie TEXT,
+    numero INTEGER,
+    emissao TEXT,
+    emit_cnpj TEXT,
+    emit_nome TEXT,
+    dest_cnpj TEXT,
+    dest_nome TEXT,
+    valor_total REAL,
+    pasta TEXT NOT NULL,
+    arquivo TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    tamanho INTEGER NOT NULL,
+    indexado_em REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_doc_emit ON documentos (emit_cnpj, emissao);
+CREATE INDEX IF NOT EXISTS idx_doc_dest ON documentos (dest_cnpj, emissao);
+CREATE INDEX IF NOT EXISTS idx_doc_emissao ON documentos (emissao);
+CREATE INDEX IF NOT EXISTS idx_doc_valor ON documentos (valor_total);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_doc_arquivo ON documentos (pasta, arquivo);
+CREATE TABLE IF NOT EXISTS ignorados (
+    pasta TEXT NOT NULL,
+    arquivo TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    tamanho INTEGER NOT NULL,
+    PRIMARY KEY (pasta, arquivo)
+);
+"""
+
+_COLUMNS = (
+    "chave, modelo, serie, numero, emissao, emit_cnpj, emit_nome, "
+    "dest_cnpj, dest_nome, valor_total, pasta, arquivo"
+)
+
+
+def _parquet_schema() -> "pa.Schema":
+    """Schema do Parquet exportado, na ordem de _COLUMNS."""
+    return pa.schema(
+        [
+            ("chave", pa.string()),
+            ("modelo", pa.string()),
+            ("serie", pa.string()),
+            ("numero", pa.int64()),
+            ("emissao", pa.string()),
+            ("emit_cnpj", pa.string()),
+            ("emit_nome", pa.string()),
+            ("dest_cnpj", pa.string()),
+            ("dest_nome", pa.string()),
+            ("valor_total", pa.float64()),
+            ("pasta", pa.string()),
+            ("arquivo", pa.string()),
+        ]
+    )
+
+
+@dataclass
+class CatalogDocument:
+    """Um documento do catálogo."""
+
+    chave: str
+    modelo: str | None
+    serie: str | None
+    numero: int | None
+    emissao: str | None  # AAAA-MM-DD
+    emit_cnpj: str | None
+    emit_nome: str | None
+    dest_cnpj: str | None
+    dest_nome: str | None
+    valor_total: float | None
+    pasta: str
+    arquivo: str
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.pasta, self.arquivo)
+
+
+@dataclass
+class CatalogQuery:
+    """Filtros de consulta ao catálogo (None = sem filtro)."""
+
+    emit_cnpj: str | None = None
+    dest_cnpj: str | None = None
+    date_from: date | None = None
+    date_to: date | None = None
+    min_value: float | None = None
+    max_value: float | None = None
+    name: str | None = None  # Trecho do nome do emitente ou destinatário
+
+    def where(self) -> tuple[str, list]:
+        """Monta a cláusula WHERE a partir dos filtros."""
+        clauses = []
+        params: list = []
+        if self.emit_cnpj:
+            clauses.append("emit_cnpj = ?")
+            params.append(re.sub(r"\D", "", self.emit_cnpj))
+        if self.dest_cnpj:
+            clauses.append("dest_cnpj = ?")
+            params.append(re.sub(r"\D", "", self.dest_cnpj))
+        if self.date_from:
+            clauses.append("emissao >= ?")
+            params.append(self.date_from.isoformat())
+        if self.date_to:
+            clauses.append("emissao <= ?")
+            params.append(self.date_to.isoformat())
+        if self.min_value is not None:
+            clauses.append("valor_total >= ?")
+            params.append(self.min_value)
+        if self.max_value is not None:
+            clauses.append("valor_total <= ?")
+            params.append(self.max_value)
+        if self.name:
+            clauses.append("(emit_nome LIKE ? OR dest_nome LIKE ?)")
+            params += [f"%{self.name}%"] * 2
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+
+class DocumentCatalog(SqliteStore):
+    """
+    Catálogo SQLite dos XMLs baixados.
+
+    Uso:
+        catalog = DocumentCatalog()
+        catalog.index_folder("C:/xmls")
+        docs = catalog.search(CatalogQuery(emit_cnpj="123...", min_value=10000))
+    """
+
+    def __init__(self, db_path: str = DOC_CATALOG_PATH):
+        """
+        Args:
+            db_path: Caminho do arquivo SQLite.
+        """
+        super().__init__(db_path, _SCHEMA, timeout=10)
+
+    def index_folder(
+        self,
+        folder: str,
+        recursive: bool = False,
+        max_workers: int | None = None,
+        callback_progress: Callable[[ScanStats], None] | None = None,
+    ) -> ScanStats:
+        """
+        Indexa os XMLs novos ou alterados de uma pasta.
+
+        Args:
+            folder: Pasta dos XMLs.
+            recursive: Inclui as subpastas (ingestão de pastas antigas).
+            max_workers: Processos da leitura em paralelo (None = um por núcleo).
+            callback_progress: Chamado a cada lote gravado com o andamento.
+
+        Returns:
+            Contagens e velocidade (arquivos/s) da indexação.
+        """
+        stats = ScanStats(started_at=time.monotonic())
+        folder = os.path.abspath(folder)
+
+        # Arquivos já vistos (catalogados ou que não são NF-e, como eventos)
+        known: dict[str, dict[str, tuple[int, int]]] = {}
+        files: dict[str, tuple[str, str, int, int]] = {}
+        for dirpath, name, st in iter_xml_files(folder, recursive=recursive):
+            if dirpath not in known:
+                known[dirpath] = self._known_files(dirpath)
+            if known[dirpath].get(name) == (st.st_mtime_ns, st.st_size):
+                stats.skipped += 1
+            else:
+                path = os.path.join(dirpath, name)
+                files[path] = (dirpath, name, st.st_mtime_ns, st.st_size)
+
+        stats.total = len(files)
+        if not files:
+            return stats
+
+        batch = []
+        ignored = []
+        for path, data in scan_files(list(files), max_workers=max_workers):
+            dirpath, name, mtime_ns, size = files[path]
+            stats.files += 1
+            if data is None:
+                ignored.append((dirpath, name, mtime_ns, size))
+            else:
+                batch.append((*data.values(), dirpath, name, mtime_ns, size, time.time()))
+            if len(batch) + len(ignored) >= _BATCH_SIZE or stats.files == stats.total:
+                stats.documents += self._write(batch, ignored)
+                stats.ignored += len(ignored)
+                batch = []
+                ignored = []
+                stats.tick()
+                if callback_progress:
+                    callback_progress(stats)
+
+        logger.info(f"Catálogo ({folder}): {stats.summary()}")
+        return stats
+
+    def _known_files(self, folder: str) -> dict[str, tuple[int, int]]:
+        """mtime/tamanho dos arquivos da pasta já processados."""
+        with self._lock, self._connect() as conn:
+            return {
+                name: (mtime_ns, size)
+                for name, mtime_ns, size in conn.execute(
+                    "SELECT arquivo, mtime_ns, tamanho FROM documentos WHERE pasta = ? "
+                    "UNION ALL "
+                    "SELECT arquivo, mtime_ns, tamanho FROM ignorados WHERE pasta = ?",
+                    (folder, folder),
+                )
+            }
+
+    def _write(self, rows: list[tuple], ignored: list[tuple]) -> int:
+        """Grava um lote de documentos e de arquivos ignorados em uma transação."""
+        if not rows and not ignored:
+            return 0
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO documentos ({_COLUMNS}, mtime_ns, tamanho, "
+                "indexado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO ignorados (pasta, arquivo, mtime_ns, tamanho) "
+                "VALUES (?, ?, ?, ?)",
+                ignored,
+            )
+        return len(rows)
+
+    def search(
+        self, query: CatalogQuery, limit: int = 50, offset: int = 0
+    ) -> list[CatalogDocument]:
+        """Lista documentos, do mais recente para o mais antigo."""
+        where, params = query.where()
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT {_COLUMNS} FROM documentos {where} "
+                    "ORDER BY emissao DESC, chave LIMIT ? OFFSET ?",
+                    (*params, limit, offset),
+                ).fetchall()
+        except sqlite3.Error as ex:
+            logger.error(f"Erro ao consultar catálogo: {ex}")
+            return []
+        return [CatalogDocument(*row) for row in rows]
+
+    def summary(self, query: CatalogQuery) -> tuple[int, float]:
+        """Retorna (quantidade, soma dos valores) dos documentos filtrados."""
+        where, params = query.where()
+        try:
+            with self._connect() as conn:
+                count, total = conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(valor_total), 0) FROM documentos {where}",
+                    params,
+                ).fetchone()
+        except sqlite3.Error as ex:
+            logger.error(f"Erro ao consultar catálogo: {ex}")
+            return 0, 0.0
+        return count, total
+
+    def export(self, query: CatalogQuery, output_path: str) -> str | None:
+        """
+        Exporta os documentos filtrados para Parquet ou CSV (pela extensão).
+
+        Sem pyarrow, grava CSV no lugar do Parquet.
+
+        Returns:
+            Caminho efetivamente gravado, ou None se nenhum documento
+            corresponde ao filtro (nenhum arquivo é criado).
+        """
+        where, params = query.where()
+        columns = [c.strip() for c in _COLUMNS.split(",")]
+        sql = f"SELECT {_COLUMNS} FROM documentos {where} ORDER BY emissao, chave"
+
+        with self._connect() as conn:
+            cursor = conn.execute(sql, params)
+            rows = cursor.fetchmany(50_000)
+            if not rows:
+                return None
+
+            if output_path.lower().endswith(".parquet") and pq is not None:
+                # Schema fixo: um lote com uma coluna toda nula não muda o tipo
+                schema = _parquet_schema()
+                # Em lotes, sem carregar o resultado inteiro na memória
+                with pq.ParquetWriter(output_path, schema) as writer:
+                    while rows:
+                        writer.write_table(
+                            pa.Table.from_pylist(
+                                [dict(zip(columns, row)) for row in rows], schema=schema
+                            )
+                        )
+                        rows = cursor.fetchmany(50_000)
+                return output_path
+
+            if not output_path.lower().endswith(".csv"):
+                output_path = os.path.splitext(output_path)[0] + ".csv"
+            with open(output_path, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.writer(f, delimiter=";")
+                writer.writerow(columns)
+                while rows:
+                    writer.writerows(rows)
+                    rows = cursor.fetchmany(50_000)
+            return output_path
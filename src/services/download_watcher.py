@@ -0,0 +1,319 @@
+"""
+Detecção de downloads concluídos na pasta de relatórios de NFS-e.
+
+Com o pacote opcional `watchdog`, a pasta é observada por eventos do
+sistema de arquivos (inotify no Linux, ReadDirectoryChangesW no Windows);
+sem ele, uma varredura com os.scandir a cada 0,5s faz o mesmo papel.
+
+Arquivos temporários do Chrome (.crdownload, .tmp) são ignorados. Um
+arquivo é considerado concluído quando tem o nome final, não tem mais o
+temporário correspondente e o tamanho parou de mudar. Cada download é
+atribuído ao CNPJ (e janela, se informada) que estava ativo quando o
+download começou.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIXES = (".crdownload", ".tmp", ".part")
+
+
+@dataclass
+class DownloadTarget:
+    """Quem originou um download."""
+
+    cnpj: str | None = None
+    window: str | None = None
+
+
+@dataclass
+class DownloadEvent:
+    """Download concluído."""
+
+    path: str
+    size: int
+    cnpj: str | None
+    window: str | None
+    completed_at: float
+
+
+@dataclass
+class _Pending:
+    target: DownloadTarget
+    size: int = -1
+    stable_since: float = 0.0
+
+
+def is_partial(path: str) -> bool:
+    """Indica se o arquivo é um download em andamento do navegador."""
+    return path.endswith(PARTIAL_SUFFIXES)
+
+
+def _final_name(partial_path: str) -> str | None:
+    """Nome final de um temporário ('x.pdf.crdownload' -> 'x.pdf')."""
+    base, _ = os.path.splitext(partial_path)
+    # 'Unconfirmed 123.crdownload' não diz o nome final
+    return base if os.path.splitext(base)[1] else None
+
+
+class _Handler(FileSystemEventHandler):
+    """Repassa eventos do watchdog ao DownloadWatcher."""
+
+    def __init__(self, watcher: "DownloadWatcher"):
+        super().__init__()
+        self._watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._watcher._touch(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._watcher._touch(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._watcher._touch(event.dest_path)
+
+
+class DownloadWatcher:
+    """
+    Observa uma pasta e avisa quando cada download termina.
+
+    Uso:
+        watcher = DownloadWatcher(folder, on_complete=callback)
+        watcher.start()
+        watcher.set_active("12345678000190")
+        event = watcher.wait_for("12345678000190", timeout=60)
+        watcher.stop()
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        on_complete: Callable[[DownloadEvent], None] | None = None,
+        poll_interval_s: float = 0.5,
+        settle_s: float = 0.5,
+    ):
+        """
+        Args:
+            folder: Pasta de download do navegador.
+            on_complete: Chamado (na thread do observador) a cada download concluído.
+            poll_interval_s: Intervalo da verificação (e da varredura, sem watchdog).
+            settle_s: Tempo com tamanho estável para considerar o arquivo pronto.
+        """
+        self._folder = folder
+        self._on_complete = on_complete
+        self._poll_interval_s = poll_interval_s
+        self._settle_s = settle_s
+
+        self._lock = threading.Condition()
+        self._active = DownloadTarget()
+        self._history: list[tuple[float, DownloadTarget]] = []
+        self._known: set[str] = set()
+        self._pending: dict[str, _Pending] = {}
+        self._partials: dict[str, DownloadTarget] = {}
+        self.events: list[DownloadEvent] = []
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._observer = None
+
+    @property
+    def uses_events(self) -> bool:
+        """True se a pasta é observada por eventos (watchdog) e não por varredura."""
+        return self._observer is not None
+
+    def start(self):
+        """Começa a observar (arquivos já existentes são ignorados)."""
+        if self._thread is not None:
+            return
+        os.makedirs(self._folder, exist_ok=True)
+        self._known = set(self._scan())
+
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_Handler(self), self._folder, recursive=False)
+                self._observer.start()
+            except Exception as ex:
+                logger.warning(f"Observador de pasta indisponível, usando varredura: {ex}")
+                self._observer = None
+
+        self._thread = threading.Thread(
+            target=self._check_loop, daemon=True, name="download-watcher"
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Para de observar."""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def set_active(self, cnpj: str | None, window: str | None = None):
+        """Define a quem os próximos downloads serão atribuídos."""
+        with self._lock:
+            self._active = DownloadTarget(cnpj, window)
+            self._history.append((time.time(), self._active))
+
+    def wait_for(self, cnpj: str, timeout: float | None = None) -> DownloadEvent | None:
+        """
+        Bloqueia até um download do CNPJ terminar.
+
+        Returns:
+            O evento do download, ou None se o tempo acabou.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                event = next((e for e in self.events if e.cnpj == cnpj), None)
+                if event is not None:
+                    return event
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._lock.wait(remaining)
+
+    def wait_idle(self, timeout: float) -> bool:
+        """
+        Bloqueia até não haver downloads em andamento.
+
+        Returns:
+            False se ainda havia downloads em andamento ao fim do tempo.
+        """
+        deadline = time.monotonic() + timeout
+        # Garante que arquivos recém-gravados já estejam registrados
+        self._poll_once()
+        with self._lock:
+            while self._pending or self._partials:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(min(remaining, self._poll_interval_s))
+            return True
+
+    # --- Interno ---
+
+    def _scan(self) -> list[str]:
+        try:
+            with os.scandir(self._folder) as it:
+                return [e.path for e in it if e.is_file()]
+        except OSError:
+            return []
+
+    def _touch(self, path: str):
+        """Registra um arquivo novo ou alterado na pasta."""
+        with self._lock:
+            if path in self._known:
+                return
+            if is_partial(path):
+                self._partials.setdefault(path, self._active)
+                return
+            if path not in self._pending:
+                self._pending[path] = _Pending(self._target_for(path))
+
+    def _target_for(self, path: str) -> DownloadTarget:
+        """Origem de um arquivo final: a do temporário que o gerou."""
+        for partial, target in self._partials.items():
+            if _final_name(partial) == path:
+                return target
+        # Sem nome correspondente: o temporário sem nome mais antigo
+        for partial, target in self._partials.items():
+            if _final_name(partial) is None:
+                del self._partials[partial]
+                return target
+        # Temporário não visto (download rápido): quem estava ativo quando o
+        # arquivo foi gravado
+        try:
+            written_at = os.path.getmtime(path)
+        except OSError:
+            return self._active
+        for activated_at, target in reversed(self._history):
+            if activated_at <= written_at:
+                return target
+        return self._active
+
+    def _check_loop(self):
+        while not self._stop.wait(self._poll_interval_s):
+            self._poll_once()
+
+    def _poll_once(self):
+        """Varre a pasta (sem watchdog) e emite os downloads prontos."""
+        if self._observer is None:
+            for path in self._scan():
+                self._touch(path)
+        try:
+            self._check_pending()
+        except Exception as ex:
+            logger.warning(f"Erro ao verificar downloads: {ex}")
+
+    def _check_pending(self):
+        """Emite os arquivos cujo tamanho estabilizou."""
+        now = time.monotonic()
+        completed: list[DownloadEvent] = []
+
+        with self._lock:
+            # Temporários que sumiram (renomeados ou cancelados)
+            for partial in [p for p in self._partials if not os.path.exists(p)]:
+                del self._partials[partial]
+
+            for path, pending in list(self._pending.items()):
+                if any(_final_name(p) == path for p in self._partials):
+                    continue  # Chrome ainda está escrevendo
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    del self._pending[path]  # Apagado antes de terminar
+                    continue
+
+                if size != pending.size:
+                    pending.size = size
+                    pending.stable_since = now
+                    continue
+                if now - pending.stable_since < self._settle_s:
+                    continue
+
+                del self._pending[path]
+                self._known.add(path)
+                event = DownloadEvent(
+                    path=path,
+                    size=size,
+                    cnpj=pending.target.cnpj,
+                    window=pending.target.window,
+                    completed_at=time.time(),
+                )
+                self.events.append(event)
+                completed.append(event)
+
+            if completed:
+                self._lock.notify_all()
+
+        for event in completed:
+            logger.info(
+                f"Download concluído: {os.path.basename(event.path)} "
+                f"({event.size} bytes, CNPJ {event.cnpj})"
+            )
+            if self._on_complete is not None:
+                try:
+                    self._on_complete(event)
+                except Exception as ex:
+                    logger.warning(f"Erro no callback de download: {ex}")
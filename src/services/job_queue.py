@@ -0,0 +1,353 @@
+"""
+Fila de execuções (jobs) de download compartilhada pelo app.
+
+Permite enfileirar vários downloads (perfis, planilhas ou períodos
+diferentes) enquanto outro está rodando. A fila é do app, não das views:
+os jobs continuam rodando ao trocar de tela. Cada job tem progresso,
+status e cancelamento próprios; jobs pendentes podem ser reordenados e o
+número de jobs simultâneos é configurável.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable
+
+from auto_nfe import CancelledException
+
+from services.throughput import ThroughputEstimator, ThroughputSnapshot
+from utils.cancellation import CancelTimer
+
+logger = logging.getLogger(__name__)
+
+
+class JobState(Enum):
+    """Estados de um job."""
+
+    PENDING = "pendente"
+    RUNNING = "executando"
+    SUCCESS = "sucesso"
+    ERROR = "erro"
+    CANCELLED = "cancelado"
+
+
+class JobEvent(Enum):
+    """Tipos de evento enviados aos ouvintes da fila."""
+
+    UPDATE = "update"  # Estado, progresso ou mensagem mudou
+    INFO = "info"  # Notificação informativa (toast)
+    WARNING = "warning"  # Notificação de aviso (toast)
+    DETAIL = "detail"  # Item de job.details mudou (mensagem = chave, None = todos)
+    REMOVED = "removed"  # Job removido da fila
+
+
+@dataclass
+class Job:
+    """Um download enfileirado."""
+
+    id: int
+    kind: str
+    label: str
+    params: dict[str, Any]
+    state: JobState = JobState.PENDING
+    current: int = 0
+    total: int = 0
+    message: str = ""
+    waiting: bool = False  # Pausado aguardando o SEFAZ (backoff/circuito)
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    details: dict[str, Any] = field(default_factory=dict)  # Status por item (ex.: CNPJ)
+    throughput: ThroughputSnapshot | None = None  # Vazão e tempo restante estimados
+
+    @property
+    def progress(self) -> float | None:
+        """Fração concluída (None se o total ainda não é conhecido)."""
+        if self.total <= 0:
+            return None
+        return min(self.current / self.total, 1.0)
+
+    @property
+    def finished(self) -> bool:
+        """Indica se o job terminou (com sucesso, erro ou cancelado)."""
+        return self.state in (JobState.SUCCESS, JobState.ERROR, JobState.CANCELLED)
+
+
+JobListener = Callable[[Job, JobEvent, str | None], None]
+
+
+class JobContext:
+    """
+    Interface entregue ao executor do job para reportar progresso.
+
+    Pode ser usada a partir de qualquer thread.
+    """
+
+    def __init__(self, queue: "JobQueue", job: Job):
+        self._queue = queue
+        self.job = job
+        # Estimativa atualizada aqui, fora da UI, no máximo uma vez por segundo
+        self._throughput = ThroughputEstimator()
+
+    @property
+    def cancel_event(self) -> threading.Event:
+        """Evento de cancelamento do job."""
+        return self.job.cancel_event
+
+    def progress(self, current: int, total: int):
+        """Atualiza o progresso do job."""
+        self.job.current = current
+        self.job.total = total
+        snapshot = self._throughput.update(current, total)
+        if snapshot is not None:
+            self.job.throughput = snapshot
+        self._queue._emit(self.job, JobEvent.UPDATE)
+
+    def status(self, message: str, waiting: bool = False):
+        """
+        Atualiza a mensagem de status do job.
+
+        Args:
+            message: Texto exibido na fila e na área de progresso.
+            waiting: True enquanto o job está pausado aguardando o SEFAZ.
+        """
+        self.job.message = message
+        self.job.waiting = waiting
+        snapshot = self._throughput.set_paused(waiting)
+        if snapshot is not None:
+            self.job.throughput = snapshot
+        self._queue._emit(self.job, JobEvent.UPDATE)
+
+    def detail(self, key: str | None = None, value: Any = None):
+        """
+        Avisa que o status de um item do job mudou.
+
+        Args:
+            key: Chave do item em job.details (None = todos os itens).
+            value: Novo status do item (None = o objeto já foi alterado).
+        """
+        if key is not None and value is not None:
+            self.job.details[key] = value
+        self._queue._emit(self.job, JobEvent.DETAIL, key)
+
+    def info(self, message: str):
+        """Envia uma notificação informativa."""
+        self._queue._emit(self.job, JobEvent.INFO, message)
+
+    def warning(self, message: str):
+        """Envia uma notificação de aviso."""
+        self._queue._emit(self.job, JobEvent.WARNING, message)
+
+
+# Executor de um tipo de job: recebe o contexto e retorna a mensagem final
+JobRunner = Callable[[JobContext], Awaitable[str | None]]
+
+
+class JobQueue:
+    """
+    Fila de jobs com paralelismo configurável.
+
+    Uso:
+        queue = JobQueue()
+        queue.register_runner("nfe", run_nfe_job)
+        queue.start()
+        job = queue.submit("nfe", "Empresa A", params)
+    """
+
+    def __init__(self, parallelism: int = 1, max_finished: int = 50):
+        """
+        Args:
+            parallelism: Número de jobs executados simultaneamente.
+            max_finished: Quantos jobs finalizados manter visíveis na fila.
+        """
+        self._parallelism = max(parallelism, 1)
+        self._max_finished = max_finished
+        self._jobs: list[Job] = []
+        self._runners: dict[str, JobRunner] = {}
+        self._listeners: list[JobListener] = []
+        self._cancel_timers: dict[int, CancelTimer] = {}
+        self._ids = itertools.count(1)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        # Referências das tasks em execução (o loop só guarda referência fraca)
+        self._tasks: set[asyncio.Task] = set()
+
+    # --- Configuração ---
+
+    def register_runner(self, kind: str, runner: JobRunner):
+        """Registra o executor de um tipo de job."""
+        self._runners[kind] = runner
+
+    def start(self):
+        """Associa a fila ao event loop atual (chamar dentro do loop do app)."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+    @property
+    def parallelism(self) -> int:
+        return self._parallelism
+
+    def set_parallelism(self, value: int):
+        """Altera o número de jobs simultâneos (mínimo 1)."""
+        self._parallelism = max(int(value), 1)
+        self._dispatch()
+
+    # --- Ouvintes ---
+
+    def subscribe(self, listener: JobListener) -> Callable[[], None]:
+        """
+        Registra um ouvinte de eventos da fila.
+
+        Returns:
+            Função que cancela a inscrição.
+        """
+        self._listeners.append(listener)
+
+        def unsubscribe():
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def _emit(self, job: Job, event: JobEvent, message: str | None = None):
+        """Notifica os ouvintes, sempre na thread do event loop."""
+        if self._loop is not None and threading.get_ident() != self._loop_thread:
+            self._loop.call_soon_threadsafe(self._notify, job, event, message)
+        else:
+            self._notify(job, event, message)
+
+    def _notify(self, job: Job, event: JobEvent, message: str | None):
+        for listener in list(self._listeners):
+            try:
+                listener(job, event, message)
+            except Exception as ex:
+                logger.warning(f"Erro em ouvinte da fila: {ex}")
+
+    # --- Operações ---
+
+    def jobs(self, kind: str | None = None) -> list[Job]:
+        """Lista os jobs na ordem da fila (opcionalmente por tipo)."""
+        return [j for j in self._jobs if kind is None or j.kind == kind]
+
+    def get(self, job_id: int) -> Job | None:
+        """Retorna o job pelo ID."""
+        return next((j for j in self._jobs if j.id == job_id), None)
+
+    def submit(self, kind: str, label: str, params: dict[str, Any]) -> Job:
+        """
+        Enfileira um novo job.
+
+        Raises:
+            ValueError: Se não houver executor registrado para o tipo.
+        """
+        if kind not in self._runners:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+
+        job = Job(id=next(self._ids), kind=kind, label=label, params=params)
+        self._jobs.append(job)
+        self._prune_finished()
+        self._emit(job, JobEvent.UPDATE)
+        self._dispatch()
+        return job
+
+    def cancel(self, job_id: int):
+        """Cancela um job pendente (remove) ou em execução (sinaliza)."""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return
+
+        if job.state == JobState.PENDING:
+            job.state = JobState.CANCELLED
+            job.finished_at = time.time()
+            self._emit(job, JobEvent.UPDATE)
+            return
+
+        timer = self._cancel_timers.setdefault(job.id, CancelTimer(job.label))
+        timer.start()
+        job.cancel_event.set()
+        job.message = "Cancelando..."
+        self._emit(job, JobEvent.UPDATE)
+
+    def move(self, job_id: int, delta: int):
+        """Move um job pendente para cima (delta < 0) ou para baixo na fila."""
+        job = self.get(job_id)
+        if job is None or job.state != JobState.PENDING:
+            return
+
+        pending = [j for j in self._jobs if j.state == JobState.PENDING]
+        index = pending.index(job)
+        new_index = min(max(index + delta, 0), len(pending) - 1)
+        if new_index == index:
+            return
+
+        # Troca de posição com o job pendente vizinho
+        other = pending[new_index]
+        i, k = self._jobs.index(job), self._jobs.index(other)
+        self._jobs[i], self._jobs[k] = self._jobs[k], self._jobs[i]
+        self._emit(job, JobEvent.UPDATE)
+        self._emit(other, JobEvent.UPDATE)
+
+    def remove_finished(self):
+        """Remove da lista os jobs já finalizados."""
+        for job in [j for j in self._jobs if j.finished]:
+            self._jobs.remove(job)
+            self._emit(job, JobEvent.REMOVED)
+
+    def _prune_finished(self):
+        """Limita a quantidade de jobs finalizados mantidos na lista."""
+        finished = [j for j in self._jobs if j.finished]
+        for job in finished[: max(len(finished) - self._max_finished, 0)]:
+            self._jobs.remove(job)
+            self._emit(job, JobEvent.REMOVED)
+
+    # --- Execução ---
+
+    def _dispatch(self):
+        """Inicia jobs pendentes até atingir o paralelismo configurado."""
+        if self._loop is None:
+            return
+
+        running = sum(1 for j in self._jobs if j.state == JobState.RUNNING)
+        for job in self._jobs:
+            if running >= self._parallelism:
+                break
+            if job.state == JobState.PENDING:
+                job.state = JobState.RUNNING
+                job.started_at = time.time()
+                running += 1
+                task = self._loop.create_task(self._run(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job):
+        """Executa um job e registra o resultado."""
+        runner = self._runners[job.kind]
+        context = JobContext(self, job)
+        self._emit(job, JobEvent.UPDATE)
+
+        try:
+            message = await runner(context)
+            job.state = JobState.SUCCESS
+            job.message = message or "Download completado com sucesso!"
+        except CancelledException:
+            job.state = JobState.CANCELLED
+            job.message = "Cancelado"
+        except Exception as ex:
+            logger.exception(f"Erro no job {job.label}: {ex}")
+            job.state = JobState.ERROR
+            job.error = str(ex)
+            job.message = f"Erro: {ex}"
+        finally:
+            job.waiting = False
+            job.finished_at = time.time()
+            timer = self._cancel_timers.pop(job.id, None)
+            if timer is not None:
+                timer.finish()
+            self._emit(job, JobEvent.UPDATE)
+            self._dispatch()
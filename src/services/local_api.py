@@ -0,0 +1,450 @@
+"""
+API HTTP/JSON local para disparar downloads a partir de outros programas.
+
+Ativada pela variável de ambiente AUTO_NFE_API=1 (porta em
+AUTO_NFE_API_PORT, padrão 8765). O servidor escuta só em 127.0.0.1, roda
+no mesmo event loop do app e usa a mesma JobQueue das telas: todos os
+chamadores compartilham o processo já aberto (pool de clientes,
+certificados carregados, fila e limites do SEFAZ).
+
+Toda requisição precisa do token salvo em API_TOKEN_PATH, no cabeçalho
+`Authorization: Bearer <token>` ou no parâmetro `?token=` (para
+EventSource, que não envia cabeçalhos).
+
+Rotas:
+    GET  /jobs                   Lista os jobs (filtro opcional ?kind=nfe|nfse)
+    POST /jobs/nfe               Enfileira um download de NF-e
+    POST /jobs/nfse              Enfileira um download de NFS-e
+    GET  /jobs/<id>              Estado de um job
+    GET  /jobs/<id>/events       Progresso em server-sent events até o fim do job
+    POST /jobs/<id>/cancel       Cancela um job
+"""
+
+import asyncio
+import dataclasses
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+from datetime import datetime
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from config.paths import (
+    API_TOKEN_PATH,
+    EMPRESAS_NFE_PATH,
+    EMPRESAS_NFSE_PATH,
+    PROFILE_PATH,
+)
+from services.config_watcher import config_watcher
+from services.job_queue import Job, JobEvent, JobQueue
+from services.nfe_consulta import nsu_sync_available
+from services.nfe_job import MODE_NSU, MODE_SHEET
+from services.nfe_worker import worker_available
+from services.run_history import KIND_NFE, KIND_NFSE
+
+logger = logging.getLogger(__name__)
+
+ENV_FLAG = "AUTO_NFE_API"
+DEFAULT_PORT = int(os.environ.get("AUTO_NFE_API_PORT", "8765"))
+HOST = "127.0.0.1"
+
+_MAX_HEADER_BYTES = 64 * 1024
+_MAX_BODY_BYTES = 1024 * 1024
+_SSE_HEARTBEAT_S = 15.0
+
+_JOB_PATH = re.compile(r"^/jobs/(\d+)(/events|/cancel)?$")
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+def local_api_enabled() -> bool:
+    """Indica se a API local foi ligada pela variável de ambiente."""
+    return os.environ.get(ENV_FLAG, "").strip().lower() in ("1", "true", "sim")
+
+
+def load_api_token(path: str = API_TOKEN_PATH) -> str:
+    """Lê o token da API, criando um novo na primeira vez."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            token = f.read().strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+
+    token = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(token)
+    logger.info(f"Token da API local criado em {path}")
+    return token
+
+
+class ApiError(Exception):
+    """Erro devolvido ao cliente com o status HTTP informado."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def job_to_dict(job: Job) -> dict[str, Any]:
+    """Representação JSON de um job (sem os parâmetros, que têm senhas)."""
+    details = {
+        key: dataclasses.asdict(value) if dataclasses.is_dataclass(value) else value
+        for key, value in job.details.items()
+    }
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "label": job.label,
+        "state": job.state.value,
+        "finished": job.finished,
+        "current": job.current,
+        "total": job.total,
+        "progress": job.progress,
+        "message": job.message,
+        "waiting": job.waiting,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "details": details,
+        "throughput": dataclasses.asdict(job.throughput) if job.throughput else None,
+    }
+
+
+def _digits(value: Any) -> str:
+    return re.sub(r"\D", "", str(value or ""))
+
+
+def _require(params: dict, *keys: str):
+    missing = [key for key in keys if not str(params.get(key) or "").strip()]
+    if missing:
+        raise ApiError(400, f"Campos obrigatórios: {', '.join(missing)}")
+
+
+def _check_date(params: dict, key: str) -> datetime:
+    try:
+        return datetime.strptime(str(params[key]).strip(), "%d/%m/%Y")
+    except ValueError:
+        raise ApiError(400, f"{key} com formato inválido (use dd/mm/aaaa)")
+
+
+def build_nfe_params(body: dict) -> dict[str, Any]:
+    """
+    Monta os parâmetros de um job de NF-e (os mesmos do PlanilhaForm).
+
+    `profile` (nome ou CNPJ/CPF de empresas_nfe.toml) preenche os campos
+    não informados no corpo. `mode` = "nsu" sincroniza pelo último NSU
+    (sem planilha).
+    """
+    profile: dict = {}
+    wanted = body.get("profile")
+    if wanted:
+        empresas = config_watcher.snapshot(EMPRESAS_NFE_PATH).data.get("empresas", [])
+        profile = next(
+            (
+                p
+                for p in empresas
+                if p.get("nome") == wanted
+                or (_digits(wanted) and _digits(p.get("cnpj_cpf")) == _digits(wanted))
+            ),
+            None,
+        )
+        if profile is None:
+            raise ApiError(404, f"Perfil não encontrado: {wanted}")
+
+    mode = body.get("mode", MODE_SHEET)
+    if mode not in (MODE_SHEET, MODE_NSU):
+        raise ApiError(400, f"Modo inválido: {mode} (use '{MODE_SHEET}' ou '{MODE_NSU}')")
+    if mode == MODE_NSU and not nsu_sync_available():
+        raise ApiError(
+            400, f"Modo '{MODE_NSU}' requer uma versão do auto_nfe com consulta_nsu"
+        )
+
+    cnpj_cpf = _digits(body.get("cnpj_cpf") or profile.get("cnpj_cpf"))
+    params = {
+        "mode": mode,
+        "cnpj_cpf": cnpj_cpf,
+        "profile_name": profile.get("nome") or cnpj_cpf,
+        "cert_path": body.get("cert_path") or profile.get("caminho_certificado", ""),
+        "password": body.get("password") or profile.get("senha", ""),
+        "sheet_path": body.get("sheet_path") or profile.get("caminho_relacao", ""),
+        "folder_path": body.get("folder_path") or profile.get("pasta_xml", ""),
+        "only_missing": bool(body.get("only_missing", False)),
+        "isolated_process": bool(body.get("isolated_process", False)),
+    }
+    _require(params, "cnpj_cpf", "cert_path", "password", "folder_path")
+    if mode == MODE_SHEET:
+        _require(params, "sheet_path")
+    if len(cnpj_cpf) not in (11, 14):
+        raise ApiError(400, "CNPJ/CPF deve ter 11 ou 14 dígitos")
+    if params["isolated_process"] and not worker_available():
+        raise ApiError(400, "isolated_process indisponível nesta instalação (flet build)")
+    return params
+
+
+def build_nfse_params(body: dict) -> dict[str, Any]:
+    """
+    Monta os parâmetros de um job de NFS-e (os mesmos do NfseWebForm).
+
+    Usuário, senha e pasta vêm da seção [nfse] do profile.toml e os CNPJs
+    das empresas selecionadas em empresas_nfse.toml, se não informados.
+    """
+    nfse = config_watcher.snapshot(PROFILE_PATH).data.get("nfse", {})
+    cnpjs = body.get("cnpjs")
+    if cnpjs is None:
+        empresas = config_watcher.snapshot(EMPRESAS_NFSE_PATH).data.get("empresas", [])
+        cnpjs = [e.get("cnpj_cpf", "") for e in empresas if e.get("selecionada", False)]
+    if not isinstance(cnpjs, list) or not cnpjs:
+        raise ApiError(400, "Informe ao menos um CNPJ em 'cnpjs'")
+
+    params = {
+        "usuario": body.get("usuario") or nfse.get("usuario", ""),
+        "senha": body.get("senha") or nfse.get("senha", ""),
+        "cnpjs": [str(c) for c in cnpjs],
+        "data_inicial": body.get("data_inicial", ""),
+        "data_final": body.get("data_final", ""),
+        "download_path": body.get("download_path") or nfse.get("pasta_relatorio", ""),
+    }
+    _require(params, "usuario", "senha", "data_inicial", "data_final", "download_path")
+    if _check_date(params, "data_final") < _check_date(params, "data_inicial"):
+        raise ApiError(400, "data_final deve ser maior ou igual a data_inicial")
+    return params
+
+
+class LocalApiServer:
+    """
+    Servidor HTTP mínimo (asyncio, sem dependências) sobre a JobQueue.
+
+    Uso:
+        api = LocalApiServer(job_queue)
+        await api.start()
+    """
+
+    def __init__(
+        self, job_queue: JobQueue, port: int = DEFAULT_PORT, token: str | None = None
+    ):
+        """
+        Args:
+            job_queue: Fila de jobs do app.
+            port: Porta em 127.0.0.1.
+            token: Token exigido nas requisições (None = lido/criado em API_TOKEN_PATH).
+        """
+        self._job_queue = job_queue
+        self._port = port
+        self._token = token or load_api_token()
+        self._server: asyncio.Server | None = None
+
+    async def start(self):
+        """Abre a porta; se já estiver em uso (outra instância), só registra o aviso."""
+        try:
+            self._server = await asyncio.start_server(self._handle, HOST, self._port)
+        except OSError as ex:
+            logger.warning(f"API local indisponível na porta {self._port}: {ex}")
+            return
+        logger.info(f"API local em http://{HOST}:{self._port}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    # --- HTTP ---
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, target, headers, body = await self._read_request(reader)
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+            self._authorize(headers, query)
+
+            match = _JOB_PATH.match(url.path)
+            if match and match.group(2) == "/events":
+                if method != "GET":
+                    raise ApiError(405, "Use GET")
+                await self._stream_events(writer, int(match.group(1)))
+                return
+
+            status, payload = self._route(method, url.path, query, body)
+            await self._respond(writer, status, payload)
+        except ApiError as ex:
+            await self._respond(writer, ex.status, {"error": str(ex)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as ex:
+            logger.exception(f"Erro na API local: {ex}")
+            await self._respond(writer, 500, {"error": str(ex)})
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise ApiError(413, "Cabeçalho muito grande")
+        if len(head) > _MAX_HEADER_BYTES:
+            raise ApiError(413, "Cabeçalho muito grande")
+
+        lines = head.decode("iso-8859-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise ApiError(400, "Requisição inválida")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length") or 0)
+        if length > _MAX_BODY_BYTES:
+            raise ApiError(413, "Corpo muito grande")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    def _authorize(self, headers: dict, query: dict):
+        auth = headers.get("authorization", "")
+        token = auth[7:] if auth.lower().startswith("bearer ") else ""
+        token = token or (query.get("token") or [""])[0]
+        if not hmac.compare_digest(token.encode(), self._token.encode()):
+            raise ApiError(401, "Token inválido")
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        try:
+            writer.write(head.encode("ascii") + data)
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+    # --- Rotas ---
+
+    def _route(self, method: str, path: str, query: dict, body: bytes) -> tuple[int, Any]:
+        if path == "/jobs":
+            if method != "GET":
+                raise ApiError(405, "Use GET")
+            kind = (query.get("kind") or [None])[0]
+            return 200, [job_to_dict(j) for j in self._job_queue.jobs(kind)]
+
+        if path in ("/jobs/nfe", "/jobs/nfse"):
+            if method != "POST":
+                raise ApiError(405, "Use POST")
+            kind = KIND_NFE if path == "/jobs/nfe" else KIND_NFSE
+            return 201, job_to_dict(self._submit(kind, body))
+
+        match = _JOB_PATH.match(path)
+        if match is None:
+            raise ApiError(404, "Rota não encontrada")
+        job = self._job_queue.get(int(match.group(1)))
+        if job is None:
+            raise ApiError(404, "Job não encontrado")
+
+        if match.group(2) == "/cancel":
+            if method != "POST":
+                raise ApiError(405, "Use POST")
+            self._job_queue.cancel(job.id)
+            return 200, job_to_dict(job)
+
+        if method != "GET":
+            raise ApiError(405, "Use GET")
+        return 200, job_to_dict(job)
+
+    def _submit(self, kind: str, body: bytes) -> Job:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise ApiError(400, "JSON inválido")
+        if not isinstance(data, dict):
+            raise ApiError(400, "O corpo deve ser um objeto JSON")
+
+        if kind == KIND_NFE:
+            params = build_nfe_params(data)
+            label = params["profile_name"]
+        else:
+            params = build_nfse_params(data)
+            label = f"{params['usuario']} ({params['data_inicial']} a {params['data_final']})"
+        job = self._job_queue.submit(kind, label, params)
+        logger.info(f"API local: job {job.id} ({job.kind}) enfileirado: {job.label}")
+        return job
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, job_id: int):
+        """Envia os eventos do job em SSE até ele terminar ou o cliente sair."""
+        job = self._job_queue.get(job_id)
+        if job is None:
+            raise ApiError(404, "Job não encontrado")
+
+        events: asyncio.Queue = asyncio.Queue()
+
+        def listener(changed: Job, event: JobEvent, message: str | None):
+            # Chamado na thread do event loop (garantido pela JobQueue)
+            if changed.id == job_id:
+                events.put_nowait((event, message))
+
+        unsubscribe = self._job_queue.subscribe(listener)
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream; charset=utf-8\r\n"
+                b"Cache-Control: no-cache\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            await self._send_event(writer, "update", job_to_dict(job))
+
+            while not job.finished:
+                try:
+                    first = await asyncio.wait_for(events.get(), timeout=_SSE_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                    await writer.drain()
+                    continue
+
+                # Junta a rajada de eventos pendentes: avisos vão um a um,
+                # progresso e detalhes só no estado mais recente
+                batch = [first]
+                while not events.empty():
+                    batch.append(events.get_nowait())
+                if any(event == JobEvent.REMOVED for event, _ in batch):
+                    break
+                for event, message in batch:
+                    if event in (JobEvent.INFO, JobEvent.WARNING):
+                        await self._send_event(writer, event.value, {"message": message})
+                if any(event == JobEvent.DETAIL for event, _ in batch):
+                    await self._send_event(writer, "detail", job_to_dict(job)["details"])
+                if any(event == JobEvent.UPDATE for event, _ in batch):
+                    await self._send_event(writer, "update", job_to_dict(job))
+
+            await self._send_event(writer, "end", job_to_dict(job))
+        except (ConnectionError, OSError):
+            pass  # Cliente desconectou
+        finally:
+            unsubscribe()
+
+    async def _send_event(self, writer: asyncio.StreamWriter, name: str, payload: Any):
+        data = json.dumps(payload, ensure_ascii=False)
+        writer.write(f"event: {name}\ndata: {data}\n\n".encode("utf-8"))
+        await writer.drain()
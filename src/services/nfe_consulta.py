@@ -0,0 +1,290 @@
+"""
+Ponto único de chamada das consultas do ClientNfe.
+
+O ClientNfe só consulta a partir de uma planilha (consulta_planilha). Para
+consultar parte das chaves (modo "somente faltantes"), o app grava em uma
+pasta temporária uma cópia da planilha só com essas linhas
+(planilha_cache.RelationTemplate) e a entrega ao cliente.
+
+Com um limitador, cada chave consultada gasta uma ficha do orçamento do
+CNPJ. Uma lista de chaves é enviada ao cliente em lotes do tamanho das
+fichas liberadas, um arquivo por lote; na consulta pela planilha inteira
+(sem lotes), a consulta só começa com orçamento disponível e o consumo é
+descontado pelo progresso, acumulado nos callbacks e gravado
+periodicamente fora do event loop.
+
+A sincronização por NSU usa ClientNfe.consulta_nsu quando a versão do
+auto_nfe oferece o método (ver consulta_nsu abaixo).
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+from typing import Any, Callable
+
+from auto_nfe import ClientNfe
+
+from services.planilha_cache import RelationTemplate
+from services.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre descontos do consumo acumulado nos callbacks
+_USAGE_FLUSH_S = 5.0
+
+
+class _UsageMeter:
+    """
+    Conta as requisições informadas pelos callbacks do cliente e as
+    desconta do orçamento fora do event loop.
+
+    Os callbacks só atualizam um contador em memória; o desconto (uma
+    transação SQLite) roda em thread a cada _USAGE_FLUSH_S e no fim da
+    consulta, quando as fichas reservadas e não usadas são devolvidas.
+    """
+
+    def __init__(self, limiter: RateLimiter, cnpj: str, paid: int):
+        """
+        Args:
+            limiter: Orçamento de requisições por CNPJ.
+            cnpj: CNPJ/CPF dono do certificado.
+            paid: Fichas já reservadas antes da consulta.
+        """
+        self._limiter = limiter
+        self._cnpj = cnpj
+        self._charged = paid
+        self.used = 0
+
+    def record(self, used: int):
+        """Registra o total de requisições feitas até agora (só memória)."""
+        self.used = max(self.used, used)
+
+    async def flush(self):
+        """Desconta do orçamento o uso além do que já foi cobrado."""
+        extra = self.used - self._charged
+        if extra > 0:
+            self._charged += extra
+            await asyncio.to_thread(self._limiter.consume, self._cnpj, extra)
+
+    async def run(self):
+        """Desconta o uso periodicamente enquanto a consulta roda."""
+        while True:
+            await asyncio.sleep(_USAGE_FLUSH_S)
+            await self.flush()
+
+    async def settle(self):
+        """Acerto final: desconta o restante ou devolve as fichas não usadas."""
+        await self.flush()
+        await asyncio.to_thread(self._limiter.refund, self._cnpj, self._charged - self.used)
+
+
+
+def nsu_sync_available() -> bool:
+    """Indica se a versão instalada do auto_nfe sincroniza por NSU."""
+    return supports_nsu_sync(ClientNfe)
+
+
+def supports_nsu_sync(client: ClientNfe) -> bool:
+    """Indica se o cliente sabe baixar documentos a partir de um NSU."""
+    return callable(getattr(client, "consulta_nsu", None))
+
+
+async def consulta_nsu(
+    client: ClientNfe,
+    folder_path: str,
+    ult_nsu: int,
+    callback_nsu: Callable[[int, int], None],
+    limiter: RateLimiter | None = None,
+    cnpj: str | None = None,
+    on_wait: Callable[[str], None] | None = None,
+    **kwargs: Any,
+) -> Any:
+    """
+    Baixa para a pasta os documentos com NSU maior que `ult_nsu`.
+
+    O cliente consulta a distribuição do SEFAZ em lotes e chama
+    callback_nsu(ult_nsu, max_nsu) após gravar cada lote, para que a
+    posição seja salva mesmo se a execução for interrompida.
+
+    Args:
+        client: Cliente NF-e já construído (com suporte a consulta_nsu).
+        folder_path: Pasta de destino dos XMLs.
+        ult_nsu: Último NSU já processado (0 = desde o início).
+        callback_nsu: Recebe a posição após cada lote.
+        limiter: Orçamento de requisições por CNPJ (cada lote gasta uma ficha).
+        cnpj: CNPJ/CPF dono do certificado (obrigatório com limiter).
+        on_wait: Recebe o status enquanto aguarda orçamento.
+        **kwargs: Callbacks e cancel_event repassados ao cliente.
+
+    Raises:
+        RuntimeError: Se a versão do auto_nfe não suporta a consulta por NSU.
+    """
+    if not supports_nsu_sync(client):
+        raise RuntimeError(
+            "Versão do auto_nfe sem suporte a sincronização por NSU; "
+            "atualize o auto_nfe ou use a consulta por planilha"
+        )
+
+    if limiter is None:
+        return await client.consulta_nsu(
+            ult_nsu, folder_path, callback_nsu=callback_nsu, **kwargs
+        )
+
+    # Começa com orçamento; a primeira ficha paga o primeiro lote
+    paid = await limiter.acquire(
+        cnpj, 1, kwargs["cancel_event"], on_wait or kwargs["callback_status"]
+    )
+
+    meter = _UsageMeter(limiter, cnpj, paid)
+
+    def batch_done(batch_nsu: int, max_nsu: int):
+        meter.record(meter.used + 1)
+        callback_nsu(batch_nsu, max_nsu)
+
+    flusher = asyncio.create_task(meter.run())
+    try:
+        return await client.consulta_nsu(
+            ult_nsu, folder_path, callback_nsu=batch_done, **kwargs
+        )
+    finally:
+        flusher.cancel()
+        await meter.settle()
+
+
+async def consulta_nfe(
+    client: ClientNfe,
+    sheet_path: str,
+    folder_path: str,
+    keys: list[str] | None = None,
+    limiter: RateLimiter | None = None,
+    cnpj: str | None = None,
+    on_wait: Callable[[str], None] | None = None,
+    **kwargs: Any,
+) -> Any:
+    """
+    Executa a consulta de NF-e pela planilha inteira ou por parte das chaves.
+
+    Args:
+        client: Cliente NF-e já construído.
+        sheet_path: Caminho da planilha de relação.
+        folder_path: Pasta de destino dos XMLs.
+        keys: Chaves a consultar, na ordem (None = todas as da planilha).
+        limiter: Orçamento de requisições por CNPJ (None = sem limite).
+        cnpj: CNPJ/CPF dono do certificado (obrigatório com limiter).
+        on_wait: Recebe o status enquanto aguarda orçamento.
+        **kwargs: Callbacks e cancel_event repassados ao cliente.
+
+    Raises:
+        SheetParseError: Se a planilha parcial não puder ser gravada.
+    """
+    if keys is None:
+        if limiter is None:
+            return await client.consulta_planilha(sheet_path, folder_path, **kwargs)
+        return await _consulta_sheet_limited(
+            client, sheet_path, folder_path, limiter, cnpj, on_wait, **kwargs
+        )
+
+    # Planilhas parciais: apagadas ao fim (erros de limpeza são ignorados para
+    # não mascarar o resultado, ex.: arquivo ainda aberto no Windows)
+    with tempfile.TemporaryDirectory(
+        prefix="auto_nfe_relacao_", ignore_cleanup_errors=True
+    ) as tmp_dir:
+        template = await asyncio.to_thread(RelationTemplate, sheet_path)
+        if limiter is None:
+            relation = await asyncio.to_thread(
+                template.write, keys, os.path.join(tmp_dir, "relacao")
+            )
+            return await client.consulta_planilha(relation, folder_path, **kwargs)
+        return await _consulta_keys_limited(
+            client,
+            template,
+            tmp_dir,
+            folder_path,
+            keys,
+            limiter,
+            cnpj,
+            on_wait,
+            **kwargs,
+        )
+
+
+async def _consulta_sheet_limited(
+    client: ClientNfe,
+    sheet_path: str,
+    folder_path: str,
+    limiter: RateLimiter,
+    cnpj: str,
+    on_wait: Callable[[str], None] | None,
+    callback_progress: Callable[[int, int], None],
+    callback_status: Callable[[str], None],
+    cancel_event,
+) -> Any:
+    # Sem lotes: começa com orçamento e desconta o consumo pelo progresso
+    paid = await limiter.acquire(cnpj, 1, cancel_event, on_wait or callback_status)
+    meter = _UsageMeter(limiter, cnpj, paid)
+
+    def sheet_progress(current, total):
+        meter.record(current)
+        callback_progress(current, total)
+
+    flusher = asyncio.create_task(meter.run())
+    try:
+        return await client.consulta_planilha(
+            sheet_path,
+            folder_path,
+            callback_progress=sheet_progress,
+            callback_status=callback_status,
+            cancel_event=cancel_event,
+        )
+    finally:
+        flusher.cancel()
+        await meter.settle()
+
+
+async def _consulta_keys_limited(
+    client: ClientNfe,
+    template: RelationTemplate,
+    tmp_dir: str,
+    folder_path: str,
+    keys: list[str],
+    limiter: RateLimiter,
+    cnpj: str,
+    on_wait: Callable[[str], None] | None,
+    callback_progress: Callable[[int, int], None],
+    callback_status: Callable[[str], None],
+    cancel_event,
+) -> Any:
+    on_wait = on_wait or callback_status
+    total = len(keys)
+    done = 0
+    result = None
+    while done < total:
+        granted = await limiter.acquire(cnpj, total - done, cancel_event, on_wait)
+        chunk = keys[done : done + granted]
+        used = 0
+
+        def chunk_progress(current, _chunk_total, offset=done):
+            nonlocal used
+            used = current
+            callback_progress(offset + current, total)
+
+        try:
+            relation = await asyncio.to_thread(
+                template.write, chunk, os.path.join(tmp_dir, f"relacao_{done}")
+            )
+            result = await client.consulta_planilha(
+                relation,
+                folder_path,
+                callback_progress=chunk_progress,
+                callback_status=callback_status,
+                cancel_event=cancel_event,
+            )
+        finally:
+            # Devolve as fichas das chaves que não chegaram a ser consultadas
+            await asyncio.to_thread(limiter.refund, cnpj, granted - used)
+
+        done += len(chunk)
+        if cancel_event.is_set():
+            break
+    return result
@@ -0,0 +1,261 @@
+"""
+Executor de jobs de download de NF-e (consulta por planilha ou
+sincronização por NSU).
+
+Reúne as etapas de uma execução: leitura da planilha via cache, modo
+"somente faltantes", empréstimo do cliente do pool, governador de
+requisições, orçamento de requisições por CNPJ e registro no histórico.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from auto_nfe import ClientNfe, CancelledException
+
+from services.client_pool import ClientPool
+from services.doc_catalog import DocumentCatalog
+from services.job_queue import JobContext
+from services.nfe_consulta import consulta_nfe, consulta_nsu
+from services.nsu_store import NsuStore
+from services.pasta_xml import missing_keys
+from services.planilha_cache import load_sheet_keys, SheetParseError
+from services.rate_limiter import RateLimiter, sefaz_rate_limiter
+from services.sefaz_governor import RequestGovernor, sefaz_governor
+from services.run_history import (
+    RunHistoryStore,
+    RunRecorder,
+    KIND_NFE,
+    STATUS_SUCCESS,
+    STATUS_ERROR,
+    STATUS_CANCELLED,
+)
+from utils.cancellation import await_cancellable
+
+logger = logging.getLogger(__name__)
+
+# Modos de consulta (job.params["mode"])
+MODE_SHEET = "planilha"
+MODE_NSU = "nsu"
+
+
+def _interrupt_requests(client: ClientNfe | None):
+    """Fecha a sessão HTTP do cliente para abortar requisições ao SEFAZ em andamento."""
+    session = getattr(client, "session", None)
+    if session is not None and hasattr(session, "close"):
+        session.close()
+
+
+class NfeJobRunner:
+    """
+    Executa um job de NF-e a partir dos valores do PlanilhaForm.
+
+    Parâmetros esperados em job.params: os mesmos de PlanilhaForm.get_values().
+    Com mode == MODE_NSU, baixa os documentos novos desde o último NSU
+    sincronizado do CNPJ/CPF, sem planilha.
+    """
+
+    def __init__(
+        self,
+        client_pool: ClientPool,
+        governor: RequestGovernor = sefaz_governor,
+        history: RunHistoryStore | None = None,
+        catalog: DocumentCatalog | None = None,
+        rate_limiter: RateLimiter = sefaz_rate_limiter,
+        nsu_store: NsuStore | None = None,
+    ):
+        """
+        Args:
+            client_pool: Pool de clientes NF-e do app.
+            governor: Governador de requisições ao SEFAZ.
+            history: Banco de histórico de execuções.
+            catalog: Catálogo local dos XMLs baixados.
+            rate_limiter: Orçamento de requisições por CNPJ.
+            nsu_store: Último NSU sincronizado por CNPJ/CPF.
+        """
+        self._client_pool = client_pool
+        self._governor = governor
+        self._history = history or RunHistoryStore()
+        self._catalog = catalog or DocumentCatalog()
+        self._rate_limiter = rate_limiter
+        self._nsu_store = nsu_store or NsuStore()
+
+    async def __call__(self, ctx: JobContext) -> str | None:
+        form_data = ctx.job.params
+        cancel_event = ctx.cancel_event
+        recorder = RunRecorder(self._history, KIND_NFE, form_data["profile_name"])
+        client: ClientNfe | None = None
+
+        def task_progress(current, total):
+            recorder.progress(current, total)
+            ctx.progress(current, total)
+            ctx.status(f"Baixando XMLs: {current}/{total}")
+
+        nsu_mode = form_data.get("mode") == MODE_NSU
+        cnpj_cpf = form_data["cnpj_cpf"]
+
+        try:
+            if nsu_mode:
+                keys = None
+
+                # Sem documentos novos na última consulta: o SEFAZ exige aguardar
+                nsu_state = await asyncio.to_thread(self._nsu_store.get, cnpj_cpf)
+                allowed_at = nsu_state.next_allowed_at()
+                if allowed_at > time.time():
+                    recorder.finish(STATUS_SUCCESS)
+                    return (
+                        f"Nenhum documento novo desde o NSU {nsu_state.ult_nsu}; "
+                        f"nova consulta a partir de "
+                        f"{time.strftime('%H:%M', time.localtime(allowed_at))}"
+                    )
+                ctx.info(f"Sincronizando a partir do NSU {nsu_state.ult_nsu}")
+            else:
+                # Sem "somente faltantes" o cliente lê a planilha inteira: ler
+                # as chaves aqui só duplicaria o trabalho
+                keys = None
+
+                # Modo "somente faltantes": remove chaves já presentes na pasta e
+                # entrega ao cliente uma planilha só com as que faltam
+                if form_data["only_missing"]:
+                    ctx.status("Lendo planilha...")
+                    try:
+                        # Do cache quando possível
+                        keys = await asyncio.to_thread(
+                            load_sheet_keys, form_data["sheet_path"]
+                        )
+                    except SheetParseError as ex:
+                        raise ValueError(
+                            "Não foi possível ler as chaves da planilha para o modo "
+                            f"\"Somente faltantes\": {ex}"
+                        ) from ex
+                    if not keys:
+                        raise ValueError("Nenhuma chave de acesso encontrada na planilha.")
+
+                    sheet_count = len(keys)
+                    keys = await asyncio.to_thread(
+                        missing_keys, keys, form_data["folder_path"]
+                    )
+                    recorder.items_total = len(keys)
+
+                    # Mostra as contagens antes de iniciar a consulta
+                    ctx.status(
+                        f"Faltantes: {len(keys)} "
+                        f"(planilha: {sheet_count}, já na pasta: {sheet_count - len(keys)})"
+                    )
+
+                    if not keys:
+                        recorder.finish(STATUS_SUCCESS)
+                        return "Todas as notas já estão na pasta."
+
+            # Empresta um cliente aquecido do pool (certificado e conexões reaproveitados)
+            ctx.status("Iniciando conexão...")
+            client = await self._client_pool.acquire(
+                cnpj_cpf,
+                form_data["cert_path"],
+                form_data["password"],
+            )
+
+            attempt_count = 0
+
+            def save_nsu(ult_nsu: int, max_nsu: int):
+                # Grava a posição a cada lote: uma interrupção não perde o avanço
+                self._nsu_store.save(cnpj_cpf, form_data["profile_name"], ult_nsu, max_nsu)
+
+            async def consulta_attempt(stop_event, status_callback):
+                nonlocal attempt_count
+                attempt_count += 1
+
+                attempt_keys = keys
+                if attempt_count > 1 and form_data["only_missing"] and keys is not None:
+                    # Nova tentativa: ignora o que já foi baixado antes da limitação
+                    attempt_keys = await asyncio.to_thread(
+                        missing_keys, keys, form_data["folder_path"]
+                    )
+
+                def stop_client():
+                    # Sinaliza parada ao cliente e aborta as requisições em andamento
+                    stop_event.set()
+                    _interrupt_requests(client)
+
+                if nsu_mode:
+                    # Nova tentativa retoma do último lote gravado
+                    state = await asyncio.to_thread(self._nsu_store.get, cnpj_cpf)
+                    consulta = consulta_nsu(
+                        client,
+                        form_data["folder_path"],
+                        state.ult_nsu,
+                        callback_nsu=save_nsu,
+                        limiter=self._rate_limiter,
+                        cnpj=cnpj_cpf,
+                        on_wait=lambda message: ctx.status(message, waiting=True),
+                        callback_progress=task_progress,
+                        callback_status=status_callback,
+                        cancel_event=stop_event,
+                    )
+                else:
+                    consulta = consulta_nfe(
+                        client,
+                        form_data["sheet_path"],
+                        form_data["folder_path"],
+                        keys=attempt_keys,
+                        limiter=self._rate_limiter,
+                        cnpj=cnpj_cpf,
+                        on_wait=lambda message: ctx.status(message, waiting=True),
+                        callback_progress=task_progress,
+                        callback_status=status_callback,
+                        cancel_event=stop_event,
+                    )
+
+                # Aguarda a consulta, interrompendo requisições em andamento no cancelamento
+                return await await_cancellable(consulta, cancel_event, on_cancel=stop_client)
+
+            def on_throttle():
+                recorder.failure()
+                # O SEFAZ limitou antes do previsto: o orçamento local está otimista
+                self._rate_limiter.drain(cnpj_cpf)
+
+            # Backoff e circuito por CNPJ em caso de limitação do SEFAZ
+            await self._governor.run(
+                cnpj_cpf,
+                consulta_attempt,
+                cancel_event=cancel_event,
+                on_status=lambda message: ctx.status(message, waiting=True),
+                callback_status=ctx.info,
+                on_throttle=on_throttle,
+            )
+
+            recorder.finish(STATUS_SUCCESS)
+            if nsu_mode:
+                nsu_state = await asyncio.to_thread(self._nsu_store.get, cnpj_cpf)
+                return f"Sincronizado até o NSU {nsu_state.ult_nsu}"
+            return None
+
+        except CancelledException:
+            recorder.finish(STATUS_CANCELLED)
+
+            # A sessão foi abortada no cancelamento: não reutiliza o cliente
+            if client is not None:
+                self._client_pool.release(client, healthy=False)
+                client = None
+            raise
+
+        except Exception as e:
+            recorder.failure()
+            recorder.finish(STATUS_ERROR, error=str(e))
+            raise
+
+        finally:
+            # Devolve o cliente ao pool (conexões continuam abertas)
+            if client is not None:
+                self._client_pool.release(client)
+
+            # Cataloga o que chegou à pasta, mesmo em caso de erro ou cancelamento
+            await self._update_catalog(form_data["folder_path"])
+
+    async def _update_catalog(self, folder: str):
+        """Indexa os XMLs novos da pasta no catálogo local."""
+        try:
+            await asyncio.to_thread(self._catalog.index_folder, folder)
+        except Exception as ex:
+            logger.warning(f"Erro ao atualizar o catálogo de documentos: {ex}")
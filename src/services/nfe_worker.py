@@ -0,0 +1,279 @@
+"""
+Execução de jobs de NF-e em um processo de trabalho isolado.
+
+O processo filho roda o NfeJobRunner no seu próprio event loop, mantendo o
+loop do Flet livre de qualquer trabalho pesado (assinatura, parsing de XML,
+leitura de planilha). Progresso, status e cancelamento atravessam a
+fronteira entre processos por uma conexão local autenticada. Se o processo filho morrer, os jobs
+em andamento falham com erro e um novo processo é criado no próximo job,
+sem derrubar a interface.
+
+O processo filho roda services.nfe_worker_child, um módulo mínimo que não
+carrega a interface. A partir do código-fonte ele é iniciado com o
+interpretador atual (`python -m services.nfe_worker_child`); num executável
+congelado, o próprio executável é iniciado com o argumento WORKER_ARG, que
+main.py desvia para o módulo do filho antes de qualquer import pesado. O
+app do `flet build` roda num Python embutido que não consegue iniciar
+processos filhos: lá worker_available() retorna False e os jobs rodam no
+app.
+
+Protocolo (tuplas enviadas pela conexão):
+    pai -> filho: ("run", job_id, params) | ("cancel", job_id) | ("stop",)
+    filho -> pai: ("progress", job_id, current, total)
+                  | ("status", job_id, message, waiting)
+                  | ("info", job_id, message) | ("warning", job_id, message)
+                  | ("done", job_id, message) | ("cancelled", job_id)
+                  | ("error", job_id, message)
+"""
+
+import asyncio
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+from multiprocessing.connection import Client, Connection
+from typing import Any
+
+from auto_nfe import CancelledException
+
+from services.job_queue import JobContext
+from services.nfe_worker_child import WORKER_ARG
+from utils.process_pool import process_pool_available
+
+logger = logging.getLogger(__name__)
+
+# Pasta src: o filho roda com ela como diretório de trabalho
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CHILD_MODULE = "services.nfe_worker_child"
+_CHILD_SOURCE = os.path.join(_SRC_DIR, "services", "nfe_worker_child.py")
+
+# Tempo máximo para o processo filho informar a porta
+_START_TIMEOUT_S = 30.0
+
+
+def worker_available() -> bool:
+    """
+    Indica se o processo de trabalho pode ser iniciado.
+
+    Exige um executável congelado (filho via WORKER_ARG) ou um interpretador
+    Python com o código-fonte do módulo do filho.
+    """
+    if not process_pool_available():
+        return False
+    return getattr(sys, "frozen", False) or os.path.isfile(_CHILD_SOURCE)
+
+
+def _child_command() -> list[str]:
+    """Linha de comando do processo filho."""
+    if getattr(sys, "frozen", False):
+        return [sys.executable, WORKER_ARG]
+    return [sys.executable, "-m", _CHILD_MODULE]
+
+
+class WorkerProcessError(Exception):
+    """O processo de trabalho encerrou inesperadamente."""
+
+
+class NfeWorkerProcess:
+    """
+    Gerencia o processo de trabalho de NF-e a partir da UI.
+
+    Uso:
+        worker = NfeWorkerProcess()
+        message = await worker.run(ctx)  # ctx: JobContext da fila
+    """
+
+    def __init__(self):
+        self._process: subprocess.Popen | None = None
+        self._conn: Connection | None = None
+        self._send_lock = threading.Lock()
+        self._start_lock: asyncio.Lock | None = None
+        self._pending: dict[int, tuple[JobContext, asyncio.Future]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    async def _ensure_started(self):
+        """Inicia (ou reinicia) o processo de trabalho."""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._is_alive() and self._conn is not None:
+                return
+            if not worker_available():
+                raise WorkerProcessError(
+                    "Processo isolado indisponível nesta instalação (flet build)"
+                )
+
+            self._loop = asyncio.get_running_loop()
+            authkey = secrets.token_bytes(32)
+            process = subprocess.Popen(
+                _child_command(),
+                cwd=_SRC_DIR,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+            try:
+                port = await asyncio.wait_for(
+                    asyncio.to_thread(self._handshake, process, authkey),
+                    timeout=_START_TIMEOUT_S,
+                )
+                conn = await asyncio.to_thread(
+                    Client, ("127.0.0.1", port), authkey=authkey
+                )
+            except BaseException:
+                process.kill()
+                raise
+
+            self._process = process
+            self._conn = conn
+            logger.info(f"Processo de trabalho NF-e iniciado (pid {process.pid})")
+
+            threading.Thread(target=self._read_events, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def _handshake(process: subprocess.Popen, authkey: bytes) -> int:
+        """Envia a chave ao filho e lê a porta em que ele aguarda a conexão."""
+        process.stdin.write(authkey.hex().encode() + b"\n")
+        process.stdin.close()
+        line = process.stdout.readline()
+        if not line.strip():
+            raise WorkerProcessError("O processo de trabalho não iniciou")
+        return int(line)
+
+    def _send(self, *message):
+        with self._send_lock:
+            self._conn.send(message)
+
+    def _read_events(self, conn: Connection):
+        """Thread que recebe eventos do processo filho."""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._handle_event(message)
+
+        # Processo morreu: falha os jobs pendentes deste processo
+        if conn is self._conn:
+            logger.error("Processo de trabalho NF-e encerrado")
+            self._loop.call_soon_threadsafe(self._fail_pending)
+
+    def _handle_event(self, message: tuple):
+        """Repassa um evento do processo filho para o JobContext do job."""
+        kind, job_id, *args = message
+        entry = self._pending.get(job_id)
+        if entry is None:
+            return
+        ctx, future = entry
+
+        if kind == "progress":
+            ctx.progress(*args)
+        elif kind == "status":
+            ctx.status(*args)
+        elif kind == "info":
+            ctx.info(*args)
+        elif kind == "warning":
+            ctx.warning(*args)
+        elif kind == "done":
+            self._loop.call_soon_threadsafe(self._resolve, job_id, args[0], None)
+        elif kind == "cancelled":
+            self._loop.call_soon_threadsafe(
+                self._resolve, job_id, None, CancelledException("Operação cancelada pelo usuário")
+            )
+        elif kind == "error":
+            self._loop.call_soon_threadsafe(self._resolve, job_id, None, Exception(args[0]))
+
+    def _resolve(self, job_id: int, result: Any, error: BaseException | None):
+        entry = self._pending.pop(job_id, None)
+        if entry is None or entry[1].done():
+            return
+        if error is not None:
+            entry[1].set_exception(error)
+        else:
+            entry[1].set_result(result)
+
+    def _fail_pending(self):
+        for job_id in list(self._pending):
+            self._resolve(
+                job_id,
+                None,
+                WorkerProcessError("O processo de trabalho encerrou inesperadamente"),
+            )
+
+    async def run(self, ctx: JobContext) -> str | None:
+        """
+        Executa o job no processo de trabalho e aguarda o resultado.
+
+        Raises:
+            CancelledException: Se o job for cancelado.
+            WorkerProcessError: Se o processo filho morrer durante o job.
+        """
+        await self._ensure_started()
+        job_id = ctx.job.id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[job_id] = (ctx, future)
+        try:
+            self._send("run", job_id, ctx.job.params)
+        except Exception:
+            # O job nunca chegou ao filho: não pode ficar esperando resposta
+            self._pending.pop(job_id, None)
+            raise
+
+        # Repassa o cancelamento ao processo filho
+        cancel_sent = False
+        while not future.done():
+            if ctx.cancel_event.is_set() and not cancel_sent:
+                cancel_sent = True
+                try:
+                    self._send("cancel", job_id)
+                except OSError:
+                    # Filho morreu: _read_events falha o job
+                    pass
+            await asyncio.wait({future}, timeout=0.05)
+
+        return future.result()
+
+    def stop(self):
+        """Encerra o processo de trabalho."""
+        if not self._is_alive():
+            return
+        try:
+            self._send("stop")
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+
+
+class IsolatedNfeJobRunner:
+    """
+    Executor de NF-e que escolhe o modo de execução pelo parâmetro
+    "isolated_process" do job: processo de trabalho ou event loop do app.
+    """
+
+    def __init__(self, inline_runner, worker: NfeWorkerProcess | None = None):
+        """
+        Args:
+            inline_runner: Executor usado no próprio processo (NfeJobRunner).
+            worker: Processo de trabalho (criado sob demanda se omitido).
+        """
+        self._inline_runner = inline_runner
+        self._worker = worker or NfeWorkerProcess()
+
+    @property
+    def worker(self) -> NfeWorkerProcess:
+        return self._worker
+
+    async def __call__(self, ctx: JobContext) -> str | None:
+        if ctx.job.params.get("isolated_process"):
+            if worker_available():
+                return await self._worker.run(ctx)
+            ctx.warning("Processo isolado indisponível nesta instalação: executando no app")
+        return await self._inline_runner(ctx)
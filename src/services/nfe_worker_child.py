@@ -0,0 +1,157 @@
+"""
+Ponto de entrada do processo de trabalho de NF-e.
+
+Executado como `python -m services.nfe_worker_child` a partir da pasta src,
+ou, num executável congelado, como `<app> --nfe-worker` (main.py desvia
+para main() deste módulo): não carrega flet nem as views, apenas o
+NfeJobRunner e suas dependências. O processo pai envia a chave de
+autenticação pela entrada padrão; o filho abre um Listener local, escreve a
+porta na saída padrão e aguarda a conexão. O protocolo de mensagens está
+descrito em services.nfe_worker.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+from multiprocessing.connection import Connection, Listener
+from typing import Any
+
+from auto_nfe import CancelledException
+
+logger = logging.getLogger(__name__)
+
+# Argumento que faz o executável congelado do app rodar como processo filho
+WORKER_ARG = "--nfe-worker"
+
+
+class _WorkerJob:
+    """Dados mínimos do job dentro do processo filho."""
+
+    def __init__(self, job_id: int, params: dict[str, Any]):
+        self.id = job_id
+        self.params = params
+
+
+class _RemoteContext:
+    """Implementa a interface de JobContext enviando eventos pela conexão."""
+
+    def __init__(self, conn: Connection, send_lock: threading.Lock, job: _WorkerJob):
+        self._conn = conn
+        self._send_lock = send_lock
+        self.job = job
+        self.cancel_event = threading.Event()
+
+    def _send(self, *message):
+        with self._send_lock:
+            self._conn.send(message)
+
+    def progress(self, current: int, total: int):
+        self._send("progress", self.job.id, current, total)
+
+    def status(self, message: str, waiting: bool = False):
+        self._send("status", self.job.id, message, waiting)
+
+    def info(self, message: str):
+        self._send("info", self.job.id, message)
+
+    def warning(self, message: str):
+        self._send("warning", self.job.id, message)
+
+
+async def _worker_loop(conn: Connection):
+    """Recebe comandos do processo pai e executa os jobs."""
+    # Imports pesados só depois da conexão estabelecida
+    from services.client_pool import ClientPool
+    from services.nfe_job import NfeJobRunner
+
+    loop = asyncio.get_running_loop()
+    client_pool = ClientPool()
+    client_pool.start()
+    runner = NfeJobRunner(client_pool)
+
+    send_lock = threading.Lock()
+    contexts: dict[int, _RemoteContext] = {}
+    commands: asyncio.Queue = asyncio.Queue()
+    # Referências das tasks em execução (o loop só guarda referência fraca)
+    tasks: set[asyncio.Task] = set()
+
+    def read_commands():
+        # Thread dedicada: conn.recv() é bloqueante
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                message = ("stop",)
+            loop.call_soon_threadsafe(commands.put_nowait, message)
+            if message[0] == "stop":
+                return
+
+    threading.Thread(target=read_commands, daemon=True).start()
+
+    async def run_job(ctx: _RemoteContext):
+        try:
+            message = await runner(ctx)
+            ctx._send("done", ctx.job.id, message)
+        except CancelledException:
+            ctx._send("cancelled", ctx.job.id)
+        except Exception as ex:
+            ctx._send("error", ctx.job.id, str(ex))
+        finally:
+            contexts.pop(ctx.job.id, None)
+
+    while True:
+        command = await commands.get()
+        if command[0] == "stop":
+            break
+        if command[0] == "run":
+            _, job_id, params = command
+            ctx = _RemoteContext(conn, send_lock, _WorkerJob(job_id, params))
+            contexts[job_id] = ctx
+            task = asyncio.create_task(run_job(ctx))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        elif command[0] == "cancel":
+            ctx = contexts.get(command[1])
+            if ctx is not None:
+                ctx.cancel_event.set()
+
+    await client_pool.close()
+
+
+def _read_line(fd: int) -> str:
+    """Lê uma linha de um descritor de arquivo, sem passar por sys.stdin."""
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = os.read(fd, 256)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode()
+
+
+def main():
+    """Faz o handshake com o processo pai e executa o loop de comandos."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - worker - %(levelname)s - %(message)s",
+        stream=sys.stderr,
+    )
+
+    # Descritores 0 e 1 direto: em executáveis sem console sys.stdin e
+    # sys.stdout podem ser None, mas os pipes do processo pai existem
+    authkey = bytes.fromhex(_read_line(0).strip())
+    with Listener(("127.0.0.1", 0), authkey=authkey) as listener:
+        # A porta é a única coisa escrita na saída padrão
+        os.write(1, f"{listener.address[1]}\n".encode())
+        conn = listener.accept()
+
+    try:
+        asyncio.run(_worker_loop(conn))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Executor de jobs de download de relatórios de NFS-e (ClientNfseWeb).
+
+Acompanha o status de cada CNPJ (estado, tempo, tentativas e tamanho do
+relatório) em job.details. Se o navegador falhar no meio da execução, o
+CNPJ em andamento é tentado de novo com um navegador novo, continuando a
+partir dele; esgotadas as tentativas, ele é marcado com erro e os demais
+seguem.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from auto_nfe import ClientNfseWeb, CancelledException
+
+from config.paths import CHROME_PROFILE_PATH
+from services.chrome_profile import prune_chrome_profile
+from services.download_watcher import DownloadEvent, DownloadWatcher
+from services.job_queue import JobContext
+from services.nfse_totais import PdfReader, extract_totals, write_totals
+from services.run_history import (
+    RunHistoryStore,
+    RunRecorder,
+    KIND_NFSE,
+    STATUS_SUCCESS,
+    STATUS_ERROR,
+    STATUS_CANCELLED,
+)
+from utils.cancellation import await_cancellable
+
+logger = logging.getLogger(__name__)
+
+CNPJ_PENDING = "pendente"
+CNPJ_RUNNING = "baixando"
+CNPJ_RETRYING = "tentando novamente"
+CNPJ_SUCCESS = "concluído"
+CNPJ_ERROR = "erro"
+CNPJ_CANCELLED = "cancelado"
+
+
+@dataclass
+class CnpjStatus:
+    """Status de um CNPJ dentro de um job de NFS-e."""
+
+    cnpj: str
+    state: str = CNPJ_PENDING
+    started_at: float | None = None
+    finished_at: float | None = None
+    retries: int = 0
+    file_size: int = 0
+    error: str | None = None
+
+    @property
+    def elapsed_s(self) -> float | None:
+        """Tempo gasto no CNPJ (até agora, se ainda estiver rodando)."""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+
+def abort_browser(client: ClientNfseWeb | None):
+    """
+    Aborta a navegação em andamento no ClientNfseWeb.
+
+    Encerra o processo do chromedriver, fazendo com que o carregamento de
+    página bloqueado na thread de trabalho falhe imediatamente.
+    """
+    driver = getattr(client, "driver", None) or getattr(client, "_driver", None)
+    if driver is None:
+        return
+
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is not None:
+        process.kill()
+        return
+
+    # Fallback: quit pode bloquear atrás do comando em andamento
+    threading.Thread(target=driver.quit, daemon=True).start()
+
+
+class NfseJobRunner:
+    """
+    Executa um job de NFS-e a partir dos valores do NfseWebForm.
+
+    Parâmetros esperados em job.params: os mesmos de NfseWebForm.get_values().
+    """
+
+    def __init__(self, history: RunHistoryStore | None = None, max_retries: int = 2):
+        """
+        Args:
+            history: Banco de histórico de execuções.
+            max_retries: Novas tentativas por CNPJ quando o navegador falha.
+        """
+        self._history = history or RunHistoryStore()
+        self._max_retries = max_retries
+
+        # O perfil do Chrome não pode ser aberto por dois navegadores ao mesmo tempo
+        self._browser_lock = asyncio.Lock()
+
+    async def __call__(self, ctx: JobContext) -> str | None:
+        form_data = ctx.job.params
+        cancel_event = ctx.cancel_event
+        cnpjs = list(form_data["cnpjs"])
+        download_path = form_data["download_path"]
+        recorder = RunRecorder(self._history, KIND_NFSE, form_data["usuario"])
+        recorder.items_total = len(cnpjs)
+        client: ClientNfseWeb | None = None
+
+        statuses = {cnpj: CnpjStatus(cnpj) for cnpj in cnpjs}
+        ctx.job.details = dict(statuses)
+        ctx.detail()
+
+        # Índice do primeiro CNPJ do navegador atual (avança a cada nova tentativa)
+        offset = 0
+        done = 0
+
+        def on_download(event: DownloadEvent):
+            # Chamado pela thread do observador da pasta de download
+            status = statuses.get(event.cnpj)
+            if status is not None:
+                status.file_size += event.size
+                ctx.detail(status.cnpj)
+
+        watcher = DownloadWatcher(download_path, on_complete=on_download)
+
+        def start_cnpj(index: int):
+            status = statuses[cnpjs[index]]
+            watcher.set_active(status.cnpj)
+            if status.state in (CNPJ_PENDING, CNPJ_RETRYING):
+                status.state = CNPJ_RUNNING
+                status.started_at = status.started_at or time.time()
+                ctx.detail(status.cnpj)
+
+        def finish_cnpj(index: int):
+            status = statuses[cnpjs[index]]
+            status.state = CNPJ_SUCCESS
+            status.finished_at = time.time()
+            ctx.detail(status.cnpj)
+
+        def task_progress(current, total):
+            # Chamado a partir da thread do navegador (relativo ao navegador atual)
+            nonlocal done
+            while done < min(offset + current, len(cnpjs)):
+                start_cnpj(done)
+                finish_cnpj(done)
+                done += 1
+            if done < len(cnpjs):
+                start_cnpj(done)
+
+            recorder.progress(done, len(cnpjs))
+            ctx.progress(done, len(cnpjs))
+            ctx.status(f"Baixando Relatórios: {done}/{len(cnpjs)}")
+
+        try:
+            data_inicial = datetime.strptime(form_data["data_inicial"], "%d/%m/%Y").date()
+            data_final = datetime.strptime(form_data["data_final"], "%d/%m/%Y").date()
+
+            if self._browser_lock.locked():
+                ctx.status("Aguardando o navegador ficar livre...")
+
+            async with self._browser_lock:
+                # Mantém o perfil do Chrome enxuto antes de abrir o navegador
+                ctx.status("Verificando perfil do Chrome...")
+                pruned = await asyncio.to_thread(prune_chrome_profile, CHROME_PROFILE_PATH)
+                logger.info(pruned.summary())
+
+                # Downloads concluídos chegam por eventos da pasta, sem espera fixa
+                watcher.start()
+
+                while offset < len(cnpjs):
+                    if cancel_event.is_set():
+                        raise CancelledException("Operação cancelada pelo usuário")
+
+                    ctx.status("Iniciando conexão...")
+                    start_cnpj(offset)
+                    client = ClientNfseWeb(
+                        usuario=form_data["usuario"],
+                        senha=form_data["senha"],
+                        cnpjs=cnpjs[offset:],
+                        data_inicial=data_inicial,
+                        data_final=data_final,
+                        profile_path=CHROME_PROFILE_PATH,
+                        download_path=download_path,
+                        headless=False,
+                    )
+
+                    try:
+                        # Executa função bloqueante em thread separada, abortando a
+                        # navegação do navegador caso o usuário cancele
+                        await await_cancellable(
+                            asyncio.to_thread(
+                                client.consulta_relatorios,
+                                callback_progress=task_progress,
+                                cancel_event=cancel_event,
+                            ),
+                            cancel_event,
+                            on_cancel=lambda: abort_browser(client),
+                        )
+                    except CancelledException:
+                        raise
+                    except Exception as e:
+                        abort_browser(client)
+                        offset = self._handle_failure(ctx, statuses, cnpjs, done, e)
+                        done = offset
+                        continue
+
+                    # Navegador terminou a lista: marca o que faltou reportar
+                    task_progress(len(cnpjs) - offset, len(cnpjs) - offset)
+                    offset = len(cnpjs)
+
+                # Dá tempo para o último relatório terminar de ser gravado
+                if not await asyncio.to_thread(watcher.wait_idle, 10):
+                    logger.warning("Ainda havia downloads em andamento ao fim do job")
+
+            # A planilha de totais não deve ser contada como relatório
+            await asyncio.to_thread(watcher.stop)
+            await self._export_totals(ctx, download_path, watcher)
+
+            failed = [s.cnpj for s in statuses.values() if s.state == CNPJ_ERROR]
+            if failed:
+                recorder.failure(len(failed))
+                error = f"Falha em {len(failed)} empresa(s): {', '.join(failed)}"
+                recorder.finish(STATUS_ERROR, error=error)
+                raise RuntimeError(error)
+
+            recorder.finish(STATUS_SUCCESS)
+            return None
+
+        except CancelledException:
+            for status in statuses.values():
+                if status.state in (CNPJ_PENDING, CNPJ_RUNNING, CNPJ_RETRYING):
+                    status.state = CNPJ_CANCELLED
+                    status.finished_at = status.finished_at or time.time()
+            ctx.detail()
+            recorder.finish(STATUS_CANCELLED)
+            raise
+
+        except Exception as e:
+            if not recorder.failures:
+                recorder.failure()
+            # finish é ignorado se a execução já foi registrada acima
+            recorder.finish(STATUS_ERROR, error=str(e))
+            raise
+
+        finally:
+            await asyncio.to_thread(watcher.stop)
+
+    async def _export_totals(
+        self, ctx: JobContext, download_path: str, watcher: DownloadWatcher
+    ):
+        """
+        Consolida os totais dos PDFs baixados neste job (falhas não derrubam o job).
+
+        Só entram os relatórios vistos pelo DownloadWatcher: PDFs de execuções
+        anteriores na mesma pasta não são relidos nem somados de novo.
+        """
+        if PdfReader is None:
+            logger.info("pypdf não instalado: totais dos relatórios não extraídos")
+            return
+
+        pdf_events = [e for e in watcher.events if e.path.lower().endswith(".pdf")]
+        if not pdf_events:
+            return
+
+        ctx.status("Extraindo totais dos relatórios...")
+        paths = list(dict.fromkeys(os.path.abspath(e.path) for e in pdf_events))
+        cnpj_by_path = {os.path.abspath(e.path): e.cnpj for e in pdf_events if e.cnpj}
+        output_path = os.path.join(
+            download_path, f"totais_nfse_{datetime.now():%Y%m%d_%H%M%S}.xlsx"
+        )
+        try:
+            reports = await asyncio.to_thread(extract_totals, paths, cnpj_by_path)
+            if not reports:
+                return
+            output_path = await asyncio.to_thread(write_totals, reports, output_path)
+        except Exception as ex:
+            logger.exception(f"Erro ao extrair totais dos relatórios: {ex}")
+            ctx.warning(f"Não foi possível extrair os totais: {ex}")
+            return
+
+        failed = sum(1 for r in reports if r.error is not None)
+        message = (
+            f"Totais de {len(reports) - failed} relatórios em "
+            f"{os.path.basename(output_path)}"
+        )
+        if failed:
+            message += f" ({failed} não puderam ser lidos)"
+        ctx.info(message)
+
+    def _handle_failure(
+        self,
+        ctx: JobContext,
+        statuses: dict[str, CnpjStatus],
+        cnpjs: list[str],
+        index: int,
+        error: Exception,
+    ) -> int:
+        """
+        Registra a falha do CNPJ em andamento e decide de onde recomeçar.
+
+        Returns:
+            Índice do CNPJ pelo qual o próximo navegador deve começar
+            (len(cnpjs) = todos concluídos).
+
+        Raises:
+            Exception: O erro original, se nenhum CNPJ foi concluído até agora
+                (provável falha de login ou de configuração, não do CNPJ).
+        """
+        if index >= len(cnpjs):
+            # Todos os CNPJs já foram reportados: o erro veio depois (ex.: ao
+            # fechar o navegador) e não há o que repetir
+            logger.warning(f"Erro após concluir todos os CNPJs: {error}")
+            return len(cnpjs)
+
+        status = statuses[cnpjs[index]]
+        status.error = str(error)
+        logger.warning(f"Falha no CNPJ {status.cnpj}: {error}")
+
+        if status.retries < self._max_retries:
+            status.retries += 1
+            status.state = CNPJ_RETRYING
+            ctx.detail(status.cnpj)
+            ctx.status(
+                f"Erro em {status.cnpj}, tentando novamente "
+                f"({status.retries}/{self._max_retries})..."
+            )
+            return index
+
+        status.state = CNPJ_ERROR
+        status.finished_at = time.time()
+        ctx.detail(status.cnpj)
+
+        if not any(s.state == CNPJ_SUCCESS for s in statuses.values()):
+            raise error
+
+        ctx.warning(f"{status.cnpj} falhou após {status.retries + 1} tentativas")
+        return index + 1
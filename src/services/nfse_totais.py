@@ -0,0 +1,404 @@
+"""
+Extração dos totais dos relatórios PDF de NFS-e.
+
+Os relatórios salvos pelo ClientNfseWeb em pasta_relatorio são lidos em
+um pool de processos (pypdf, opcional) e os totais de cada empresa (valor
+dos serviços, ISS, ISS retido e retenções federais) são consolidados em um
+único CSV/XLSX. Onde o app não consegue iniciar processos, a leitura é
+feita em série.
+
+Os resultados ficam em cache no AppData, identificados pelo mtime/tamanho
+do arquivo e validados pelo hash SHA-256: reprocessar a pasta só lê os
+PDFs novos ou alterados.
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from config.paths import NFSE_TOTALS_CACHE_PATH
+from utils.process_pool import (
+    PROCESS_POOL_ERRORS,
+    new_process_pool,
+    process_pool_available,
+)
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+logger = logging.getLogger(__name__)
+
+# Versão das regras de extração: mudar invalida o cache
+_PARSER_VERSION = 1
+
+# Abaixo disso o custo de subir o pool (cerca de 0,3 s por processo) não compensa
+_MIN_FILES_FOR_POOL = 16
+# PDFs por tarefa enviada a um processo do pool
+_POOL_CHUNK_SIZE = 4
+
+_CNPJ = re.compile(r"(?<!\d)(\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2})(?!\d)")
+_MONEY = r"R?\$?\s*(-?\d{1,3}(?:\.\d{3})*,\d{2}|-?\d+,\d{2})"
+
+# Campo -> rótulos possíveis no relatório (o valor vem logo depois do rótulo)
+_FIELD_LABELS = {
+    "valor_servicos": [r"valor\s+(?:total\s+)?d[oa]s?\s+servi[çc]os?", r"valor\s+bruto"],
+    "valor_iss": [r"valor\s+d[oa]\s+iss(?!\s+retido)", r"iss\s+devido", r"iss\s+apurado"],
+    "iss_retido": [r"iss\s+retido", r"iss\s+ret\.?"],
+    "pis": [r"\bpis\b"],
+    "cofins": [r"\bcofins\b"],
+    "ir": [r"\bir(?:rf)?\b"],
+    "csll": [r"\bcsll\b"],
+    "inss": [r"\binss\b"],
+}
+
+TOTAL_FIELDS = list(_FIELD_LABELS)
+_FIELD_PATTERNS = {
+    name: [
+        re.compile(label + r"[^\d\n]{0,40}?" + _MONEY, re.IGNORECASE)
+        for label in labels
+    ]
+    for name, labels in _FIELD_LABELS.items()
+}
+_TOTAL_LINE = re.compile(r"\btota(?:l|is)\b", re.IGNORECASE)
+
+_cache_lock = threading.Lock()
+
+
+class TotalsExtractionError(Exception):
+    """Erro ao extrair totais dos relatórios."""
+
+
+@dataclass
+class ReportTotals:
+    """Totais extraídos de um relatório PDF."""
+
+    path: str
+    cnpj: str | None = None
+    values: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+    text_cnpj: str | None = None  # Primeiro CNPJ do conteúdo (vai para o cache)
+
+
+def _parse_money(text: str) -> float:
+    return float(text.replace(".", "").replace(",", "."))
+
+
+def _only_digits(text: str) -> str:
+    return re.sub(r"\D", "", text)
+
+
+def parse_report_text(text: str) -> dict[str, float]:
+    """
+    Extrai os totais do texto de um relatório.
+
+    Se houver linhas de total, usa o último valor encontrado nelas; senão,
+    soma os valores de todas as ocorrências do rótulo (relatório por nota).
+    """
+    lines = text.splitlines()
+    total_lines = "\n".join(line for line in lines if _TOTAL_LINE.search(line))
+    values: dict[str, float] = {}
+
+    for name, patterns in _FIELD_PATTERNS.items():
+        for source, use_last in ((total_lines, True), (text, False)):
+            found = [
+                _parse_money(m.group(1)) for p in patterns for m in p.finditer(source)
+            ]
+            if found:
+                values[name] = found[-1] if use_last else round(sum(found), 2)
+                break
+    return values
+
+
+def extract_report_totals(path: str) -> ReportTotals:
+    """Lê um PDF e extrai os totais (roda dentro do pool de processos)."""
+    result = ReportTotals(path=path)
+    try:
+        reader = PdfReader(path)
+        text = "\n".join(page.extract_text() or "" for page in reader.pages)
+    except Exception as ex:
+        result.error = str(ex)
+        return result
+
+    match = _CNPJ.search(text)
+    if match:
+        result.text_cnpj = _only_digits(match.group(1))
+    result.cnpj = _cnpj_from_name(path) or result.text_cnpj
+    result.values = parse_report_text(text)
+    return result
+
+
+def _cnpj_from_name(path: str) -> str | None:
+    match = _CNPJ.search(os.path.basename(path))
+    return _only_digits(match.group(1)) if match else None
+
+
+def _from_cache(path: str, data: dict) -> ReportTotals:
+    """Monta o resultado de um arquivo a partir do cache do seu conteúdo."""
+    return ReportTotals(
+        path=path,
+        cnpj=_cnpj_from_name(path) or data["text_cnpj"],
+        values=data["values"],
+        text_cnpj=data["text_cnpj"],
+    )
+
+
+def _hash_file(path: str) -> str:
+    """Calcula o SHA-256 do conteúdo do arquivo."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _load_cache() -> dict:
+    try:
+        with open(NFSE_TOTALS_CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == _PARSER_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": _PARSER_VERSION, "files": {}, "hashes": {}}
+
+
+def _save_cache(cache: dict):
+    os.makedirs(os.path.dirname(NFSE_TOTALS_CACHE_PATH), exist_ok=True)
+    tmp_path = NFSE_TOTALS_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, NFSE_TOTALS_CACHE_PATH)
+
+
+def list_report_pdfs(folder: str) -> list[str]:
+    """PDFs da pasta de relatórios (sem entrar em subpastas)."""
+    try:
+        with os.scandir(folder) as it:
+            return sorted(
+                e.path for e in it if e.is_file() and e.name.lower().endswith(".pdf")
+            )
+    except OSError:
+        return []
+
+
+def extract_totals(
+    paths: list[str],
+    cnpj_by_path: dict[str, str] | None = None,
+    max_workers: int | None = None,
+    callback_progress: Callable[[int, int], None] | None = None,
+) -> list[ReportTotals]:
+    """
+    Extrai os totais dos PDFs informados, usando o cache.
+
+    Args:
+        paths: PDFs a ler (ex.: os baixados por um job).
+        cnpj_by_path: CNPJ já conhecido de cada arquivo (ex.: do DownloadWatcher).
+        max_workers: Processos do pool (None = um por núcleo).
+        callback_progress: Chamado com (processados, total).
+
+    Raises:
+        TotalsExtractionError: Se pypdf não estiver instalado.
+    """
+    return _extract(
+        [os.path.abspath(p) for p in paths],
+        None,
+        cnpj_by_path,
+        max_workers,
+        callback_progress,
+    )
+
+
+def extract_folder_totals(
+    folder: str,
+    cnpj_by_path: dict[str, str] | None = None,
+    max_workers: int | None = None,
+    callback_progress: Callable[[int, int], None] | None = None,
+) -> list[ReportTotals]:
+    """
+    Extrai os totais de todos os PDFs da pasta, usando o cache.
+
+    Arquivos da pasta que não existem mais saem do cache.
+
+    Args:
+        folder: Pasta dos relatórios.
+        cnpj_by_path: CNPJ já conhecido de cada arquivo (ex.: do DownloadWatcher).
+        max_workers: Processos do pool (None = um por núcleo).
+        callback_progress: Chamado com (processados, total).
+
+    Raises:
+        TotalsExtractionError: Se pypdf não estiver instalado.
+    """
+    folder = os.path.abspath(folder)
+    return _extract(
+        list_report_pdfs(folder), folder, cnpj_by_path, max_workers, callback_progress
+    )
+
+
+def _extract(
+    paths: list[str],
+    prune_folder: str | None,
+    cnpj_by_path: dict[str, str] | None,
+    max_workers: int | None,
+    callback_progress: Callable[[int, int], None] | None,
+) -> list[ReportTotals]:
+    """Implementação de extract_totals/extract_folder_totals."""
+    if PdfReader is None:
+        raise TotalsExtractionError("pypdf não está instalado")
+
+    results: dict[str, ReportTotals] = {}
+    to_parse: dict[str, tuple[int, int, str]] = {}
+
+    with _cache_lock:
+        cache = _load_cache()
+
+    # 1. Cache: mtime/tamanho iguais, ou mesmo conteúdo (hash) em outro arquivo
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entry = cache["files"].get(path)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            results[path] = _from_cache(path, cache["hashes"][entry["sha256"]])
+            continue
+        digest = _hash_file(path)
+        cache["files"][path] = {
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha256": digest,
+        }
+        if digest in cache["hashes"]:
+            results[path] = _from_cache(path, cache["hashes"][digest])
+        else:
+            to_parse[path] = (st.st_mtime_ns, st.st_size, digest)
+
+    done = len(results)
+    if callback_progress:
+        callback_progress(done, len(paths))
+
+    def parsed(totals: ReportTotals):
+        nonlocal done
+        results[totals.path] = totals
+        done += 1
+        if callback_progress:
+            callback_progress(done, len(paths))
+
+    # 2. PDFs novos: em processos quando são muitos (o parsing é CPU puro)
+    if to_parse:
+        if len(to_parse) >= _MIN_FILES_FOR_POOL and process_pool_available():
+            try:
+                with new_process_pool(max_workers) as pool:
+                    for totals in pool.map(
+                        extract_report_totals, to_parse, chunksize=_POOL_CHUNK_SIZE
+                    ):
+                        parsed(totals)
+            except PROCESS_POOL_ERRORS as ex:
+                logger.warning(f"Pool de processos indisponível, lendo em série: {ex}")
+
+        for path in to_parse:
+            if path not in results:
+                parsed(extract_report_totals(path))
+
+        for path, (_, _, digest) in to_parse.items():
+            totals = results[path]
+            if totals.error is None:
+                cache["hashes"][digest] = {
+                    "values": totals.values,
+                    "text_cnpj": totals.text_cnpj,
+                }
+            else:
+                # Não guarda falhas: o arquivo pode estar incompleto
+                cache["files"].pop(path, None)
+
+    # Remove do cache arquivos que não existem mais nesta pasta
+    if prune_folder is not None:
+        for path in [p for p in cache["files"] if os.path.dirname(p) == prune_folder]:
+            if path not in results:
+                del cache["files"][path]
+
+    try:
+        with _cache_lock:
+            _save_cache(cache)
+    except OSError as ex:
+        logger.warning(f"Não foi possível gravar cache de totais: {ex}")
+
+    # O CNPJ informado pelo download tem prioridade sobre o lido do PDF
+    for path, cnpj in (cnpj_by_path or {}).items():
+        if path in results:
+            results[path].cnpj = cnpj
+
+    return [results[p] for p in paths if p in results]
+
+
+def consolidate(reports: list[ReportTotals]) -> list[dict]:
+    """Soma os totais por empresa (CNPJ)."""
+    companies: dict[str, dict] = {}
+    for report in reports:
+        if report.error is not None:
+            continue
+        key = report.cnpj or "(sem CNPJ)"
+        row = companies.setdefault(
+            key, {"cnpj": key, "arquivos": 0, **{f: 0.0 for f in TOTAL_FIELDS}}
+        )
+        row["arquivos"] += 1
+        for name, value in report.values.items():
+            row[name] = round(row[name] + value, 2)
+    return sorted(companies.values(), key=lambda r: r["cnpj"])
+
+
+def write_totals(reports: list[ReportTotals], output_path: str) -> str:
+    """
+    Grava o consolidado por empresa em CSV ou XLSX (pela extensão).
+
+    No XLSX, uma segunda aba traz os totais de cada arquivo. Sem pandas,
+    grava CSV no lugar do XLSX.
+
+    Returns:
+        Caminho efetivamente gravado.
+    """
+    rows = consolidate(reports)
+    columns = ["cnpj", "arquivos"] + TOTAL_FIELDS
+
+    if output_path.lower().endswith(".xlsx") and pd is not None:
+        per_file = [
+            {
+                "arquivo": os.path.basename(r.path),
+                "cnpj": r.cnpj,
+                **{f: r.values.get(f) for f in TOTAL_FIELDS},
+                "erro": r.error,
+            }
+            for r in reports
+        ]
+        with pd.ExcelWriter(output_path) as writer:
+            pd.DataFrame(rows, columns=columns).to_excel(
+                writer, sheet_name="Por empresa", index=False
+            )
+            pd.DataFrame(per_file).to_excel(writer, sheet_name="Por arquivo", index=False)
+        return output_path
+
+    if not output_path.lower().endswith(".csv"):
+        output_path = os.path.splitext(output_path)[0] + ".csv"
+
+    # Padrão do Excel brasileiro: ponto e vírgula e vírgula decimal
+    with open(output_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(
+                [row["cnpj"], row["arquivos"]]
+                + [f"{row[name]:.2f}".replace(".", ",") for name in TOTAL_FIELDS]
+            )
+    return output_path
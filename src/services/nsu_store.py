@@ -0,0 +1,131 @@
+"""
+Estado da sincronização por NSU de cada CNPJ/CPF.
+
+A distribuição de documentos do SEFAZ numera tudo o que foi emitido contra
+um CNPJ com um NSU (número sequencial único). Guardando o último NSU
+processado, a sincronização seguinte pede apenas os documentos mais novos.
+
+Quando o último NSU alcança o maior NSU disponível (maxNSU), o SEFAZ exige
+aguardar uma hora antes de consultar de novo; o horário em que isso
+aconteceu fica gravado para a próxima execução respeitar a espera.
+"""
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+
+from config.paths import NSU_STATE_PATH
+from services.sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+# Espera exigida pelo SEFAZ após consultar sem documentos novos
+CAUGHT_UP_WAIT_S = 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nsu (
+    cnpj TEXT PRIMARY KEY,
+    perfil TEXT NOT NULL DEFAULT '',
+    ult_nsu INTEGER NOT NULL DEFAULT 0,
+    max_nsu INTEGER NOT NULL DEFAULT 0,
+    sincronizado_em REAL,
+    em_dia_em REAL
+);
+"""
+
+
+@dataclass
+class NsuState:
+    """Posição da sincronização de um CNPJ/CPF."""
+
+    cnpj: str
+    profile: str = ""
+    ult_nsu: int = 0
+    max_nsu: int = 0
+    synced_at: float | None = None
+    caught_up_at: float | None = None
+
+    @property
+    def caught_up(self) -> bool:
+        """Indica se não há documentos além do último NSU processado."""
+        return self.max_nsu > 0 and self.ult_nsu >= self.max_nsu
+
+    def next_allowed_at(self) -> float:
+        """Momento a partir do qual nova consulta é permitida (0 = já)."""
+        if not self.caught_up or self.caught_up_at is None:
+            return 0.0
+        return self.caught_up_at + CAUGHT_UP_WAIT_S
+
+    def summary(self) -> str:
+        """Texto curto para a tela."""
+        if self.synced_at is None:
+            return "Nunca sincronizado: todos os documentos disponíveis serão baixados"
+        when = time.strftime("%d/%m %H:%M", time.localtime(self.synced_at))
+        text = f"Último NSU {self.ult_nsu} (sincronizado em {when})"
+        allowed_at = self.next_allowed_at()
+        if allowed_at > time.time():
+            text += f" · nova consulta a partir de {time.strftime('%H:%M', time.localtime(allowed_at))}"
+        return text
+
+
+class NsuStore(SqliteStore):
+    """
+    Último NSU processado por CNPJ/CPF, em SQLite no AppData.
+
+    Uso:
+        store = NsuStore()
+        state = store.get(cnpj)
+        store.save(cnpj, "Empresa A", ult_nsu=1234, max_nsu=1300)
+    """
+
+    def __init__(self, db_path: str = NSU_STATE_PATH):
+        """
+        Args:
+            db_path: Caminho do arquivo SQLite.
+        """
+        super().__init__(db_path, _SCHEMA)
+
+    def get(self, cnpj: str) -> NsuState:
+        """Estado do CNPJ/CPF (NSU zero se nunca sincronizado)."""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT perfil, ult_nsu, max_nsu, sincronizado_em, em_dia_em "
+                    "FROM nsu WHERE cnpj = ?",
+                    (cnpj,),
+                ).fetchone()
+        except sqlite3.Error as ex:
+            logger.error(f"Erro ao ler o último NSU: {ex}")
+            return NsuState(cnpj)
+        if row is None:
+            return NsuState(cnpj)
+        return NsuState(cnpj, *row)
+
+    def save(self, cnpj: str, profile: str, ult_nsu: int, max_nsu: int):
+        """
+        Grava a posição após um lote processado.
+
+        O NSU nunca retrocede: um valor menor que o gravado é ignorado.
+        Falhas ao gravar são apenas logadas (a próxima sincronização
+        repete o lote, sem perda de documentos).
+        """
+        now = time.time()
+        caught_up_at = now if max_nsu > 0 and ult_nsu >= max_nsu else None
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO nsu (cnpj, perfil, ult_nsu, max_nsu, sincronizado_em, em_dia_em)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (cnpj) DO UPDATE SET
+                        perfil = excluded.perfil,
+                        ult_nsu = MAX(ult_nsu, excluded.ult_nsu),
+                        max_nsu = MAX(max_nsu, excluded.max_nsu),
+                        sincronizado_em = excluded.sincronizado_em,
+                        em_dia_em = excluded.em_dia_em
+                    """,
+                    (cnpj, profile or "", ult_nsu, max_nsu, now, caught_up_at),
+                )
+        except sqlite3.Error as ex:
+            logger.error(f"Erro ao gravar o último NSU: {ex}")
@@ -0,0 +1,60 @@
+"""
+Consultas sobre a pasta de destino dos XMLs (pasta_xml).
+
+Permite descobrir quais chaves já foram baixadas, para que apenas as
+faltantes sejam enviadas ao SEFAZ.
+"""
+
+import os
+import re
+
+# Chave de acesso no nome do arquivo (ex: 3523...1234-nfe.xml)
+_KEY_IN_NAME = re.compile(r"(?<!\d)(\d{44})(?!\d)")
+
+
+def list_existing_keys(folder_path: str) -> set[str]:
+    """
+    Lista as chaves de acesso dos XMLs já presentes na pasta (recursivo).
+
+    A chave é obtida do nome do arquivo, sem abrir o conteúdo.
+
+    Args:
+        folder_path: Pasta de destino dos XMLs.
+
+    Returns:
+        Conjunto de chaves encontradas.
+    """
+    keys: set[str] = set()
+    pending = [folder_path]
+
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.lower().endswith(".xml"):
+                        match = _KEY_IN_NAME.search(entry.name)
+                        if match:
+                            keys.add(match.group(1))
+        except OSError:
+            # Pasta inexistente ou sem permissão: considera vazia
+            continue
+
+    return keys
+
+
+def missing_keys(sheet_keys: list[str], folder_path: str) -> list[str]:
+    """
+    Retorna as chaves da planilha que ainda não estão na pasta.
+
+    Args:
+        sheet_keys: Chaves da planilha, na ordem original.
+        folder_path: Pasta de destino dos XMLs.
+
+    Returns:
+        Chaves faltantes, preservando a ordem da planilha.
+    """
+    existing = list_existing_keys(folder_path)
+    return [key for key in sheet_keys if key not in existing]
@@ -0,0 +1,394 @@
+"""
+Cache das chaves de acesso extraídas das planilhas de relação.
+
+A planilha (caminho_relacao, geralmente .xls legado) é lida uma única vez e
+as chaves são gravadas em formato colunar compacto no AppData. Cada chave de
+44 dígitos é armazenada como um inteiro de 19 bytes, então dezenas de
+milhares de chaves cabem em poucas centenas de KB e carregam em milissegundos.
+
+O cache é identificado pelo caminho da planilha e validado pelo mtime,
+tamanho e hash SHA-256 do conteúdo.
+
+Chaves que o Excel guardou como número (float) perderam os últimos dígitos
+e não podem ser recuperadas: a leitura falha com SheetParseError indicando
+quantas são, em vez de ignorá-las em silêncio.
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import threading
+
+from config.paths import SHEET_CACHE_DIR
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+logger = logging.getLogger(__name__)
+
+# Identificador e versão do formato do arquivo de cache (a versão muda
+# quando a extração das chaves muda, invalidando caches antigos)
+_MAGIC = b"ANFK2"
+
+# Chave de acesso: 44 dígitos cabem em 147 bits (19 bytes)
+_KEY_DIGITS = 44
+_KEY_BYTES = 19
+
+_NON_DIGITS = re.compile(r"\D")
+
+# Números a partir daqui só podem ser chaves gravadas como número (44 dígitos
+# não cabem na precisão de um float)
+_LOST_KEY_MIN = 10 ** (_KEY_DIGITS - 2)
+
+# Linhas iniciais onde o cabeçalho da coluna de chaves é procurado
+_HEADER_ROWS = 10
+
+# Cache em memória da sessão: caminho normalizado -> (mtime_ns, size, chaves)
+_memory_cache: dict[str, tuple[int, int, list[str]]] = {}
+_lock = threading.Lock()
+
+
+class SheetParseError(Exception):
+    """Erro ao ler a planilha de relação."""
+
+
+def _normalize_path(path: str) -> str:
+    """Normaliza o caminho para uso como chave do cache."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _cache_file_for(norm_path: str) -> str:
+    """Retorna o arquivo de cache correspondente a uma planilha."""
+    digest = hashlib.sha1(norm_path.encode("utf-8")).hexdigest()
+    return os.path.join(SHEET_CACHE_DIR, f"{digest}.keys")
+
+
+def _hash_file(path: str) -> str:
+    """Calcula o SHA-256 do conteúdo do arquivo."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _extract_key(value) -> str | None:
+    """Extrai uma chave de acesso de uma célula (aceita espaços e pontuação)."""
+    if value is None:
+        return None
+    digits = _NON_DIGITS.sub("", str(value))
+    return digits if len(digits) == _KEY_DIGITS else None
+
+
+def _is_lost_key(value) -> bool:
+    """Indica se a célula é uma chave que o Excel guardou como número."""
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and abs(value) >= _LOST_KEY_MIN
+    )
+
+
+def _is_text_sheet(path: str) -> bool:
+    """Indica se a planilha é um CSV/TXT (e não Excel)."""
+    return os.path.splitext(path)[1].lower() in (".csv", ".txt")
+
+
+def _sniff_delimiter(sample: str) -> str:
+    """Delimitador de um CSV/TXT (ponto e vírgula se não der para detectar)."""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=";,\t").delimiter
+    except csv.Error:
+        return ";"
+
+
+def _sheet_rows(path: str) -> list[list]:
+    """
+    Lê as linhas da primeira aba da planilha (ou do CSV/TXT).
+
+    No Excel as células mantêm o tipo (texto, número), para que chaves
+    gravadas como número possam ser detectadas.
+    """
+    if _is_text_sheet(path):
+        with open(path, encoding="utf-8", errors="replace", newline="") as f:
+            delimiter = _sniff_delimiter(f.read(64 * 1024))
+            f.seek(0)
+            return list(csv.reader(f, delimiter=delimiter))
+
+    if pd is None:
+        raise SheetParseError("pandas não está instalado")
+    frame = pd.read_excel(path, sheet_name=0, header=None, dtype=object)
+    return frame.where(frame.notna(), None).values.tolist()
+
+
+def _key_column(rows: list[list]) -> tuple[int, int] | None:
+    """
+    Localiza a coluna das chaves: a de cabeçalho "chave" nas primeiras
+    linhas ou, sem cabeçalho, a primeira coluna com uma chave válida.
+
+    Returns:
+        (primeira linha de dados, índice da coluna), ou None.
+    """
+    for i, row in enumerate(rows[:_HEADER_ROWS]):
+        for j, cell in enumerate(row):
+            if isinstance(cell, str) and "chave" in cell.lower():
+                return i + 1, j
+    for i, row in enumerate(rows):
+        for j, cell in enumerate(row):
+            if _extract_key(cell) or _is_lost_key(cell):
+                return i, j
+    return None
+
+
+def parse_sheet_keys(path: str) -> list[str]:
+    """
+    Lê a planilha e extrai as chaves de acesso, sem usar o cache.
+
+    Aceita .xls/.xlsx (via pandas) e .csv/.txt. Como o ClientNfe, lê só a
+    primeira aba e a coluna de chaves (ver _key_column); valores de 44
+    dígitos em outras colunas ou abas são ignorados. Chaves repetidas são
+    descartadas, mantendo a ordem da primeira ocorrência.
+
+    Args:
+        path: Caminho da planilha.
+
+    Returns:
+        Lista de chaves de acesso (44 dígitos).
+
+    Raises:
+        SheetParseError: Se a planilha não puder ser lida ou tiver chaves
+            gravadas como número.
+    """
+    try:
+        rows = _sheet_rows(path)
+    except SheetParseError:
+        raise
+    except Exception as ex:
+        raise SheetParseError(f"Erro ao ler planilha {path}: {ex}") from ex
+
+    location = _key_column(rows)
+    if location is None:
+        return []
+    start, column = location
+
+    keys: dict[str, None] = {}
+    lost = 0
+    for row in rows[start:]:
+        if column < len(row):
+            cell = row[column]
+            if _is_lost_key(cell):
+                lost += 1
+                continue
+            key = _extract_key(cell)
+            if key:
+                keys.setdefault(key)
+
+    if lost:
+        raise SheetParseError(
+            f"{lost} chave(s) da planilha estão gravadas como número e perderam "
+            f"dígitos; formate a coluna de chaves como texto e cole as chaves de novo"
+        )
+    return list(keys)
+
+
+class RelationTemplate:
+    """
+    Layout de uma planilha de relação, para gravar cópias com parte das chaves.
+
+    O ClientNfe só recebe o caminho de uma planilha (consulta_planilha). Para
+    consultar um subconjunto das chaves (modo "somente faltantes", lotes do
+    orçamento), grava-se uma planilha com as mesmas linhas de cabeçalho e
+    colunas da original, mas só com as linhas dessas chaves. CSV/TXT são
+    gravados como CSV com o mesmo delimitador; .xls/.xlsx como .xlsx.
+    """
+
+    def __init__(self, path: str):
+        """
+        Lê a planilha original (uma vez; as cópias saem da memória).
+
+        Args:
+            path: Caminho da planilha de relação.
+
+        Raises:
+            SheetParseError: Se a planilha não puder ser lida ou não tiver
+                coluna de chaves.
+        """
+        try:
+            rows = _sheet_rows(path)
+        except SheetParseError:
+            raise
+        except Exception as ex:
+            raise SheetParseError(f"Erro ao ler planilha {path}: {ex}") from ex
+
+        location = _key_column(rows)
+        if location is None:
+            raise SheetParseError(f"Coluna de chaves não encontrada em {path}")
+        start, column = location
+
+        self._text = _is_text_sheet(path)
+        self._delimiter = ";"
+        if self._text:
+            with open(path, encoding="utf-8", errors="replace", newline="") as f:
+                self._delimiter = _sniff_delimiter(f.read(64 * 1024))
+
+        self._header = rows[:start]
+        # Primeira linha de cada chave, como no parse_sheet_keys
+        self._rows: dict[str, list] = {}
+        for row in rows[start:]:
+            key = _extract_key(row[column]) if column < len(row) else None
+            if key:
+                self._rows.setdefault(key, row)
+
+    def write(self, keys: list[str], base_path: str) -> str:
+        """
+        Grava uma planilha só com as linhas das chaves informadas.
+
+        Args:
+            keys: Chaves a manter (as ausentes da original são ignoradas).
+            base_path: Caminho de destino sem extensão.
+
+        Returns:
+            Caminho gravado (.csv ou .xlsx).
+
+        Raises:
+            SheetParseError: Se pandas/openpyxl não estiverem instalados.
+        """
+        rows = self._header + [self._rows[k] for k in keys if k in self._rows]
+
+        if self._text:
+            path = base_path + ".csv"
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f, delimiter=self._delimiter).writerows(rows)
+            return path
+
+        if pd is None:
+            raise SheetParseError("pandas não está instalado")
+        path = base_path + ".xlsx"
+        try:
+            pd.DataFrame(rows).to_excel(path, header=False, index=False)
+        except ImportError as ex:
+            raise SheetParseError(f"Não foi possível gravar a planilha: {ex}") from ex
+        return path
+
+
+def _write_cache(cache_file: str, header: dict, keys: list[str]):
+    """Grava o cache em disco (escrita atômica)."""
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    header_bytes = json.dumps(header).encode("utf-8")
+    packed = b"".join(int(k).to_bytes(_KEY_BYTES, "big") for k in keys)
+
+    tmp_file = f"{cache_file}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(packed)
+    os.replace(tmp_file, cache_file)
+
+
+def _read_cache(cache_file: str) -> tuple[dict, bytes] | None:
+    """Lê o cabeçalho e o bloco de chaves do cache (None se inválido)."""
+    try:
+        with open(cache_file, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    if not data.startswith(_MAGIC):
+        return None
+    offset = len(_MAGIC)
+    try:
+        (header_len,) = struct.unpack_from("<I", data, offset)
+    except struct.error:
+        # Arquivo truncado antes do tamanho do cabeçalho
+        return None
+    offset += 4
+    try:
+        header = json.loads(data[offset : offset + header_len])
+    except ValueError:
+        return None
+
+    # Bloco de chaves truncado (gravação interrompida ou arquivo corrompido)
+    block = data[offset + header_len :]
+    if not isinstance(header, dict) or len(block) != header.get("count", -1) * _KEY_BYTES:
+        return None
+    return header, block
+
+
+def _unpack_keys(block: bytes) -> list[str]:
+    """Converte o bloco binário de volta em chaves de 44 dígitos."""
+    return [
+        f"{int.from_bytes(block[i : i + _KEY_BYTES], 'big'):0{_KEY_DIGITS}d}"
+        for i in range(0, len(block), _KEY_BYTES)
+    ]
+
+
+def load_sheet_keys(path: str) -> list[str]:
+    """
+    Retorna as chaves da planilha, usando o cache sempre que possível.
+
+    Ordem de verificação:
+    1. Cache em memória da sessão (mesmo mtime e tamanho).
+    2. Cache em disco com mesmo mtime e tamanho.
+    3. Cache em disco com mesmo hash de conteúdo (arquivo apenas "tocado").
+    4. Leitura completa da planilha, regravando o cache.
+
+    Args:
+        path: Caminho da planilha.
+
+    Returns:
+        Lista de chaves de acesso.
+
+    Raises:
+        SheetParseError: Se a planilha não puder ser lida.
+    """
+    norm_path = _normalize_path(path)
+    try:
+        stat = os.stat(norm_path)
+    except OSError as ex:
+        raise SheetParseError(f"Planilha não encontrada: {path}") from ex
+
+    with _lock:
+        cached = _memory_cache.get(norm_path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    cache_file = _cache_file_for(norm_path)
+    header, block = _read_cache(cache_file) or ({}, b"")
+
+    keys = None
+    if header.get("mtime_ns") == stat.st_mtime_ns and header.get("size") == stat.st_size:
+        keys = _unpack_keys(block)
+    else:
+        content_hash = _hash_file(norm_path)
+        if header.get("sha256") == content_hash:
+            keys = _unpack_keys(block)
+        else:
+            logger.info(f"Lendo planilha (cache ausente ou desatualizado): {path}")
+            keys = parse_sheet_keys(norm_path)
+
+        # Atualiza o cabeçalho com o mtime/tamanho atuais
+        try:
+            _write_cache(
+                cache_file,
+                {
+                    "path": norm_path,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "sha256": content_hash,
+                    "count": len(keys),
+                },
+                keys,
+            )
+        except OSError as ex:
+            logger.warning(f"Não foi possível gravar cache da planilha: {ex}")
+
+    with _lock:
+        _memory_cache[norm_path] = (stat.st_mtime_ns, stat.st_size, keys)
+    return keys
@@ -0,0 +1,159 @@
+"""
+Índice em memória dos perfis de empresa (empresas_nfe.toml) para busca.
+
+O índice é montado uma vez por snapshot do arquivo (ver
+services.config_watcher, que relê o TOML só quando ele muda) e guarda,
+para cada perfil, um ID estável e as chaves de busca já normalizadas (nome
+sem acentos em minúsculas e CNPJ/CPF só com dígitos). A busca é difusa: os
+caracteres digitados precisam aparecer em ordem, com pontuação maior para
+prefixos e trechos contíguos.
+"""
+
+import hashlib
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+from services.config_watcher import ConfigSnapshot, config_watcher
+
+_NON_DIGITS = re.compile(r"\D")
+
+# Índice da sessão: (caminho, tabela) -> (snapshot, índice)
+_indexes: dict[tuple[str, str], tuple[ConfigSnapshot, "ProfileIndex"]] = {}
+_lock = threading.Lock()
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas e sem acentos."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def fuzzy_score(query: str, target: str) -> int:
+    """
+    Pontua o quanto `target` casa com `query` (0 = não casa).
+
+    Todos os caracteres da busca precisam aparecer em ordem no alvo.
+    """
+    if not query:
+        return 1
+    if not target:
+        return 0
+
+    position = target.find(query)
+    if position >= 0:
+        # Trecho contíguo: melhor ainda se for no início de uma palavra
+        at_word_start = position == 0 or not target[position - 1].isalnum()
+        bonus = 200 if position == 0 else 100 if at_word_start else 0
+        return 1000 + bonus - position
+
+    score = 0
+    streak = 0
+    index = 0
+    for char in query:
+        found = target.find(char, index)
+        if found < 0:
+            return 0
+        streak = streak + 1 if found == index else 0
+        score += 10 + streak * 5 - min(found - index, 10)
+        index = found + 1
+    return max(score, 1)
+
+
+@dataclass(frozen=True)
+class ProfileEntry:
+    """Perfil indexado."""
+
+    id: str
+    name: str
+    cnpj_cpf: str
+    data: dict
+
+
+class ProfileIndex:
+    """Perfis com chaves de busca pré-calculadas."""
+
+    def __init__(self, profiles: list[dict]):
+        """
+        Args:
+            profiles: Lista de perfis ([[empresas]] do TOML).
+        """
+        self.entries: list[ProfileEntry] = []
+        self._by_id: dict[str, ProfileEntry] = {}
+        self._keys: list[tuple[str, str]] = []
+
+        for position, profile in enumerate(profiles):
+            name = str(profile.get("nome") or f"Perfil {position + 1}")
+            cnpj_cpf = str(profile.get("cnpj_cpf") or "")
+            digits = _NON_DIGITS.sub("", cnpj_cpf)
+
+            # ID estável: não muda se a ordem dos perfis no arquivo mudar
+            seed = f"{digits}|{_normalize(name)}".encode("utf-8")
+            base_id = hashlib.sha1(seed).hexdigest()[:12]
+            profile_id = base_id
+            suffix = 1
+            while profile_id in self._by_id:
+                suffix += 1
+                profile_id = f"{base_id}-{suffix}"
+
+            entry = ProfileEntry(profile_id, name, cnpj_cpf, dict(profile))
+            self.entries.append(entry)
+            self._by_id[profile_id] = entry
+            self._keys.append((_normalize(name), digits))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, profile_id: str) -> ProfileEntry | None:
+        """Retorna o perfil pelo ID."""
+        return self._by_id.get(profile_id)
+
+    def search(self, query: str, limit: int | None = None) -> list[ProfileEntry]:
+        """
+        Busca difusa por nome ou CNPJ/CPF, do melhor para o pior resultado.
+
+        Args:
+            query: Texto digitado (vazio = todos, na ordem do arquivo).
+            limit: Máximo de resultados.
+        """
+        text = _normalize(query).strip()
+        if not text:
+            return self.entries[:limit]
+
+        # Busca por CNPJ/CPF só quando não há letras (aceita pontuação)
+        digits = "" if any(c.isalpha() for c in text) else _NON_DIGITS.sub("", text)
+        scored = []
+        for position, (entry, (name_key, digits_key)) in enumerate(
+            zip(self.entries, self._keys)
+        ):
+            score = fuzzy_score(text, name_key)
+            if digits and digits_key.startswith(digits):
+                score = max(score, 2000 + len(digits))
+            elif digits and digits in digits_key:
+                score = max(score, 1500)
+            if score:
+                scored.append((-score, position, entry))
+
+        scored.sort()
+        return [entry for _, _, entry in scored[:limit]]
+
+
+def load_profile_index(path: str, table: str = "empresas") -> ProfileIndex:
+    """
+    Retorna o índice dos perfis do arquivo, remontando só se ele mudou.
+
+    Args:
+        path: Arquivo TOML de perfis.
+        table: Nome da lista de perfis no TOML.
+    """
+    snapshot = config_watcher.snapshot(path)
+    with _lock:
+        cached = _indexes.get((path, table))
+        if cached and cached[0] is snapshot:
+            return cached[1]
+
+    index = ProfileIndex(snapshot.data.get(table, []))
+    with _lock:
+        _indexes[(path, table)] = (snapshot, index)
+    return index
@@ -0,0 +1,237 @@
+"""
+Limite de requisições ao SEFAZ por CNPJ (token bucket).
+
+O SEFAZ limita o consumo por CNPJ e, quando o limite estoura, bloqueia o
+certificado por cerca de uma hora. Cada CNPJ tem um "balde" com até
+`capacity` fichas, reabastecido continuamente a `refill_per_hour` fichas
+por hora; cada chave consultada gasta uma ficha. Em vez de gastar o
+orçamento inteiro em rajada e ser bloqueado, a consulta segue no ritmo
+sustentável do reabastecimento.
+
+Os baldes ficam em SQLite no AppData: valem entre reinícios do app, entre
+execuções simultâneas e para o processo isolado de NF-e. Os limites vêm da
+seção [sefaz] do profile.toml (requisicoes_por_hora, rajada).
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from auto_nfe import CancelledException
+
+from config.paths import PROFILE_PATH, RATE_LIMIT_PATH
+from services.config_watcher import config_watcher
+from utils.utils import format_seconds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 300
+DEFAULT_REFILL_PER_HOUR = 1200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS baldes (
+    cnpj TEXT PRIMARY KEY,
+    fichas REAL NOT NULL,
+    atualizado_em REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class BucketState:
+    """Orçamento de requisições de um CNPJ em um momento."""
+
+    cnpj: str
+    tokens: float
+    capacity: int
+    refill_per_hour: float
+
+    @property
+    def available(self) -> int:
+        return max(int(self.tokens), 0)
+
+    def wait_for(self, requests: int) -> float:
+        """Segundos até haver fichas para `requests` requisições."""
+        missing = requests - self.tokens
+        if missing <= 0 or self.refill_per_hour <= 0:
+            return 0.0
+        return missing / self.refill_per_hour * 3600
+
+    def summary(self, requests: int | None = None) -> str:
+        """Texto curto para a tela."""
+        text = f"Orçamento SEFAZ: {self.available}/{self.capacity} requisições"
+        if requests:
+            # O que cabe nas fichas atuais sai na hora; o resto, no ritmo do reabastecimento
+            wait = self.wait_for(requests)
+            if wait > 0:
+                text += f" · {requests} chaves: espera projetada {format_seconds(wait)}"
+            else:
+                text += f" · {requests} chaves sem espera"
+        return text
+
+
+class RateLimiter:
+    """
+    Baldes de fichas por CNPJ, persistidos em SQLite.
+
+    Uso:
+        granted = await limiter.acquire(cnpj, len(keys), cancel_event, on_status)
+        ...consulta `granted` chaves...
+        limiter.refund(cnpj, granted - consultadas)
+    """
+
+    def __init__(
+        self,
+        db_path: str = RATE_LIMIT_PATH,
+        capacity: int | None = None,
+        refill_per_hour: float | None = None,
+    ):
+        """
+        Args:
+            db_path: Arquivo SQLite dos baldes.
+            capacity: Fichas máximas por CNPJ (None = profile.toml ou padrão).
+            refill_per_hour: Fichas repostas por hora (None = profile.toml ou padrão).
+        """
+        self._db_path = db_path
+        self._capacity = capacity
+        self._refill_per_hour = refill_per_hour
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Conexão em transação exclusiva (outros processos aguardam)."""
+        conn = sqlite3.connect(self._db_path, timeout=10, isolation_level=None)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._initialized = True
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def limits(self) -> tuple[int, float]:
+        """Capacidade e reabastecimento por hora em vigor."""
+        section = config_watcher.snapshot(PROFILE_PATH).data.get("sefaz", {})
+        capacity = self._capacity or section.get("rajada") or DEFAULT_CAPACITY
+        refill = (
+            self._refill_per_hour
+            or section.get("requisicoes_por_hora")
+            or DEFAULT_REFILL_PER_HOUR
+        )
+        return max(int(capacity), 1), max(float(refill), 0.0)
+
+    def _update(self, cnpj: str, change: Callable[[float, int], float]) -> BucketState:
+        """Reabastece o balde até agora, aplica `change` e grava."""
+        capacity, refill = self.limits()
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT fichas, atualizado_em FROM baldes WHERE cnpj = ?", (cnpj,)
+            ).fetchone()
+            if row is None:
+                tokens = float(capacity)
+            else:
+                elapsed = max(now - row[1], 0.0)
+                tokens = min(row[0] + elapsed * refill / 3600, float(capacity))
+            tokens = change(tokens, capacity)
+            conn.execute(
+                "INSERT OR REPLACE INTO baldes (cnpj, fichas, atualizado_em) VALUES (?, ?, ?)",
+                (cnpj, tokens, now),
+            )
+        return BucketState(cnpj, tokens, capacity, refill)
+
+    def state(self, cnpj: str) -> BucketState:
+        """Orçamento atual do CNPJ."""
+        try:
+            return self._update(cnpj, lambda tokens, _: tokens)
+        except sqlite3.Error as ex:
+            logger.error(f"Erro ao ler limite de requisições: {ex}")
+            capacity, refill = self.limits()
+            return BucketState(cnpj, float(capacity), capacity, refill)
+
+    def try_acquire(self, cnpj: str, requests: int) -> int:
+        """Reserva até `requests` fichas; retorna quantas foram concedidas."""
+        granted = 0
+
+        def take(tokens: float, _capacity: int) -> float:
+            nonlocal granted
+            granted = min(requests, max(int(tokens), 0))
+            return tokens - granted
+
+        self._update(cnpj, take)
+        return granted
+
+    def _adjust(self, cnpj: str, change: Callable[[float, int], float]):
+        """Ajuste do saldo que não interrompe a consulta em caso de erro."""
+        try:
+            self._update(cnpj, change)
+        except sqlite3.Error as ex:
+            logger.error(f"Erro ao gravar limite de requisições: {ex}")
+
+    def consume(self, cnpj: str, requests: int):
+        """Desconta requisições feitas sem reserva (pode deixar o saldo negativo)."""
+        self._adjust(cnpj, lambda tokens, capacity: max(tokens - requests, -capacity))
+
+    def refund(self, cnpj: str, requests: int):
+        """Devolve fichas reservadas e não usadas."""
+        if requests > 0:
+            self._adjust(cnpj, lambda tokens, capacity: min(tokens + requests, capacity))
+
+    def drain(self, cnpj: str):
+        """Zera o balde (o SEFAZ sinalizou limitação antes do previsto)."""
+        self._adjust(cnpj, lambda tokens, _: min(tokens, 0.0))
+
+    async def acquire(
+        self,
+        cnpj: str,
+        requests: int,
+        cancel_event: threading.Event,
+        on_status: Callable[[str], None],
+        min_grant: int = 10,
+    ) -> int:
+        """
+        Aguarda fichas e reserva até `requests` delas.
+
+        Espera até haver pelo menos `min_grant` fichas (ou `requests`, ou a
+        capacidade do balde, se menores), informando a contagem regressiva.
+
+        Returns:
+            Quantidade de requisições liberadas (>= 1).
+
+        Raises:
+            CancelledException: Se o usuário cancelar durante a espera.
+        """
+        while True:
+            if cancel_event.is_set():
+                raise CancelledException("Operação cancelada pelo usuário")
+
+            state = await asyncio.to_thread(self.state, cnpj)
+            needed = max(min(requests, min_grant, state.capacity), 1)
+            if state.available >= needed:
+                granted = await asyncio.to_thread(self.try_acquire, cnpj, requests)
+                if granted >= 1:
+                    return granted
+
+            wait = state.wait_for(needed)
+            on_status(
+                f"Limite de requisições de {cnpj} atingido — "
+                f"retomando em {format_seconds(wait)}"
+            )
+            await asyncio.sleep(min(max(wait, 0.5), 1.0))
+
+
+# Instância compartilhada pelo app
+sefaz_rate_limiter = RateLimiter()
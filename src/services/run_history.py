@@ -0,0 +1,276 @@
+"""
+Histórico de execuções de download (NF-e e NFS-e).
+
+Cada execução é gravada em um banco SQLite no AppData com perfil, horários,
+contagem de itens, falhas e status final. As consultas são paginadas e
+indexadas por data de início, permitindo filtrar milhares de execuções
+rapidamente.
+"""
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass
+
+from config.paths import RUN_HISTORY_PATH
+from services.sqlite_store import SqliteStore
+
+logger = logging.getLogger(__name__)
+
+# Tipos de execução
+KIND_NFE = "nfe"
+KIND_NFSE = "nfse"
+
+# Status de execução
+STATUS_RUNNING = "em_andamento"
+STATUS_SUCCESS = "sucesso"
+STATUS_ERROR = "erro"
+STATUS_CANCELLED = "cancelado"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    profile TEXT NOT NULL DEFAULT '',
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    items_total INTEGER NOT NULL DEFAULT 0,
+    items_done INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_kind_started ON runs (kind, started_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_profile ON runs (profile);
+"""
+
+_COLUMNS = (
+    "id, kind, profile, started_at, ended_at, items_total, "
+    "items_done, failures, status, error"
+)
+
+
+@dataclass
+class RunRecord:
+    """Uma execução registrada no histórico."""
+
+    id: int
+    kind: str
+    profile: str
+    started_at: float
+    ended_at: float | None
+    items_total: int
+    items_done: int
+    failures: int
+    status: str
+    error: str | None = None
+
+    @property
+    def duration_s(self) -> float | None:
+        """Duração da execução em segundos (None se ainda em andamento)."""
+        if self.ended_at is None:
+            return None
+        return max(self.ended_at - self.started_at, 0.0)
+
+    @property
+    def items_per_minute(self) -> float | None:
+        """Vazão média da execução em itens por minuto."""
+        duration = self.duration_s
+        if not duration:
+            return None
+        return self.items_done / (duration / 60)
+
+    @property
+    def cancelled(self) -> bool:
+        """Indica se a execução foi cancelada pelo usuário."""
+        return self.status == STATUS_CANCELLED
+
+
+class RunHistoryStore(SqliteStore):
+    """
+    Armazena e consulta execuções no banco SQLite.
+
+    Uso:
+        store = RunHistoryStore()
+        run_id = store.start_run(KIND_NFE, "Empresa A")
+        store.finish_run(run_id, STATUS_SUCCESS, items_total=10, items_done=10)
+        records = store.query(kind=KIND_NFE, limit=50)
+    """
+
+    def __init__(self, db_path: str = RUN_HISTORY_PATH):
+        """
+        Args:
+            db_path: Caminho do arquivo SQLite.
+        """
+        super().__init__(db_path, _SCHEMA)
+
+    def start_run(self, kind: str, profile: str) -> int:
+        """
+        Registra o início de uma execução.
+
+        Args:
+            kind: Tipo da execução (KIND_NFE ou KIND_NFSE).
+            profile: Nome do perfil/empresa usado.
+
+        Returns:
+            ID da execução criada.
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (kind, profile, started_at, status) VALUES (?, ?, ?, ?)",
+                (kind, profile or "", time.time(), STATUS_RUNNING),
+            )
+            return cursor.lastrowid
+
+    def finish_run(
+        self,
+        run_id: int,
+        status: str,
+        items_total: int = 0,
+        items_done: int = 0,
+        failures: int = 0,
+        error: str | None = None,
+    ):
+        """
+        Registra o fim de uma execução.
+
+        Args:
+            run_id: ID retornado por start_run.
+            status: Status final (STATUS_SUCCESS, STATUS_ERROR, STATUS_CANCELLED).
+            items_total: Total de itens previstos.
+            items_done: Itens processados.
+            failures: Número de falhas.
+            error: Mensagem de erro, se houver.
+        """
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE runs
+                SET ended_at = ?, status = ?, items_total = ?, items_done = ?,
+                    failures = ?, error = ?
+                WHERE id = ?
+                """,
+                (time.time(), status, items_total, items_done, failures, error, run_id),
+            )
+
+    def _where(
+        self, kind: str | None, profile: str | None, status: str | None
+    ) -> tuple[str, list]:
+        """Monta a cláusula WHERE a partir dos filtros."""
+        clauses = []
+        params = []
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if profile:
+            clauses.append("profile LIKE ?")
+            params.append(f"%{profile}%")
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def query(
+        self,
+        kind: str | None = None,
+        profile: str | None = None,
+        status: str | None = None,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> list[RunRecord]:
+        """
+        Lista execuções, da mais recente para a mais antiga.
+
+        Args:
+            kind: Filtra por tipo (None = todos).
+            profile: Filtra por trecho do nome do perfil (None = todos).
+            status: Filtra por status (None = todos).
+            limit: Tamanho da página.
+            offset: Deslocamento da página.
+
+        Returns:
+            Lista de RunRecord.
+        """
+        where, params = self._where(kind, profile, status)
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT {_COLUMNS} FROM runs {where} "
+                    "ORDER BY started_at DESC, id DESC LIMIT ? OFFSET ?",
+                    (*params, limit, offset),
+                ).fetchall()
+        except sqlite3.Error as ex:
+            logger.error(f"Erro ao consultar histórico: {ex}")
+            return []
+        return [RunRecord(*row) for row in rows]
+
+    def count(
+        self,
+        kind: str | None = None,
+        profile: str | None = None,
+        status: str | None = None,
+    ) -> int:
+        """Retorna o número de execuções que atendem aos filtros."""
+        where, params = self._where(kind, profile, status)
+        try:
+            with self._connect() as conn:
+                return conn.execute(
+                    f"SELECT COUNT(*) FROM runs {where}", params
+                ).fetchone()[0]
+        except sqlite3.Error as ex:
+            logger.error(f"Erro ao contar histórico: {ex}")
+            return 0
+
+
+class RunRecorder:
+    """
+    Acompanha uma execução em andamento e grava o resultado no histórico.
+
+    Falhas ao gravar são apenas logadas, para nunca interromper o download.
+    """
+
+    def __init__(self, store: RunHistoryStore, kind: str, profile: str):
+        """
+        Args:
+            store: Banco de histórico.
+            kind: Tipo da execução (KIND_NFE ou KIND_NFSE).
+            profile: Nome do perfil/empresa usado.
+        """
+        self._store = store
+        self._run_id: int | None = None
+        self.items_total = 0
+        self.items_done = 0
+        self.failures = 0
+
+        try:
+            self._run_id = store.start_run(kind, profile)
+        except Exception as ex:
+            logger.error(f"Erro ao registrar início da execução: {ex}")
+
+    def progress(self, current: int, total: int):
+        """Atualiza a contagem de itens processados."""
+        self.items_done = current
+        self.items_total = total
+
+    def failure(self, count: int = 1):
+        """Registra falhas de itens."""
+        self.failures += count
+
+    def finish(self, status: str, error: str | None = None):
+        """Grava o resultado final da execução."""
+        if self._run_id is None:
+            return
+        try:
+            self._store.finish_run(
+                self._run_id,
+                status,
+                items_total=self.items_total,
+                items_done=self.items_done,
+                failures=self.failures,
+                error=error,
+            )
+        except Exception as ex:
+            logger.error(f"Erro ao registrar fim da execução: {ex}")
+        self._run_id = None
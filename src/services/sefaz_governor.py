@@ -0,0 +1,239 @@
+"""
+Governador de requisições ao SEFAZ.
+
+Detecta respostas de limitação ("consumo indevido", cStat 656, HTTP 429/503)
+e reage com backoff exponencial com jitter. Após limitações consecutivas
+para o mesmo CNPJ, abre um circuito que pausa novas consultas daquele CNPJ
+até o fim do período de resfriamento.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from auto_nfe import CancelledException
+
+from utils.utils import format_seconds
+
+logger = logging.getLogger(__name__)
+
+# Mensagens/códigos que indicam limitação de consumo pelo SEFAZ. Os códigos
+# só contam junto do contexto (cStat, HTTP, status): um número solto como
+# "503 notas baixadas" não é limitação
+_THROTTLE_PATTERN = re.compile(
+    r"consumo\s+indevido"
+    r"|too\s+many\s+requests"
+    r"|service\s+unavailable"
+    r"|cstat\W{0,3}656\b"
+    r"|\b(?:http|status(?:[\s_]code)?)\W{0,3}(?:429|503)\b"
+    r"|\b(?:429|503)\s+(?:client|server)\s+error",
+    re.IGNORECASE,
+)
+
+
+def is_throttling(message: str | None) -> bool:
+    """Indica se uma mensagem/erro corresponde a limitação de consumo."""
+    return bool(message) and _THROTTLE_PATTERN.search(message) is not None
+
+
+@dataclass
+class _Circuit:
+    """Estado do circuito de um CNPJ."""
+
+    consecutive_throttles: int = 0
+    open_until: float = 0.0
+
+
+class RequestGovernor:
+    """
+    Controla tentativas e pausas das consultas por CNPJ.
+
+    Uso:
+        await governor.run(cnpj, attempt, cancel_event, on_status)
+
+    onde attempt(stop_event, callback_status) retorna o awaitable da consulta.
+    O governador seta stop_event quando detecta limitação no callback_status,
+    fazendo o cliente parar para aguardar o backoff.
+    """
+
+    def __init__(
+        self,
+        base_delay_s: float = 10.0,
+        max_delay_s: float = 300.0,
+        circuit_threshold: int = 3,
+        cooldown_s: float = 3600.0,
+        max_attempts: int = 8,
+    ):
+        """
+        Args:
+            base_delay_s: Espera base do backoff exponencial.
+            max_delay_s: Espera máxima do backoff.
+            circuit_threshold: Limitações consecutivas que abrem o circuito.
+            cooldown_s: Duração do circuito aberto (SEFAZ bloqueia por ~1h).
+            max_attempts: Número máximo de tentativas por execução.
+        """
+        self._base_delay_s = base_delay_s
+        self._max_delay_s = max_delay_s
+        self._circuit_threshold = circuit_threshold
+        self._cooldown_s = cooldown_s
+        self._max_attempts = max_attempts
+        self._circuits: dict[str, _Circuit] = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, cnpj: str) -> _Circuit:
+        with self._lock:
+            circuit = self._circuits.setdefault(cnpj, _Circuit())
+            if circuit.open_until and time.time() >= circuit.open_until:
+                # Resfriamento cumprido: volta ao backoff desde a primeira tentativa,
+                # em vez de reabrir o circuito na próxima limitação
+                circuit.consecutive_throttles = 0
+                circuit.open_until = 0.0
+            return circuit
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Calcula a espera da tentativa (exponencial com "equal jitter").
+
+        Metade da espera é fixa e metade aleatória, evitando que execuções
+        simultâneas voltem a consultar ao mesmo tempo.
+        """
+        delay = min(self._max_delay_s, self._base_delay_s * (2**attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def remaining_cooldown(self, cnpj: str) -> float:
+        """Segundos restantes de circuito aberto para o CNPJ (0 se fechado)."""
+        return max(self._circuit(cnpj).open_until - time.time(), 0.0)
+
+    def record_throttle(self, cnpj: str) -> float:
+        """
+        Registra uma limitação e retorna quanto tempo aguardar.
+
+        Abre o circuito ao atingir o limite de limitações consecutivas.
+        """
+        circuit = self._circuit(cnpj)
+        circuit.consecutive_throttles += 1
+
+        if circuit.consecutive_throttles >= self._circuit_threshold:
+            circuit.open_until = time.time() + self._cooldown_s
+            logger.warning(
+                f"Circuito aberto para {cnpj} por {format_seconds(self._cooldown_s)} "
+                f"após {circuit.consecutive_throttles} limitações"
+            )
+            return self._cooldown_s
+
+        delay = self.backoff_delay(circuit.consecutive_throttles - 1)
+        logger.info(f"Limitação do SEFAZ para {cnpj}; aguardando {delay:.0f}s")
+        return delay
+
+    def record_success(self, cnpj: str):
+        """Fecha o circuito do CNPJ após uma consulta bem sucedida."""
+        circuit = self._circuit(cnpj)
+        circuit.consecutive_throttles = 0
+        circuit.open_until = 0.0
+
+    async def _wait(
+        self,
+        seconds: float,
+        message: str,
+        cancel_event: threading.Event,
+        on_status: Callable[[str], None],
+    ):
+        """Aguarda informando a contagem regressiva; interrompe ao cancelar."""
+        deadline = time.monotonic() + seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            if cancel_event.is_set():
+                raise CancelledException("Operação cancelada pelo usuário")
+            on_status(f"{message} — retomando em {format_seconds(remaining)}")
+            await asyncio.sleep(min(remaining, 1.0))
+
+    async def run(
+        self,
+        cnpj: str,
+        attempt: Callable[[threading.Event, Callable[[str], None]], Awaitable[Any]],
+        cancel_event: threading.Event,
+        on_status: Callable[[str], None],
+        callback_status: Callable[[str], None] | None = None,
+        on_throttle: Callable[[], None] | None = None,
+    ) -> Any:
+        """
+        Executa a consulta respeitando backoff e circuito do CNPJ.
+
+        Args:
+            cnpj: CNPJ/CPF dono do certificado.
+            attempt: Fábrica da consulta, recebe (stop_event, callback_status).
+            cancel_event: Evento de cancelamento do usuário.
+            on_status: Recebe o status do governador para exibição.
+            callback_status: Callback de status original do cliente.
+            on_throttle: Chamado a cada limitação detectada.
+
+        Returns:
+            Resultado da consulta.
+
+        Raises:
+            CancelledException: Se o usuário cancelar.
+            Exception: Erros que não são limitação, ou limitação persistente.
+        """
+        for attempt_number in range(1, self._max_attempts + 1):
+            cooldown = self.remaining_cooldown(cnpj)
+            if cooldown > 0:
+                await self._wait(
+                    cooldown,
+                    f"SEFAZ bloqueou consultas de {cnpj} (circuito aberto)",
+                    cancel_event,
+                    on_status,
+                )
+
+            stop_event = threading.Event()
+            throttled = threading.Event()
+
+            def status_filter(message: str):
+                # Interrompe o cliente assim que o SEFAZ sinaliza limitação
+                if is_throttling(message):
+                    throttled.set()
+                    stop_event.set()
+                if callback_status is not None:
+                    callback_status(message)
+
+            try:
+                result = await attempt(stop_event, status_filter)
+                if not throttled.is_set():
+                    self.record_success(cnpj)
+                    return result
+                error: Exception | None = None
+            except CancelledException:
+                if cancel_event.is_set() or not throttled.is_set():
+                    raise
+                error = None
+            except Exception as ex:
+                if not is_throttling(str(ex)):
+                    raise
+                error = ex
+
+            # Limitação detectada: aguarda antes da próxima tentativa
+            if on_throttle is not None:
+                on_throttle()
+            if attempt_number == self._max_attempts:
+                raise error or RuntimeError(
+                    "SEFAZ continua limitando as consultas; tente novamente mais tarde"
+                )
+
+            delay = self.record_throttle(cnpj)
+            if self.remaining_cooldown(cnpj) > 0:
+                message = f"SEFAZ bloqueou consultas de {cnpj} (circuito aberto)"
+            else:
+                message = (
+                    f"SEFAZ limitando consultas "
+                    f"(tentativa {attempt_number}/{self._max_attempts})"
+                )
+            await self._wait(delay, message, cancel_event, on_status)
+
+        raise RuntimeError("Número máximo de tentativas atingido")
+
+
+# Instância compartilhada pelo app: o circuito vale para toda a sessão
+sefaz_governor = RequestGovernor()
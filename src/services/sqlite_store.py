@@ -0,0 +1,49 @@
+"""
+Base dos bancos SQLite locais do app (histórico, catálogo, NSU).
+
+Cada operação abre sua própria conexão, em modo WAL, e a fecha ao final:
+as chamadas vêm de threads diferentes (asyncio.to_thread) e conexões
+sqlite3 não podem ser compartilhadas entre threads. O schema é criado na
+primeira conexão.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class SqliteStore:
+    """
+    Conexões e schema de um banco SQLite local.
+
+    Subclasses passam o schema ao construtor e usam `_connect()` em cada
+    operação; gravações concorrentes são serializadas com `_lock`.
+    """
+
+    def __init__(self, db_path: str, schema: str, timeout: float = 5.0):
+        """
+        Args:
+            db_path: Caminho do arquivo SQLite.
+            schema: Script de criação das tabelas (CREATE ... IF NOT EXISTS).
+            timeout: Espera máxima por um banco bloqueado, em segundos.
+        """
+        self._db_path = db_path
+        self._schema = schema
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Abre uma conexão (criando o schema na primeira vez), com commit e fechamento."""
+        conn = sqlite3.connect(self._db_path, timeout=self._timeout)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(self._schema)
+                self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
@@ -0,0 +1,164 @@
+"""
+Estimativa de vazão e tempo restante de um job.
+
+A duração de cada item é suavizada por uma média móvel exponencial
+(EWMA): a estimativa acompanha mudanças de ritmo sem oscilar a cada item.
+Vários itens informados de uma vez contam como vários passos da média.
+O tempo em que o job fica pausado aguardando o SEFAZ (backoff, circuito,
+orçamento) não entra na duração dos itens, e uma duração isolada muito
+acima da média (rajada de limitação, rede parada) é limitada para não
+distorcer a previsão.
+
+A estimativa é recalculada por quem reporta o progresso, no máximo uma
+vez por intervalo; a UI só lê o último snapshot.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from utils.utils import format_seconds
+
+
+@dataclass(frozen=True)
+class ThroughputSnapshot:
+    """Vazão e previsão de um job em um momento."""
+
+    rate_per_min: float | None  # Itens por minuto (None = ainda sem amostras)
+    eta_s: float | None  # Segundos restantes (None = desconhecido)
+    elapsed_s: float  # Tempo desde o primeiro progresso
+    paused: bool = False
+
+    def summary(self) -> str:
+        """Texto curto para a área de progresso."""
+        parts = []
+        if self.rate_per_min is not None:
+            parts.append(f"{self.rate_per_min:.1f} itens/min".replace(".", ","))
+        if self.paused:
+            parts.append("pausado")
+        elif self.eta_s is not None:
+            parts.append(f"restante ~{format_seconds(self.eta_s)}")
+        parts.append(f"decorrido {format_seconds(self.elapsed_s)}")
+        return " · ".join(parts)
+
+
+class ThroughputEstimator:
+    """
+    EWMA da duração por item, com pausas descontadas.
+
+    Uso:
+        estimator = ThroughputEstimator()
+        snapshot = estimator.update(current, total)  # None = dentro do intervalo
+        snapshot = estimator.set_paused(True)
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.1,
+        min_interval_s: float = 1.0,
+        outlier_factor: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            alpha: Peso de cada item novo na média (0-1).
+            min_interval_s: Intervalo mínimo entre snapshots.
+            outlier_factor: Duração máxima aceita de um item, em múltiplos da média.
+            clock: Relógio monotônico (substituível).
+        """
+        self._alpha = alpha
+        self._min_interval_s = min_interval_s
+        self._outlier_factor = outlier_factor
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._started_at: float | None = None
+        self._last_at = 0.0  # Momento do último item contado (ou da retomada)
+        self._last_count = 0
+        self._current = 0
+        self._total = 0
+        self._item_s: float | None = None  # Média da duração por item
+        self._paused_since: float | None = None
+
+        self._snapshot: ThroughputSnapshot | None = None
+        self._snapshot_at = 0.0
+
+    def update(self, current: int, total: int) -> ThroughputSnapshot | None:
+        """
+        Registra o progresso.
+
+        Returns:
+            Novo snapshot, ou None se o último ainda está dentro do intervalo.
+        """
+        now = self._clock()
+        with self._lock:
+            if self._started_at is None:
+                # Primeiro progresso: só define a base (o job pode retomar de um ponto)
+                self._started_at = self._last_at = now
+                self._last_count = current
+
+            delta = current - self._last_count
+            if delta < 0:
+                # Contagem reiniciada (nova tentativa): nova base, mesma média
+                self._last_count, self._last_at = current, now
+            elif delta > 0:
+                self._add_sample((now - self._last_at) / delta, delta)
+                self._last_count, self._last_at = current, now
+
+            self._current, self._total = current, total
+            return self._refresh(now)
+
+    def set_paused(self, paused: bool) -> ThroughputSnapshot | None:
+        """
+        Marca o início/fim de uma pausa (job aguardando o SEFAZ).
+
+        Returns:
+            Novo snapshot quando o estado de pausa muda, senão None.
+        """
+        now = self._clock()
+        with self._lock:
+            if paused == (self._paused_since is not None):
+                return None
+            if paused:
+                self._paused_since = now
+            else:
+                # O tempo pausado não conta para o próximo item
+                self._last_at += now - max(self._paused_since, self._last_at)
+                self._paused_since = None
+            if self._started_at is None:
+                return None
+            return self._refresh(now, force=True)
+
+    def _add_sample(self, item_s: float, count: int):
+        if self._item_s is None:
+            self._item_s = item_s
+            return
+        if self._item_s > 0:
+            item_s = min(item_s, self._item_s * self._outlier_factor)
+        # `count` itens de mesma duração equivalem a `count` passos da média
+        weight = 1 - (1 - self._alpha) ** count
+        self._item_s += weight * (item_s - self._item_s)
+
+    def _refresh(self, now: float, force: bool = False) -> ThroughputSnapshot | None:
+        if (
+            not force
+            and self._snapshot is not None
+            and now - self._snapshot_at < self._min_interval_s
+        ):
+            return None
+
+        rate = eta = None
+        if self._item_s is not None and self._item_s > 0:
+            rate = 60 / self._item_s
+            if self._total > 0:
+                eta = max(self._total - self._current, 0) * self._item_s
+
+        self._snapshot = ThroughputSnapshot(
+            rate_per_min=rate,
+            eta_s=eta,
+            elapsed_s=now - self._started_at,
+            paused=self._paused_since is not None,
+        )
+        self._snapshot_at = now
+        return self._snapshot
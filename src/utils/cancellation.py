@@ -0,0 +1,126 @@
+"""
+Utilitários de cancelamento cooperativo.
+
+Permite interromper esperas em andamento (chamadas ao SEFAZ, navegação do
+navegador) assim que o cancel_event é sinalizado, em vez de aguardar o
+backend perceber o evento entre um item e outro.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from auto_nfe import CancelledException
+
+logger = logging.getLogger(__name__)
+
+# Meta de tempo entre o clique em "Cancelar" e a liberação da UI
+CANCEL_TARGET_S = 2.0
+
+# Intervalo de verificação do cancel_event enquanto a tarefa roda
+_POLL_INTERVAL_S = 0.05
+
+
+class CancelTimer:
+    """
+    Mede o tempo entre o pedido de cancelamento e sua conclusão.
+
+    Uso:
+        timer = CancelTimer("NF-e")
+        timer.start()      # no clique em "Cancelar"
+        timer.finish()     # quando a UI é liberada
+    """
+
+    def __init__(self, label: str):
+        """
+        Args:
+            label: Nome da operação, usado nas mensagens de log.
+        """
+        self._label = label
+        self._requested_at: float | None = None
+
+    @property
+    def requested(self) -> bool:
+        """Indica se o cancelamento foi solicitado."""
+        return self._requested_at is not None
+
+    def start(self):
+        """Registra o instante do pedido de cancelamento."""
+        if self._requested_at is None:
+            self._requested_at = time.perf_counter()
+
+    def finish(self) -> float | None:
+        """
+        Registra o fim do cancelamento e loga o tempo decorrido.
+
+        Returns:
+            Tempo até o cancelamento em segundos, ou None se não foi solicitado.
+        """
+        if self._requested_at is None:
+            return None
+
+        elapsed = time.perf_counter() - self._requested_at
+        self._requested_at = None
+
+        if elapsed <= CANCEL_TARGET_S:
+            logger.info(f"[{self._label}] Tempo até cancelar: {elapsed:.2f}s")
+        else:
+            logger.warning(
+                f"[{self._label}] Tempo até cancelar: {elapsed:.2f}s "
+                f"(meta: {CANCEL_TARGET_S:.1f}s)"
+            )
+        return elapsed
+
+
+async def await_cancellable(
+    awaitable: Awaitable[Any],
+    cancel_event: threading.Event,
+    on_cancel: Callable[[], None] | None = None,
+    grace_s: float = 1.0,
+) -> Any:
+    """
+    Aguarda um awaitable, interrompendo a espera quando cancel_event é setado.
+
+    Ao detectar o cancelamento, executa on_cancel (ex: abortar a navegação),
+    dá grace_s segundos para o backend encerrar sozinho e então cancela a
+    tarefa. Funções bloqueantes em asyncio.to_thread continuam rodando na
+    thread, mas a UI deixa de esperar por elas.
+
+    Args:
+        awaitable: Coroutine ou future a aguardar.
+        cancel_event: Evento sinalizado pelo botão "Cancelar".
+        on_cancel: Callback opcional para interromper esperas em andamento.
+        grace_s: Tempo máximo de espera após on_cancel.
+
+    Returns:
+        O resultado do awaitable, se terminar antes do cancelamento.
+
+    Raises:
+        CancelledException: Se o cancelamento foi solicitado.
+    """
+    task = asyncio.ensure_future(awaitable)
+
+    while not cancel_event.is_set():
+        done, _ = await asyncio.wait({task}, timeout=_POLL_INTERVAL_S)
+        if task in done:
+            return task.result()
+
+    # Interrompe esperas em andamento (timeouts, navegação, etc)
+    if on_cancel is not None:
+        try:
+            on_cancel()
+        except Exception as ex:
+            logger.warning(f"Falha ao interromper operação em andamento: {ex}")
+
+    # Dá uma chance curta para o backend encerrar sozinho
+    done, _ = await asyncio.wait({task}, timeout=grace_s)
+    if task in done:
+        # Erros após o abort são consequência do cancelamento
+        if not task.cancelled() and task.exception() is None:
+            return task.result()
+    else:
+        task.cancel()
+
+    raise CancelledException("Operação cancelada pelo usuário")
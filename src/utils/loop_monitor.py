@@ -0,0 +1,107 @@
+"""
+Monitor de atraso (lag) do event loop do app.
+
+Uma tarefa periódica mede o atraso entre o horário esperado e o real de
+cada tick. Em paralelo, uma thread de amostragem verifica se o loop parou
+de responder; se a parada passar do limite, captura a pilha da thread do
+loop, registrando no log qual código está bloqueando a interface.
+
+O custo é de um tick a cada 0,5s e uma leitura de float a cada 0,1s na
+thread de amostragem, então o monitor pode ficar ligado em produção.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Mede o lag do event loop e registra travamentos com a pilha do bloqueio.
+
+    Uso (dentro do event loop):
+        monitor = LoopLagMonitor()
+        monitor.start()
+        print(monitor.current_lag_s, monitor.max_lag_s)
+    """
+
+    def __init__(
+        self,
+        interval_s: float = 0.5,
+        stall_threshold_s: float = 0.25,
+        sample_interval_s: float = 0.1,
+    ):
+        """
+        Args:
+            interval_s: Intervalo entre os ticks do loop.
+            stall_threshold_s: Lag a partir do qual o travamento é registrado.
+            sample_interval_s: Intervalo da thread de amostragem.
+        """
+        self._interval_s = interval_s
+        self._stall_threshold_s = stall_threshold_s
+        self._sample_interval_s = sample_interval_s
+
+        self.current_lag_s = 0.0
+        self.max_lag_s = 0.0
+        self.stall_count = 0
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._stall_stack: str | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Inicia a medição (chamar dentro do event loop monitorado)."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._tick_loop())
+        threading.Thread(
+            target=self._sampler, daemon=True, name="loop-lag-sampler"
+        ).start()
+
+    def stop(self):
+        """Para a medição."""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _tick_loop(self):
+        """Tick periódico: o atraso de cada sleep é o lag do loop."""
+        while True:
+            expected = time.monotonic() + self._interval_s
+            await asyncio.sleep(self._interval_s)
+            now = time.monotonic()
+
+            lag = max(now - expected, 0.0)
+            self.current_lag_s = lag
+            self.max_lag_s = max(self.max_lag_s, lag)
+            self._heartbeat = now
+
+            if lag >= self._stall_threshold_s:
+                self.stall_count += 1
+                stack = self._stall_stack or "(pilha não capturada)\n"
+                logger.warning(
+                    f"Event loop travou por {lag * 1000:.0f} ms. "
+                    f"Código em execução durante o travamento:\n{stack}"
+                )
+            self._stall_stack = None
+
+    def _sampler(self):
+        """Thread que captura a pilha do loop enquanto ele está travado."""
+        while not self._stop.wait(self._sample_interval_s):
+            stalled_for = time.monotonic() - self._heartbeat - self._interval_s
+            if stalled_for < self._stall_threshold_s or self._stall_stack is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._stall_stack = "".join(traceback.format_stack(frame))
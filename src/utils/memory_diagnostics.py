@@ -0,0 +1,239 @@
+"""
+Modo de diagnóstico de memória do app.
+
+Ativado pela variável de ambiente AUTO_NFE_MEMORY_DIAG=1. Tira snapshots
+periódicos do tracemalloc e compara cada um com o anterior e com o
+primeiro, contando também os controles Flet vivos: os anexados a cada
+view/overlay da página e os que continuam em memória sem estar na página
+(candidatos a vazamento, como views antigas e toasts não removidos).
+
+Cada snapshot é acrescentado a um relatório em LOG_DIR com o top-N de
+crescimento por linha de código. Como tracemalloc deixa as alocações mais
+lentas, o modo fica desligado por padrão.
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import flet as ft
+
+logger = logging.getLogger(__name__)
+
+ENV_FLAG = "AUTO_NFE_MEMORY_DIAG"
+DEFAULT_INTERVAL_S = float(os.environ.get("AUTO_NFE_MEMORY_DIAG_INTERVAL_S", "300"))
+
+# Alocações do próprio diagnóstico não entram no relatório
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+
+def memory_diagnostics_enabled() -> bool:
+    """Indica se o modo de diagnóstico foi ligado pela variável de ambiente."""
+    return os.environ.get(ENV_FLAG, "").strip().lower() in ("1", "true", "sim")
+
+
+@dataclass
+class ControlCounts:
+    """Contagem de controles Flet em um momento."""
+
+    per_view: dict[str, int] = field(default_factory=dict)
+    overlay: int = 0
+    live_by_type: Counter = field(default_factory=Counter)
+
+    @property
+    def attached(self) -> int:
+        return sum(self.per_view.values()) + self.overlay
+
+    @property
+    def live(self) -> int:
+        return sum(self.live_by_type.values())
+
+    @property
+    def detached(self) -> int:
+        return max(self.live - self.attached, 0)
+
+
+def count_tree(root) -> int:
+    """Conta os controles de uma árvore Flet (o próprio root incluso)."""
+    seen: set[int] = set()
+    pending = [root]
+    while pending:
+        control = pending.pop()
+        if id(control) in seen:
+            continue
+        seen.add(id(control))
+        # Percorre atributos públicos que guardam controles ou listas deles
+        for name, value in vars(control).items():
+            if name.startswith("_") or name in ("page", "parent"):
+                continue
+            if isinstance(value, ft.Control):
+                pending.append(value)
+            elif isinstance(value, (list, tuple)):
+                pending.extend(v for v in value if isinstance(v, ft.Control))
+    return len(seen)
+
+
+def count_controls(page: ft.Page) -> ControlCounts:
+    """Conta controles anexados por view/overlay e todos os vivos por tipo."""
+    counts = ControlCounts()
+    for index, view in enumerate(page.views):
+        route = getattr(view, "route", None) or f"view[{index}]"
+        counts.per_view[route] = counts.per_view.get(route, 0) + count_tree(view)
+    counts.overlay = sum(count_tree(c) for c in page.overlay)
+
+    for obj in gc.get_objects():
+        if isinstance(obj, ft.Control):
+            counts.live_by_type[type(obj).__name__] += 1
+    return counts
+
+
+def _format_stats(stats: list[tracemalloc.StatisticDiff], top_n: int) -> list[str]:
+    """Formata o top-N de crescimento por linha de código."""
+    lines = []
+    growing = [s for s in stats if s.size_diff > 0][:top_n]
+    if not growing:
+        return ["  (sem crescimento)"]
+    for stat in growing:
+        frame = stat.traceback[0]
+        lines.append(
+            f"  {stat.size_diff / 1024:>+10.1f} KiB {stat.count_diff:>+8} blocos  "
+            f"(total {stat.size / 1024:.1f} KiB)  {frame.filename}:{frame.lineno}"
+        )
+    return lines
+
+
+class MemoryDiagnostics:
+    """
+    Snapshots periódicos de memória com relatório de crescimento.
+
+    Uso (dentro do event loop):
+        diagnostics = MemoryDiagnostics(page, LOG_DIR)
+        diagnostics.start()
+        page.run_task(diagnostics.run)
+    """
+
+    def __init__(
+        self,
+        page: ft.Page,
+        log_dir: str,
+        interval_s: float = DEFAULT_INTERVAL_S,
+        top_n: int = 25,
+        frames: int = 1,
+    ):
+        """
+        Args:
+            page: Página do Flet (para contar os controles).
+            log_dir: Pasta onde o relatório será gravado.
+            interval_s: Intervalo entre snapshots.
+            top_n: Quantas linhas de crescimento listar.
+            frames: Profundidade de pilha guardada pelo tracemalloc.
+        """
+        self._page = page
+        self._interval_s = interval_s
+        self._top_n = top_n
+        self._frames = frames
+        self.report_path = os.path.join(
+            log_dir, f"memoria_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        )
+
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._previous: tracemalloc.Snapshot | None = None
+        self._baseline_counts: ControlCounts | None = None
+        self._snapshot_count = 0
+
+    def start(self):
+        """Liga o tracemalloc (o quanto antes, para rastrear mais alocações)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+        logger.info(f"Diagnóstico de memória ligado. Relatório: {self.report_path}")
+
+    async def run(self):
+        """Tira um snapshot a cada intervalo até o app fechar."""
+        while True:
+            await asyncio.sleep(self._interval_s)
+            try:
+                await self.snapshot()
+            except Exception as ex:
+                logger.warning(f"Falha no diagnóstico de memória: {ex}")
+
+    async def snapshot(self, reason: str = "periódico"):
+        """Tira um snapshot, compara com o anterior e o inicial e grava o relatório."""
+        # Contagem de controles mexe na página: fica no event loop
+        counts = count_controls(self._page)
+        current, peak = tracemalloc.get_traced_memory()
+
+        # Snapshot e comparações são pesados: rodam fora do event loop
+        snapshot, since_previous, since_baseline = await asyncio.to_thread(
+            self._take_and_compare
+        )
+
+        self._snapshot_count += 1
+        lines = [
+            f"=== Snapshot #{self._snapshot_count} - "
+            f"{datetime.now():%Y-%m-%d %H:%M:%S} ({reason}, rota {self._page.route}) ===",
+            f"Memória rastreada: atual {current / 1024 / 1024:.1f} MiB, "
+            f"pico {peak / 1024 / 1024:.1f} MiB",
+            f"Controles Flet vivos: {counts.live} "
+            f"(anexados {counts.attached}, fora da página {counts.detached})",
+            "Controles por view: "
+            + (", ".join(f"{r}={n}" for r, n in counts.per_view.items()) or "(nenhuma)")
+            + f", overlay={counts.overlay}",
+        ]
+        lines += self._format_control_growth(counts)
+
+        if since_previous is not None:
+            lines.append(f"Top {self._top_n} crescimento desde o snapshot anterior:")
+            lines += _format_stats(since_previous, self._top_n)
+        if since_baseline is not None:
+            lines.append(f"Top {self._top_n} crescimento desde o início:")
+            lines += _format_stats(since_baseline, self._top_n)
+
+        try:
+            with open(self.report_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n\n")
+        except OSError as ex:
+            logger.warning(f"Não foi possível gravar relatório de memória: {ex}")
+
+        if self._baseline_counts is not None:
+            growth = counts.live - self._baseline_counts.live
+            logger.info(
+                f"Memória: {current / 1024 / 1024:.1f} MiB rastreados, "
+                f"{counts.live} controles vivos ({growth:+d} desde o início, "
+                f"{counts.detached} fora da página)"
+            )
+
+        if self._baseline_counts is None:
+            self._baseline_counts = counts
+        self._previous = snapshot
+        if self._baseline is None:
+            self._baseline = snapshot
+
+    def _take_and_compare(self):
+        """Tira o snapshot do tracemalloc e compara com o anterior e o inicial."""
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in _IGNORED_FILES]
+        )
+        since_previous = since_baseline = None
+        if self._previous is not None:
+            since_previous = snapshot.compare_to(self._previous, "lineno")
+        if self._baseline is not None and self._baseline is not self._previous:
+            since_baseline = snapshot.compare_to(self._baseline, "lineno")
+        return snapshot, since_previous, since_baseline
+
+    def _format_control_growth(self, counts: ControlCounts) -> list[str]:
+        """Tipos de controle que mais cresceram desde o início."""
+        if self._baseline_counts is None:
+            return []
+        growth = counts.live_by_type.copy()
+        growth.subtract(self._baseline_counts.live_by_type)
+        top = [(name, n) for name, n in growth.most_common(self._top_n) if n > 0]
+        if not top:
+            return ["Crescimento de controles por tipo: (nenhum)"]
+        return ["Crescimento de controles por tipo desde o início:"] + [
+            f"  {n:>+6}  {name}" for name, n in top
+        ]
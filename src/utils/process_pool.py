@@ -0,0 +1,46 @@
+"""
+Pools de processos para leitura de arquivos em paralelo (PDFs, XMLs).
+
+O parsing é CPU puro e, em threads, fica preso ao GIL; em processos ele se
+espalha pelos núcleos. Os pools usam o método spawn (o único do Windows) e
+as tarefas são funções de módulo em services/, que o filho importa sem
+carregar a interface: main.py chama multiprocessing.freeze_support() para
+executáveis congelados e pula o log e as views quando é reimportado como
+__mp_main__.
+
+No app do `flet build` o Python embutido não consegue iniciar processos
+filhos: lá process_pool_available() retorna False e os chamadores leem em
+série.
+"""
+
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Falhas ao iniciar ou manter os filhos: o chamador segue em série
+PROCESS_POOL_ERRORS = (BrokenProcessPool, OSError)
+
+
+def process_pool_available() -> bool:
+    """Indica se este processo consegue iniciar filhos para um pool."""
+    if getattr(sys, "frozen", False):
+        # Executável congelado: freeze_support() em main.py atende os filhos
+        return True
+    if not sys.executable:
+        return False
+    return os.path.basename(sys.executable).lower().startswith("python")
+
+
+def new_process_pool(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    Cria um pool de processos com o método spawn.
+
+    Args:
+        max_workers: Processos do pool (None = um por núcleo).
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
@@ -0,0 +1,208 @@
+"""
+Profiler de inicialização do app.
+
+Mede o tempo cumulativo e próprio (self) de cada etapa de inicialização e
+de cada módulo importado durante a subida, grava um relatório ordenado em
+LOG_DIR e avisa quando a inicialização passa do orçamento.
+
+Usa apenas a biblioteca padrão para poder ser importado antes de tudo.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from importlib.machinery import ExtensionFileLoader, SourceFileLoader, SourcelessFileLoader
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# Orçamento padrão de inicialização (segundos), configurável por variável de ambiente
+DEFAULT_BUDGET_S = float(os.environ.get("AUTO_NFE_STARTUP_BUDGET_S", "5"))
+
+# Loaders criados por módulo: podem ser instrumentados sem afetar outros imports
+_PER_MODULE_LOADERS = (SourceFileLoader, SourcelessFileLoader, ExtensionFileLoader)
+
+
+@dataclass
+class StartupRecord:
+    """Tempo de uma etapa ou import."""
+
+    order: int
+    name: str
+    kind: str  # "etapa" ou "import"
+    depth: int
+    cumulative_s: float
+    self_s: float
+
+
+class _ImportTimingFinder:
+    """Meta path finder que cronometra a execução de cada módulo importado."""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, "find_spec", None)
+            if find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+        if isinstance(loader, _PER_MODULE_LOADERS):
+            original = loader.exec_module
+
+            def timed_exec_module(module):
+                try:
+                    with self._profiler.step(fullname, kind="import"):
+                        original(module)
+                finally:
+                    # Devolve o loader ao estado original
+                    loader.__dict__.pop("exec_module", None)
+
+            loader.exec_module = timed_exec_module
+        return spec
+
+
+class StartupProfiler:
+    """
+    Registra etapas e imports da inicialização.
+
+    Uso:
+        profiler = StartupProfiler()
+        profiler.install_import_hook()
+        with profiler.step("Importando views"):
+            from views.home import HomeView
+        profiler.finish(LOG_DIR)
+    """
+
+    def __init__(self, budget_s: float = DEFAULT_BUDGET_S):
+        """
+        Args:
+            budget_s: Tempo máximo esperado da inicialização.
+        """
+        self._budget_s = budget_s
+        self._t0 = time.perf_counter()
+        self._thread_id = threading.get_ident()
+        self._stack: list[list] = []  # [nome, início, tempo dos filhos]
+        self._order = 0
+        self._finder: _ImportTimingFinder | None = None
+        self._finished = False
+        self.records: list[StartupRecord] = []
+
+    @contextmanager
+    def step(self, name: str, kind: str = "etapa") -> Iterator[None]:
+        """Cronometra uma etapa (aninhável)."""
+        # Só a thread principal participa da árvore de etapas
+        if self._finished or threading.get_ident() != self._thread_id:
+            yield
+            return
+
+        order = self._order
+        self._order += 1
+        frame = [name, time.perf_counter(), 0.0]
+        depth = len(self._stack)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            cumulative = time.perf_counter() - frame[1]
+            if self._stack:
+                self._stack[-1][2] += cumulative
+            self.records.append(
+                StartupRecord(
+                    order=order,
+                    name=name,
+                    kind=kind,
+                    depth=depth,
+                    cumulative_s=cumulative,
+                    self_s=max(cumulative - frame[2], 0.0),
+                )
+            )
+
+    def install_import_hook(self):
+        """Passa a cronometrar cada módulo importado."""
+        if self._finder is None:
+            self._finder = _ImportTimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall_import_hook(self):
+        """Para de cronometrar imports."""
+        if self._finder is not None and self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    @property
+    def elapsed_s(self) -> float:
+        """Tempo desde a criação do profiler."""
+        return time.perf_counter() - self._t0
+
+    def finish(self, log_dir: str) -> str | None:
+        """
+        Encerra a medição, grava o relatório e avisa se passou do orçamento.
+
+        Args:
+            log_dir: Pasta onde o relatório será gravado.
+
+        Returns:
+            Caminho do relatório, ou None se não foi possível gravá-lo.
+        """
+        if self._finished:
+            return None
+        self.uninstall_import_hook()
+        self._finished = True
+        total = self.elapsed_s
+
+        report = self._format_report(total)
+        report_path = os.path.join(
+            log_dir, f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        )
+        try:
+            with open(report_path, "w", encoding="utf-8") as f:
+                f.write(report)
+        except OSError as ex:
+            logger.warning(f"Não foi possível gravar relatório de inicialização: {ex}")
+            report_path = None
+
+        top = sorted(self.records, key=lambda r: r.self_s, reverse=True)[:10]
+        summary = ", ".join(f"{r.name} {r.self_s * 1000:.0f}ms" for r in top)
+        message = (
+            f"Inicialização em {total:.2f}s (orçamento {self._budget_s:.1f}s). "
+            f"Maiores tempos próprios: {summary}. Relatório: {report_path}"
+        )
+        if total > self._budget_s:
+            logger.warning(message)
+        else:
+            logger.info(message)
+        return report_path
+
+    def _format_report(self, total: float) -> str:
+        """Monta o relatório: ranking por tempo próprio e árvore de etapas."""
+        lines = [
+            f"Inicialização: {total * 1000:.0f} ms (orçamento {self._budget_s * 1000:.0f} ms)",
+            "",
+            "== Ordenado por tempo próprio ==",
+            f"{'próprio (ms)':>14} {'cumulativo (ms)':>16}  tipo    nome",
+        ]
+        for r in sorted(self.records, key=lambda r: r.self_s, reverse=True):
+            lines.append(
+                f"{r.self_s * 1000:>14.1f} {r.cumulative_s * 1000:>16.1f}  {r.kind:<7} {r.name}"
+            )
+
+        lines += ["", "== Árvore de etapas ==", f"{'cumulativo (ms)':>16}  nome"]
+        for r in sorted(self.records, key=lambda r: r.order):
+            lines.append(f"{r.cumulative_s * 1000:>16.1f}  {'  ' * r.depth}{r.name}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,90 @@
+"""
+Agrupamento de atualizações de UI.
+
+Cada `control.update()` é uma ida e volta com o cliente Flet. Dentro de
+`batch_updates(page)`, as chamadas feitas por `request_update` só marcam o
+lote como pendente; ao sair do bloco, um único `page.update()` envia todas
+as alterações de uma vez. Fora de um lote, `request_update` atualiza o
+controle na hora, como antes.
+
+Os contadores em `update_stats` permitem conferir quantas idas e voltas
+foram economizadas.
+"""
+
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+import flet as ft
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UpdateStats:
+    """Contadores de atualizações de UI."""
+
+    round_trips: int = 0  # updates efetivamente enviados ao cliente
+    deferred: int = 0  # updates absorvidos por um lote
+
+    def reset(self):
+        self.round_trips = 0
+        self.deferred = 0
+
+
+update_stats = UpdateStats()
+
+# Lotes abertos (a UI roda só na thread do event loop, então basta uma pilha)
+_open_batches: list["_Batch"] = []
+
+
+@dataclass
+class _Batch:
+    page: ft.Page
+    pending: int = 0
+
+
+@contextmanager
+def batch_updates(page: ft.Page) -> Iterator[None]:
+    """
+    Adia as atualizações do bloco e envia um único `page.update()` no fim.
+
+    Lotes aninhados se juntam ao mais externo.
+
+    Args:
+        page: Página cujas alterações serão enviadas.
+    """
+    if _open_batches:
+        yield
+        return
+
+    batch = _Batch(page)
+    _open_batches.append(batch)
+    try:
+        yield
+    finally:
+        _open_batches.pop()
+        if batch.pending:
+            _send(page)
+            logger.debug(
+                f"Lote de UI: {batch.pending} updates enviados em 1 ida e volta"
+            )
+
+
+def request_update(control: ft.Control):
+    """Atualiza o controle agora ou, dentro de um lote, no fim dele."""
+    if _open_batches:
+        _open_batches[-1].pending += 1
+        update_stats.deferred += 1
+        return
+    _send(control)
+
+
+def _send(control):
+    """Envia um update ao cliente, ignorando controles fora da página."""
+    update_stats.round_trips += 1
+    try:
+        control.update()
+    except RuntimeError:
+        pass
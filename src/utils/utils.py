@@ -0,0 +1,13 @@
+"""
+Utilitários gerais compartilhados pelos serviços e pela interface.
+"""
+
+
+def format_seconds(seconds: float) -> str:
+    """Formata segundos como mm:ss ou hh:mm:ss."""
+    seconds = int(max(seconds, 0))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
@@ -0,0 +1,335 @@
+import flet as ft
+import asyncio
+import os
+from datetime import date, datetime
+
+from components.toast import ToastManager
+from services.doc_catalog import DocumentCatalog, CatalogDocument, CatalogQuery
+from services.xml_scanner import ScanStats
+
+# Tamanho da página da busca
+PAGE_SIZE = 50
+
+
+def _parse_date(value: str | None) -> date | None:
+    """Converte dd/mm/aaaa em date (None se vazio)."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    return datetime.strptime(value, "%d/%m/%Y").date()
+
+
+def _parse_value(value: str | None) -> float | None:
+    """Converte '10.000,50' ou '10000.50' em float (None se vazio)."""
+    value = (value or "").strip().replace("R$", "").strip()
+    if not value:
+        return None
+    if "," in value:
+        value = value.replace(".", "").replace(",", ".")
+    return float(value)
+
+
+def _format_date(iso: str | None) -> str:
+    if not iso:
+        return "-"
+    try:
+        return date.fromisoformat(iso).strftime("%d/%m/%Y")
+    except ValueError:
+        return iso
+
+
+def _format_money(value: float | None) -> str:
+    if value is None:
+        return "-"
+    text = f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    return f"R$ {text}"
+
+
+class CatalogoView(ft.View):
+    def __init__(self, page: ft.Page):
+        super().__init__(
+            route="/catalogo",
+            appbar=ft.AppBar(
+                title=ft.Text("Catálogo de Documentos"),
+                leading=ft.IconButton(
+                    icon=ft.Icons.ARROW_BACK,
+                    on_click=lambda e: asyncio.create_task(self.go_back(e, page)),
+                ),
+            ),
+        )
+
+        self._catalog = DocumentCatalog()
+        self._query = CatalogQuery()
+        self._offset = 0
+        self._total = 0
+
+        self.toast = ToastManager(page)
+
+        # --- Filtros ---
+        self.emit_filter = ft.TextField(
+            label="CNPJ emitente", width=190, on_submit=self._apply_filters
+        )
+        self.dest_filter = ft.TextField(
+            label="CNPJ destinatário", width=190, on_submit=self._apply_filters
+        )
+        self.name_filter = ft.TextField(
+            label="Nome", hint_text="Emitente ou destinatário",
+            width=200, on_submit=self._apply_filters,
+        )
+        self.date_from_filter = ft.TextField(
+            label="Emissão de", hint_text="dd/mm/aaaa",
+            width=140, on_submit=self._apply_filters,
+        )
+        self.date_to_filter = ft.TextField(
+            label="Emissão até", hint_text="dd/mm/aaaa",
+            width=140, on_submit=self._apply_filters,
+        )
+        self.min_value_filter = ft.TextField(
+            label="Valor mínimo", hint_text="R$", width=140, on_submit=self._apply_filters
+        )
+        btn_filter = ft.Button(
+            content=ft.Text("Filtrar"),
+            icon=ft.Icons.FILTER_LIST,
+            on_click=self._apply_filters,
+        )
+        self.btn_import = ft.Button(
+            content=ft.Text("Importar pasta"),
+            icon=ft.Icons.DRIVE_FOLDER_UPLOAD,
+            tooltip="Cataloga os XMLs de uma pasta e subpastas",
+            on_click=self._import_folder,
+        )
+        btn_export = ft.Button(
+            content=ft.Text("Exportar"),
+            icon=ft.Icons.DOWNLOAD,
+            tooltip="Exporta o resultado filtrado para Parquet ou CSV",
+            on_click=self._export,
+        )
+
+        # --- Tabela ---
+        self.table = ft.DataTable(
+            columns=[
+                ft.DataColumn(label=ft.Text("Emissão")),
+                ft.DataColumn(label=ft.Text("Número"), numeric=True),
+                ft.DataColumn(label=ft.Text("Emitente")),
+                ft.DataColumn(label=ft.Text("Destinatário")),
+                ft.DataColumn(label=ft.Text("Valor"), numeric=True),
+                ft.DataColumn(label=ft.Text("Chave")),
+            ],
+            rows=[],
+        )
+
+        # --- Paginação ---
+        self.summary_text = ft.Text("")
+        self.import_text = ft.Text("", size=12, color=ft.Colors.GREY_400)
+        self.page_text = ft.Text("")
+        self.btn_prev = ft.IconButton(
+            icon=ft.Icons.CHEVRON_LEFT,
+            tooltip="Página anterior",
+            on_click=self._prev_page,
+        )
+        self.btn_next = ft.IconButton(
+            icon=ft.Icons.CHEVRON_RIGHT,
+            tooltip="Próxima página",
+            on_click=self._next_page,
+        )
+
+        self.controls = [
+            ft.Row(
+                [
+                    self.emit_filter,
+                    self.dest_filter,
+                    self.name_filter,
+                    self.date_from_filter,
+                    self.date_to_filter,
+                    self.min_value_filter,
+                ],
+                alignment=ft.MainAxisAlignment.CENTER,
+                wrap=True,
+                spacing=10,
+            ),
+            ft.Row(
+                [btn_filter, self.btn_import, btn_export, self.summary_text],
+                alignment=ft.MainAxisAlignment.CENTER,
+                spacing=20,
+            ),
+            self.import_text,
+            ft.Column([self.table], scroll=ft.ScrollMode.AUTO, expand=True),
+            ft.Row(
+                [self.btn_prev, self.page_text, self.btn_next],
+                alignment=ft.MainAxisAlignment.CENTER,
+            ),
+        ]
+
+        # --- Alinhamento ---
+        self.horizontal_alignment = ft.CrossAxisAlignment.CENTER
+
+        self._load_page()
+
+    def _read_filters(self) -> CatalogQuery | None:
+        """Lê os filtros da tela, marcando os campos inválidos."""
+        fields = (self.date_from_filter, self.date_to_filter, self.min_value_filter)
+        for field in fields:
+            field.error = None
+        try:
+            date_from = _parse_date(self.date_from_filter.value)
+        except ValueError:
+            self.date_from_filter.error = "Data inválida"
+        try:
+            date_to = _parse_date(self.date_to_filter.value)
+        except ValueError:
+            self.date_to_filter.error = "Data inválida"
+        try:
+            min_value = _parse_value(self.min_value_filter.value)
+        except ValueError:
+            self.min_value_filter.error = "Valor inválido"
+
+        if any(field.error for field in fields):
+            try:
+                self.update()
+            except RuntimeError:
+                pass
+            return None
+
+        return CatalogQuery(
+            emit_cnpj=(self.emit_filter.value or "").strip() or None,
+            dest_cnpj=(self.dest_filter.value or "").strip() or None,
+            date_from=date_from,
+            date_to=date_to,
+            min_value=min_value,
+            name=(self.name_filter.value or "").strip() or None,
+        )
+
+    def _build_row(self, doc: CatalogDocument) -> ft.DataRow:
+        """Cria uma linha da tabela para um documento."""
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Text(_format_date(doc.emissao))),
+                ft.DataCell(ft.Text(str(doc.numero) if doc.numero else "-")),
+                ft.DataCell(
+                    ft.Text(doc.emit_nome or doc.emit_cnpj or "-", tooltip=doc.emit_cnpj)
+                ),
+                ft.DataCell(
+                    ft.Text(doc.dest_nome or doc.dest_cnpj or "-", tooltip=doc.dest_cnpj)
+                ),
+                ft.DataCell(ft.Text(_format_money(doc.valor_total))),
+                ft.DataCell(ft.Text(doc.chave, size=11, tooltip=doc.path, selectable=True)),
+            ]
+        )
+
+    def _load_page(self):
+        """Carrega a página atual da busca na tabela."""
+        self._total, value_sum = self._catalog.summary(self._query)
+        docs = self._catalog.search(self._query, limit=PAGE_SIZE, offset=self._offset)
+
+        self.table.rows = [self._build_row(d) for d in docs]
+
+        page_count = max((self._total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+        current_page = self._offset // PAGE_SIZE + 1
+        self.page_text.value = (
+            f"Página {current_page}/{page_count} ({self._total} documentos)"
+        )
+        self.summary_text.value = f"Total: {_format_money(value_sum)}"
+        self.btn_prev.disabled = self._offset == 0
+        self.btn_next.disabled = self._offset + PAGE_SIZE >= self._total
+
+        try:
+            self.update()
+        except RuntimeError:
+            pass  # View ainda não adicionada à página
+
+    def _apply_filters(self, e):
+        """Aplica os filtros e volta para a primeira página."""
+        query = self._read_filters()
+        if query is None:
+            return
+        self._query = query
+        self._offset = 0
+        self._load_page()
+
+    def _prev_page(self, e):
+        self._offset = max(self._offset - PAGE_SIZE, 0)
+        self._load_page()
+
+    def _next_page(self, e):
+        if self._offset + PAGE_SIZE < self._total:
+            self._offset += PAGE_SIZE
+            self._load_page()
+
+    async def _import_folder(self, e):
+        """Cataloga os XMLs já existentes de uma pasta (com subpastas)."""
+        file_picker = ft.FilePicker()
+        folder = await file_picker.get_directory_path()
+        if not folder:
+            return
+
+        loop = asyncio.get_running_loop()
+        self.btn_import.disabled = True
+        self._show_import_progress(ScanStats(), folder)
+
+        def on_progress(stats: ScanStats):
+            # Chamado na thread da indexação
+            loop.call_soon_threadsafe(self._show_import_progress, stats, folder)
+
+        try:
+            stats = await asyncio.to_thread(
+                self._catalog.index_folder,
+                folder,
+                recursive=True,
+                callback_progress=on_progress,
+            )
+        except Exception as ex:
+            self.import_text.value = ""
+            self.toast.error(f"Erro ao importar: {ex}")
+        else:
+            self.import_text.value = f"Importação concluída: {stats.summary()}"
+            self.toast.success(f"{stats.documents} NF-e catalogadas")
+            self._load_page()
+        finally:
+            self.btn_import.disabled = False
+            try:
+                self.update()
+            except RuntimeError:
+                pass
+
+    def _show_import_progress(self, stats: ScanStats, folder: str):
+        if stats.total:
+            self.import_text.value = f"Importando {folder}: {stats.summary()}"
+        else:
+            self.import_text.value = f"Listando XMLs de {folder}..."
+        try:
+            self.update()
+        except RuntimeError:
+            pass
+
+    async def _export(self, e):
+        """Exporta o resultado filtrado para a pasta escolhida."""
+        file_picker = ft.FilePicker()
+        folder = await file_picker.get_directory_path()
+        if not folder:
+            return
+
+        file_name = f"catalogo_{datetime.now():%Y%m%d_%H%M%S}.parquet"
+        try:
+            path = await asyncio.to_thread(
+                self._catalog.export, self._query, os.path.join(folder, file_name)
+            )
+        except Exception as ex:
+            self.toast.error(f"Erro ao exportar: {ex}")
+            return
+        if path is None:
+            self.toast.info("Nada a exportar: nenhum documento corresponde ao filtro")
+            return
+        self.toast.success(f"Exportado para {path}")
+
+    async def go_back(self, e, page: ft.Page):
+        # se houver mais de uma view, remove a atual e navega para a anterior
+        if len(page.views) > 1:
+            page.views.pop()
+            top_view = page.views[-1]
+            if top_view.route:
+                await page.push_route(top_view.route)
+            else:
+                await page.push_route("/")
+        else:
+            # fallback: vai para a rota raiz
+            await page.push_route("/")
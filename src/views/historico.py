@@ -0,0 +1,207 @@
+import flet as ft
+import asyncio
+from datetime import datetime
+
+from services.run_history import (
+    RunHistoryStore,
+    RunRecord,
+    KIND_NFE,
+    KIND_NFSE,
+    STATUS_SUCCESS,
+    STATUS_ERROR,
+    STATUS_CANCELLED,
+    STATUS_RUNNING,
+)
+
+# Tamanho da página do histórico
+PAGE_SIZE = 50
+
+_KIND_LABELS = {KIND_NFE: "NF-e", KIND_NFSE: "NFS-e"}
+
+_STATUS_LABELS = {
+    STATUS_SUCCESS: ("Sucesso", ft.Colors.GREEN),
+    STATUS_ERROR: ("Erro", ft.Colors.RED),
+    STATUS_CANCELLED: ("Cancelado", ft.Colors.ORANGE),
+    STATUS_RUNNING: ("Em andamento", ft.Colors.BLUE),
+}
+
+
+def _format_ts(ts: float | None) -> str:
+    """Formata timestamp como dd/mm/aaaa hh:mm:ss."""
+    if ts is None:
+        return "-"
+    return datetime.fromtimestamp(ts).strftime("%d/%m/%Y %H:%M:%S")
+
+
+class HistoricoView(ft.View):
+    def __init__(self, page: ft.Page):
+        super().__init__(
+            route="/historico",
+            appbar=ft.AppBar(
+                title=ft.Text("Histórico de Execuções"),
+                leading=ft.IconButton(
+                    icon=ft.Icons.ARROW_BACK,
+                    on_click=lambda e: asyncio.create_task(self.go_back(e, page)),
+                ),
+            ),
+        )
+
+        self._store = RunHistoryStore()
+        self._offset = 0
+        self._total = 0
+
+        # --- Filtros ---
+        self.profile_filter = ft.TextField(
+            label="Perfil",
+            hint_text="Filtrar por perfil",
+            width=250,
+            on_submit=self._apply_filters,
+        )
+        self.kind_filter = ft.Dropdown(
+            label="Tipo",
+            width=150,
+            value="",
+            options=[
+                ft.dropdown.Option(key="", text="Todos"),
+                ft.dropdown.Option(key=KIND_NFE, text="NF-e"),
+                ft.dropdown.Option(key=KIND_NFSE, text="NFS-e"),
+            ],
+        )
+        self.status_filter = ft.Dropdown(
+            label="Status",
+            width=170,
+            value="",
+            options=[ft.dropdown.Option(key="", text="Todos")]
+            + [
+                ft.dropdown.Option(key=status, text=label)
+                for status, (label, _) in _STATUS_LABELS.items()
+            ],
+        )
+        btn_filter = ft.Button(
+            content=ft.Text("Filtrar"),
+            icon=ft.Icons.FILTER_LIST,
+            on_click=self._apply_filters,
+        )
+
+        # --- Tabela ---
+        self.table = ft.DataTable(
+            columns=[
+                ft.DataColumn(label=ft.Text("Tipo")),
+                ft.DataColumn(label=ft.Text("Perfil")),
+                ft.DataColumn(label=ft.Text("Início")),
+                ft.DataColumn(label=ft.Text("Fim")),
+                ft.DataColumn(label=ft.Text("Itens"), numeric=True),
+                ft.DataColumn(label=ft.Text("Falhas"), numeric=True),
+                ft.DataColumn(label=ft.Text("Itens/min"), numeric=True),
+                ft.DataColumn(label=ft.Text("Status")),
+            ],
+            rows=[],
+        )
+
+        # --- Paginação ---
+        self.page_text = ft.Text("")
+        self.btn_prev = ft.IconButton(
+            icon=ft.Icons.CHEVRON_LEFT,
+            tooltip="Página anterior",
+            on_click=self._prev_page,
+        )
+        self.btn_next = ft.IconButton(
+            icon=ft.Icons.CHEVRON_RIGHT,
+            tooltip="Próxima página",
+            on_click=self._next_page,
+        )
+
+        self.controls = [
+            ft.Row(
+                [self.profile_filter, self.kind_filter, self.status_filter, btn_filter],
+                alignment=ft.MainAxisAlignment.CENTER,
+                spacing=20,
+            ),
+            ft.Column([self.table], scroll=ft.ScrollMode.AUTO, expand=True),
+            ft.Row(
+                [self.btn_prev, self.page_text, self.btn_next],
+                alignment=ft.MainAxisAlignment.CENTER,
+            ),
+        ]
+
+        # --- Alinhamento ---
+        self.horizontal_alignment = ft.CrossAxisAlignment.CENTER
+
+        self._load_page()
+
+    def _filters(self) -> dict:
+        """Retorna os filtros atuais no formato esperado pelo RunHistoryStore."""
+        return {
+            "kind": self.kind_filter.value or None,
+            "profile": (self.profile_filter.value or "").strip() or None,
+            "status": self.status_filter.value or None,
+        }
+
+    def _build_row(self, record: RunRecord) -> ft.DataRow:
+        """Cria uma linha da tabela para uma execução."""
+        status_label, status_color = _STATUS_LABELS.get(
+            record.status, (record.status, None)
+        )
+        rate = record.items_per_minute
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Text(_KIND_LABELS.get(record.kind, record.kind))),
+                ft.DataCell(ft.Text(record.profile or "-")),
+                ft.DataCell(ft.Text(_format_ts(record.started_at))),
+                ft.DataCell(ft.Text(_format_ts(record.ended_at))),
+                ft.DataCell(ft.Text(f"{record.items_done}/{record.items_total}")),
+                ft.DataCell(ft.Text(str(record.failures))),
+                ft.DataCell(ft.Text(f"{rate:.1f}" if rate is not None else "-")),
+                ft.DataCell(
+                    ft.Text(status_label, color=status_color, tooltip=record.error)
+                ),
+            ]
+        )
+
+    def _load_page(self):
+        """Carrega a página atual do histórico na tabela."""
+        filters = self._filters()
+        self._total = self._store.count(**filters)
+        records = self._store.query(limit=PAGE_SIZE, offset=self._offset, **filters)
+
+        self.table.rows = [self._build_row(r) for r in records]
+
+        page_count = max((self._total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+        current_page = self._offset // PAGE_SIZE + 1
+        self.page_text.value = (
+            f"Página {current_page}/{page_count} ({self._total} execuções)"
+        )
+        self.btn_prev.disabled = self._offset == 0
+        self.btn_next.disabled = self._offset + PAGE_SIZE >= self._total
+
+        try:
+            self.update()
+        except RuntimeError:
+            pass  # View ainda não adicionada à página
+
+    def _apply_filters(self, e):
+        """Aplica os filtros e volta para a primeira página."""
+        self._offset = 0
+        self._load_page()
+
+    def _prev_page(self, e):
+        self._offset = max(self._offset - PAGE_SIZE, 0)
+        self._load_page()
+
+    def _next_page(self, e):
+        if self._offset + PAGE_SIZE < self._total:
+            self._offset += PAGE_SIZE
+            self._load_page()
+
+    async def go_back(self, e, page: ft.Page):
+        # se houver mais de uma view, remove a atual e navega para a anterior
+        if len(page.views) > 1:
+            page.views.pop()
+            top_view = page.views[-1]
+            if top_view.route:
+                await page.push_route(top_view.route)
+            else:
+                await page.push_route("/")
+        else:
+            # fallback: vai para a rota raiz
+            await page.push_route("/")
@@ -36,9 +36,35 @@ class HomeView(ft.View):
             ),
         )
 
+        self.btn_historico = ft.ElevatedButton(
+            content="Histórico",
+            icon=ft.Icons.HISTORY,
+            width=220,
+            height=50,
+            on_click=lambda _: asyncio.create_task(self.go_to_historico_view(page)),
+            style=ft.ButtonStyle(
+                bgcolor=ft.Colors.WHITE,
+                color=ft.Colors.DEEP_PURPLE,
+                shape=ft.RoundedRectangleBorder(radius=25),
+            ),
+        )
+
+        self.btn_catalogo = ft.ElevatedButton(
+            content="Catálogo",
+            icon=ft.Icons.MANAGE_SEARCH,
+            width=220,
+            height=50,
+            on_click=lambda _: asyncio.create_task(self.go_to_catalogo_view(page)),
+            style=ft.ButtonStyle(
+                bgcolor=ft.Colors.WHITE,
+                color=ft.Colors.DEEP_PURPLE,
+                shape=ft.RoundedRectangleBorder(radius=25),
+            ),
+        )
+
         # Layout dos botões
         self.buttons_column = ft.Column(
-            [self.btn_nfe, self.btn_nfse],
+            [self.btn_nfe, self.btn_nfse, self.btn_historico, self.btn_catalogo],
             alignment=ft.MainAxisAlignment.CENTER,
             horizontal_alignment=ft.CrossAxisAlignment.CENTER,
             spacing=20,
@@ -60,3 +86,9 @@ class HomeView(ft.View):
 
     async def go_to_nfse_view(self, page: ft.Page):
         await page.push_route("/nfse")
+
+    async def go_to_historico_view(self, page: ft.Page):
+        await page.push_route("/historico")
+
+    async def go_to_catalogo_view(self, page: ft.Page):
+        await page.push_route("/catalogo")
@@ -1,17 +1,18 @@
 import flet as ft
-import threading
 import asyncio
 import time
 
-from auto_nfe import ClientNfe, CancelledException
-
 from components.consultas.planilha_form import PlanilhaForm
 from components.download_btn import DownloadBtn
+from components.job_queue_panel import JobQueuePanel
 from components.toast import ToastManager
+from services.job_queue import Job, JobEvent, JobQueue, JobState
+from services.rate_limiter import sefaz_rate_limiter
+from services.run_history import KIND_NFE
 
 
 class NfeView(ft.View):
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, job_queue: JobQueue):
         super().__init__(
             route="/nfe",
             appbar=ft.AppBar(
@@ -26,8 +27,10 @@ class NfeView(ft.View):
         # Título
         self.title = ft.Text("Auto Nfe", size=40, weight=ft.FontWeight.BOLD)
 
+        self._page = page
+
         # --- Elementos do Formulário de Planilha ---
-        self.planilha_form = PlanilhaForm(page)
+        self.planilha_form = PlanilhaForm(page, on_change=self._schedule_budget_refresh)
 
         # --- Elementos da Área de Ação (Botão e Progresso) ---
         self.download_btn = DownloadBtn(self.handle_download)
@@ -50,14 +53,27 @@ class NfeView(ft.View):
             width=400, value=0, visible=False, color=ft.Colors.BLUE
         )
 
+        # Orçamento de requisições do CNPJ e espera projetada para a planilha
+        self.budget_text = ft.Text("", size=12, color=ft.Colors.GREY_400)
+
         # Container para a Área de Ação para manter o layout
         self.action_area = ft.Column(
-            [self.download_btn, self.cancel_btn, self.progress_text, self.progress_bar],
+            [
+                self.download_btn,
+                self.budget_text,
+                self.cancel_btn,
+                self.progress_text,
+                self.progress_bar,
+            ],
             alignment=ft.MainAxisAlignment.CENTER,
             horizontal_alignment=ft.CrossAxisAlignment.CENTER,
             spacing=10,
         )
 
+        # Fila de downloads (compartilhada pelo app)
+        self._job_queue = job_queue
+        self.queue_panel = JobQueuePanel(job_queue, KIND_NFE)
+
         # Toast notifications
         self.toast = ToastManager(page)
 
@@ -66,106 +82,135 @@ class NfeView(ft.View):
             self.planilha_form,
             ft.Divider(height=50, color="Transparent"),
             self.action_area,
+            ft.Divider(height=20, color="Transparent"),
+            self.queue_panel,
         ]
 
         # --- Alinhamento ---
         self.vertical_alignment = ft.MainAxisAlignment.CENTER
         self.horizontal_alignment = ft.CrossAxisAlignment.CENTER
+        self.scroll = ft.ScrollMode.AUTO
 
         # --- Estado interno ---
-        self._client: ClientNfe | None = None
-        self._cancel_event: threading.Event | None = None
+        # Última atualização do orçamento (limitada a uma por segundo durante a execução)
+        self._budget_refreshed_at = 0.0
+
+        # Job acompanhado pela área de progresso (último enviado por esta tela)
+        self._job: Job | None = next(
+            (
+                j
+                for j in reversed(job_queue.jobs(KIND_NFE))
+                if j.state == JobState.RUNNING
+            ),
+            None,
+        )
+        if self._job is not None:
+            self.update_progress_ui(self._job, update=False)
 
-    async def update_progress_ui(self, current_step, total_steps):
-        """
-        Callback chamado pelo Backend para atualizar a UI.
-        """
-        percentage = current_step / total_steps
-        print(f"Progresso: {percentage*100:.2f}%")
+        self._unsubscribe = job_queue.subscribe(self._on_job_event)
 
-        # Atualiza os valores visuais
-        self.progress_bar.value = percentage
-        self.progress_text.value = f"Baixando XMLs: {current_step}/{total_steps}"
+    def dispose(self):
+        """Para de ouvir a fila (a view é recriada a cada troca de rota)."""
+        self._unsubscribe()
+        self.queue_panel.will_unmount()
 
-        # Atualiza a view
-        self.progress_bar.update()
-        self.progress_text.update()
-        self.page.update()
-        self.update()
+    def will_unmount(self):
+        self.dispose()
 
-    async def _run_background_task(self):
+    def _on_job_event(self, job: Job, event: JobEvent, message: str | None):
         """
-        Lógica pesada que roda em uma Thread separada.
+        Callback chamado pela fila para atualizar a UI.
         """
-
-        form_data = self.form_data
-        self._cancel_event = threading.Event()
-
-        def task_progress(current, total):
-            async def run():
-                await self.update_progress_ui(current, total)
-
-            self.page.run_task(run)
-
-        def task_notification(message: str):
-            self.toast.info(message)
+        if job.kind != KIND_NFE:
+            return
 
         try:
-            if len(form_data["cnpj_cpf"]) == 14:
-                self._client = ClientNfe(
-                    cnpj=form_data["cnpj_cpf"],
-                    cert_pfx_path=form_data["cert_path"],
-                    cert_password=form_data["password"],
-                )
-            elif len(form_data["cnpj_cpf"]) == 11:
-                self._client = ClientNfe(
-                    cpf=form_data["cnpj_cpf"],
-                    cert_pfx_path=form_data["cert_path"],
-                    cert_password=form_data["password"],
-                )
-            else:
-                raise ValueError("CNPJ/CPF inválido. Deve conter 11 ou 14 dígitos.")
-
-            print(form_data["folder_path"])
-
-            await self._client.consulta_planilha(
-                form_data["sheet_path"],
-                form_data["folder_path"],
-                callback_progress=task_progress,
-                callback_status=task_notification,
-                cancel_event=self._cancel_event,
+            if event == JobEvent.INFO:
+                self.toast.info(message)
+            elif event == JobEvent.WARNING:
+                self.toast.warning(message)
+            elif event == JobEvent.UPDATE and job is self._job:
+                self.update_progress_ui(job)
+                if time.monotonic() - self._budget_refreshed_at >= 1.0 or job.finished:
+                    self._schedule_budget_refresh()
+                if job.finished:
+                    self.planilha_form.refresh_nsu_state()
+        except RuntimeError:
+            # View saiu da página (troca de rota): para de ouvir a fila
+            self._unsubscribe()
+
+    def update_progress_ui(self, job: Job, update: bool = True):
+        """
+        Atualiza a área de progresso com o estado do job acompanhado.
+        """
+        self.progress_text.visible = True
+        self.progress_bar.visible = True
+        self.cancel_btn.visible = not job.finished
+        self.cancel_btn.disabled = job.cancel_event.is_set()
+
+        if job.state == JobState.PENDING:
+            position = [j for j in self._job_queue.jobs() if j.state == JobState.PENDING]
+            self.progress_text.value = f"Na fila (posição {position.index(job) + 1})"
+            self.progress_text.color = ft.Colors.GREY_400
+            self.progress_bar.value = 0
+        elif job.state == JobState.RUNNING:
+            self.progress_text.value = job.message
+            if job.throughput is not None:
+                self.progress_text.value += f"\n{job.throughput.summary()}"
+            self.progress_text.color = (
+                ft.Colors.ORANGE
+                if job.waiting or job.cancel_event.is_set()
+                else ft.Colors.WHITE
             )
-
-            # Sucesso
-            self.progress_text.value = "Download completado com sucesso!"
+            self.progress_bar.value = job.progress
+        elif job.state == JobState.SUCCESS:
+            self.progress_text.value = job.message
             self.progress_text.color = ft.Colors.GREEN
             self.progress_bar.value = 1.0
-
-        except CancelledException:
+        elif job.state == JobState.ERROR:
+            self.progress_text.value = job.message
+            self.progress_text.color = ft.Colors.RED
+        else:
             # Cancelamento gracioso - esconde UI
             self.progress_bar.visible = False
             self.progress_text.visible = False
 
-        except Exception as e:
-            # Erro inesperado
-            self.progress_text.value = f"Erro: {str(e)}"
-            self.progress_text.color = ft.Colors.RED
+        if update:
+            self.action_area.update()
 
-        finally:
-            # Limpa referências
-            self._client = None
-            self._cancel_event = None
+    def _schedule_budget_refresh(self):
+        """Agenda a leitura do orçamento sem bloquear a UI."""
+        self._budget_refreshed_at = time.monotonic()
+        self._page.run_task(self._refresh_budget)
 
-            # Restaura o botão independentemente do resultado
-            self.download_btn.disabled = False
-            self.download_btn.content = "Baixar"
-            self.cancel_btn.visible = False
-            self.cancel_btn.disabled = False
-            self.update()
+    async def _refresh_budget(self):
+        """Mostra o orçamento do CNPJ informado e a espera projetada da planilha."""
+        cnpj_cpf = self.planilha_form.get_values()["cnpj_cpf"]
+        if len(cnpj_cpf) not in (11, 14):
+            self.budget_text.value = ""
+        else:
+            state = await asyncio.to_thread(sefaz_rate_limiter.state, cnpj_cpf)
+            # Na sincronização por NSU a quantidade de documentos não é conhecida
+            key_count = (
+                None
+                if self.planilha_form.nsu_checkbox.value
+                else self.planilha_form.sheet_key_count
+            )
+            self.budget_text.value = state.summary(key_count)
+            self.budget_text.color = (
+                ft.Colors.ORANGE
+                if state.wait_for(key_count or 1) > 0
+                else ft.Colors.GREY_400
+            )
+
+        try:
+            self.budget_text.update()
+        except RuntimeError:
+            pass
 
     def handle_download(self, e):
         """
-        Evento de clique do botão. Prepara a UI e inicia a Thread.
+        Evento de clique do botão. Valida o formulário e enfileira o download.
         """
         form_data = self.planilha_form.get_values()
 
@@ -175,31 +220,19 @@ class NfeView(ft.View):
             self.toast.error(error_msg)
             return
 
-        self.form_data = form_data
+        running = any(not j.finished for j in self._job_queue.jobs())
+        self._job = self._job_queue.submit(KIND_NFE, form_data["profile_name"], form_data)
+        if running:
+            self.toast.info(f"Adicionado à fila: {self._job.label}")
 
-        # 2. Configura UI para estado de "Carregando"
-        self.download_btn.disabled = True
-        self.cancel_btn.visible = True  # Mostra botão cancelar
-        self.progress_text.visible = True
-        self.progress_bar.visible = True
-        self.progress_text.value = "Iniciando conexão..."
-        self.progress_text.color = ft.Colors.WHITE
-        self.update()
-
-        # 3. Inicia a Thread
-        self.page.run_task(self._run_background_task)
+        self.update_progress_ui(self._job)
 
     def handle_cancel(self, e):
         """
-        Cancela a execução do consulta_planilha via cancel_event.
+        Cancela o job acompanhado pela área de progresso.
         """
-        if self._cancel_event:
-            self._cancel_event.set()
-
-        self.progress_text.value = "Cancelando..."
-        self.progress_text.color = ft.Colors.ORANGE
-        self.cancel_btn.disabled = True
-        self.update()
+        if self._job is not None:
+            self._job_queue.cancel(self._job.id)
 
     async def go_back(self, e, page: ft.Page):
         # se houver mais de uma view, remove a atual e navega para a anterior
@@ -1,19 +1,18 @@
 import flet as ft
-import threading
 import asyncio
-from datetime import date, datetime
-
-from auto_nfe import ClientNfseWeb, CancelledException
 
 from components.consultas.nfse_web_form import NfseWebForm
 from components.download_btn import DownloadBtn
+from components.job_queue_panel import JobQueuePanel
+from components.nfse_status_table import NfseStatusTable
 from components.toast import ToastManager
-from config.paths import CHROME_PROFILE_PATH
+from services.job_queue import Job, JobEvent, JobQueue, JobState
+from services.run_history import KIND_NFSE
 
 
 class NfseView(ft.View):
 
-    def __init__(self, page: ft.Page):
+    def __init__(self, page: ft.Page, job_queue: JobQueue):
         super().__init__(
             route="/nfse",
             appbar=ft.AppBar(
@@ -64,110 +63,117 @@ class NfseView(ft.View):
             title=ft.Text("Status do Download do NFSe"), content=ft.Text("Alerta: ")
         )
 
+        # Fila de downloads (compartilhada pelo app)
+        self._job_queue = job_queue
+        self.queue_panel = JobQueuePanel(job_queue, KIND_NFSE)
+
+        # Status por CNPJ do job acompanhado
+        self.status_table = NfseStatusTable(page)
+
+        # Toast notifications
+        self.toast = ToastManager(page)
+
         self.controls = [
             self.title,
             self.nfse_web_form,
             ft.Divider(height=50, color="Transparent"),
             self.action_area,
+            ft.Divider(height=20, color="Transparent"),
+            self.status_table,
+            self.queue_panel,
         ]
 
         # --- Alinhamento ---
         self.vertical_alignment = ft.MainAxisAlignment.CENTER
         self.horizontal_alignment = ft.CrossAxisAlignment.CENTER
+        self.scroll = ft.ScrollMode.AUTO
 
         # --- Estado interno ---
-        self._client: ClientNfseWeb | None = None
-        self._cancel_event: threading.Event | None = None
-
-        # Toast notifications
-        self.toast = ToastManager(page)
+        # Job acompanhado pela área de progresso (último enviado por esta tela)
+        self._job: Job | None = next(
+            (
+                j
+                for j in reversed(job_queue.jobs(KIND_NFSE))
+                if j.state == JobState.RUNNING
+            ),
+            None,
+        )
+        if self._job is not None:
+            self.update_progress_ui(self._job, update=False)
+        self.status_table.show(self._job, update=False)
 
-    async def update_progress_ui(self, current_step, total_steps):
-        """
-        Callback chamado pelo Backend para atualizar a UI.
-        """
-        percentage = current_step / total_steps
-        print(f"Progresso: {percentage*100:.2f}%")
+        self._unsubscribe = job_queue.subscribe(self._on_job_event)
 
-        # Atualiza os valores visuais
-        self.progress_bar.value = percentage
-        self.progress_text.value = f"Baixando Relatórios: {current_step}/{total_steps}"
+    def dispose(self):
+        """Para de ouvir a fila (a view é recriada a cada troca de rota)."""
+        self._unsubscribe()
+        self.queue_panel.will_unmount()
 
-        # Atualiza a view
-        self.progress_bar.update()
-        self.progress_text.update()
-        self.page.update()
-        self.update()
+    def will_unmount(self):
+        self.dispose()
 
-    async def _run_background_task(self):
+    def _on_job_event(self, job: Job, event: JobEvent, message: str | None):
         """
-        Lógica pesada que roda em uma Thread separada.
+        Callback chamado pela fila para atualizar a UI.
         """
-
-        form_data = self.form_data
-        self._cancel_event = threading.Event()
-
-        def task_progress(current, total):
-
-            async def run():
-                await self.update_progress_ui(current, total)
-
-            self.page.run_task(run)
+        if job.kind != KIND_NFSE:
+            return
 
         try:
-            data_inicial = datetime.strptime(
-                form_data["data_inicial"], "%d/%m/%Y"
-            ).date()
-            data_final = datetime.strptime(form_data["data_final"], "%d/%m/%Y").date()
-
-            self._client = ClientNfseWeb(
-                usuario=form_data["usuario"],
-                senha=form_data["senha"],
-                cnpjs=form_data["cnpjs"],
-                data_inicial=data_inicial,
-                data_final=data_final,
-                profile_path=CHROME_PROFILE_PATH,
-                download_path=form_data["download_path"],
-                headless=False,
-            )
-
-            # Executa função bloqueante em thread separada
-            await asyncio.to_thread(
-                self._client.consulta_relatorios,
-                callback_progress=task_progress,
-                cancel_event=self._cancel_event,
+            if event == JobEvent.INFO:
+                self.toast.info(message)
+            elif event == JobEvent.WARNING:
+                self.toast.warning(message)
+            elif event == JobEvent.UPDATE and job is self._job:
+                self.update_progress_ui(job)
+            elif event == JobEvent.DETAIL and job is self._job:
+                self.status_table.mark_dirty(message)
+        except RuntimeError:
+            # View saiu da página (troca de rota): para de ouvir a fila
+            self._unsubscribe()
+
+    def update_progress_ui(self, job: Job, update: bool = True):
+        """
+        Atualiza a área de progresso com o estado do job acompanhado.
+        """
+        self.progress_text.visible = True
+        self.progress_bar.visible = True
+        self.cancel_btn.visible = not job.finished
+        self.cancel_btn.disabled = job.cancel_event.is_set()
+
+        if job.state == JobState.PENDING:
+            position = [j for j in self._job_queue.jobs() if j.state == JobState.PENDING]
+            self.progress_text.value = f"Na fila (posição {position.index(job) + 1})"
+            self.progress_text.color = ft.Colors.GREY_400
+            self.progress_bar.value = 0
+        elif job.state == JobState.RUNNING:
+            self.progress_text.value = job.message
+            if job.throughput is not None:
+                self.progress_text.value += f"\n{job.throughput.summary()}"
+            self.progress_text.color = (
+                ft.Colors.ORANGE
+                if job.waiting or job.cancel_event.is_set()
+                else ft.Colors.WHITE
             )
-
-            # Sucesso
-            self.progress_text.value = "Download completado com sucesso!"
+            self.progress_bar.value = job.progress
+        elif job.state == JobState.SUCCESS:
+            self.progress_text.value = job.message
             self.progress_text.color = ft.Colors.GREEN
             self.progress_bar.value = 1.0
-
-        except CancelledException:
+        elif job.state == JobState.ERROR:
+            self.progress_text.value = job.message
+            self.progress_text.color = ft.Colors.RED
+        else:
             # Cancelamento gracioso - esconde UI
             self.progress_bar.visible = False
             self.progress_text.visible = False
 
-        except Exception as e:
-            # Erro inesperado
-            self.progress_text.value = f"Erro: {str(e)}"
-            self.progress_text.color = ft.Colors.RED
-
-        finally:
-            # Limpa referências
-            self._client = None
-            self._cancel_event = None
-
-            # Restaura o botão independentemente do resultado
-            self.download_btn.disabled = False
-            self.download_btn.content = "Baixar"
-            self.cancel_btn.visible = False
-            self.cancel_btn.disabled = False
-            self.update()
+        if update:
+            self.action_area.update()
 
     def handle_download(self, e):
         """
-        Evento de clique do botão. Prepara a UI e inicia a Thread.
+        Evento de clique do botão. Valida o formulário e enfileira o download.
         """
         # 1. Obtém dados do formulário
         form_data = self.nfse_web_form.get_values()
@@ -178,32 +184,21 @@ class NfseView(ft.View):
             self.toast.error(error_msg)
             return
 
-        self.form_data = form_data
+        running = any(not j.finished for j in self._job_queue.jobs())
+        label = f"{form_data['usuario']} ({form_data['data_inicial']} a {form_data['data_final']})"
+        self._job = self._job_queue.submit(KIND_NFSE, label, form_data)
+        if running:
+            self.toast.info(f"Adicionado à fila: {self._job.label}")
 
-        # 2. Configura UI para estado de "Carregando"
-        self.download_btn.disabled = True
-        self.cancel_btn.visible = True  # Mostra botão cancelar
-        self.progress_text.visible = True
-        self.progress_bar.visible = True
-        self.progress_bar.value = 0
-        self.progress_text.value = "Iniciando conexão..."
-        self.progress_text.color = ft.Colors.WHITE
-        self.update()
-
-        # 3. Inicia a Thread
-        self.page.run_task(self._run_background_task)
+        self.update_progress_ui(self._job)
+        self.status_table.show(self._job)
 
     def handle_cancel(self, e):
         """
-        Cancela a execução do consulta_relatorios via cancel_event.
+        Cancela o job acompanhado pela área de progresso.
         """
-        if self._cancel_event:
-            self._cancel_event.set()
-
-        self.progress_text.value = "Cancelando..."
-        self.progress_text.color = ft.Colors.ORANGE
-        self.cancel_btn.disabled = True
-        self.update()
+        if self._job is not None:
+            self._job_queue.cancel(self._job.id)
 
     async def go_back(self, e, page: ft.Page):
         # se houver mais de uma view, remove a atual e navega para a anterior
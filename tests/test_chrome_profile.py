@@ -0,0 +1,57 @@
+"""Testes da verificação de travas do perfil do Chrome (sem efeitos colaterais)."""
+
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from services.chrome_profile import _is_in_use
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="SingletonLock é POSIX")
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+@posix_only
+def test_singleton_lock_of_live_process_is_kept(tmp_path):
+    lock = tmp_path / "SingletonLock"
+    os.symlink(f"{socket.gethostname()}-{os.getpid()}", lock)
+
+    assert _is_in_use(str(tmp_path))
+    assert os.path.lexists(lock)
+
+
+@posix_only
+def test_stale_singleton_lock_is_removed(tmp_path):
+    lock = tmp_path / "SingletonLock"
+    os.symlink(f"{socket.gethostname()}-{_dead_pid()}", lock)
+
+    assert not _is_in_use(str(tmp_path))
+    assert not os.path.lexists(lock)
+
+
+@posix_only
+def test_singleton_lock_of_other_host_is_kept(tmp_path):
+    lock = tmp_path / "SingletonLock"
+    os.symlink(f"outra-maquina-{os.getpid()}", lock)
+
+    assert _is_in_use(str(tmp_path))
+    assert os.path.lexists(lock)
+
+
+def test_unheld_lockfile_is_removed(tmp_path):
+    lock = tmp_path / "lockfile"
+    lock.write_bytes(b"")
+
+    assert not _is_in_use(str(tmp_path))
+    assert not lock.exists()
+
+
+def test_no_locks_means_not_in_use(tmp_path):
+    assert not _is_in_use(str(tmp_path))
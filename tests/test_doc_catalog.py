@@ -0,0 +1,99 @@
+"""Testes do catálogo de documentos (filtros, indexação e exportação)."""
+
+import csv
+from datetime import date
+
+import pytest
+
+from services.doc_catalog import CatalogQuery, DocumentCatalog
+
+KEY_1 = "35190112345678000199550010000000011000000010"
+KEY_2 = "35190112345678000199550010000000021000000020"
+
+
+def nfe_xml(key: str, emit_cnpj: str, emit_nome: str, emissao: str, valor: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe"><NFe>'
+        f'<infNFe Id="NFe{key}" versao="4.00">'
+        f"<ide><mod>55</mod><serie>1</serie><nNF>{int(key[25:34])}</nNF>"
+        f"<dhEmi>{emissao}T10:00:00-03:00</dhEmi></ide>"
+        f"<emit><CNPJ>{emit_cnpj}</CNPJ><xNome>{emit_nome}</xNome></emit>"
+        "<dest><CNPJ>98765432000100</CNPJ><xNome>Cliente</xNome></dest>"
+        f"<total><ICMSTot><vNF>{valor}</vNF></ICMSTot></total>"
+        "</infNFe></NFe></nfeProc>"
+    )
+
+
+@pytest.fixture
+def catalog(tmp_path) -> DocumentCatalog:
+    folder = tmp_path / "xmls"
+    folder.mkdir()
+    (folder / f"{KEY_1}-nfe.xml").write_text(
+        nfe_xml(KEY_1, "12345678000199", "Fornecedor A", "2024-01-10", "100.50")
+    )
+    (folder / f"{KEY_2}-nfe.xml").write_text(
+        nfe_xml(KEY_2, "11222333000181", "Fornecedor B", "2024-03-05", "2500.00")
+    )
+    (folder / "evento.xml").write_text("<procEventoNFe><evento/></procEventoNFe>")
+    catalog = DocumentCatalog(str(tmp_path / "catalogo.db"))
+    stats = catalog.index_folder(str(folder))
+    assert (stats.documents, stats.ignored) == (2, 1)
+    return catalog
+
+
+def test_where_without_filters():
+    assert CatalogQuery().where() == ("", [])
+
+
+def test_where_combines_filters_in_order():
+    where, params = CatalogQuery(
+        emit_cnpj="12.345.678/0001-99",
+        date_from=date(2024, 1, 1),
+        date_to=date(2024, 1, 31),
+        min_value=0,
+        name="Forn",
+    ).where()
+    assert where == (
+        "WHERE emit_cnpj = ? AND emissao >= ? AND emissao <= ? "
+        "AND valor_total >= ? AND (emit_nome LIKE ? OR dest_nome LIKE ?)"
+    )
+    assert params == ["12345678000199", "2024-01-01", "2024-01-31", 0, "%Forn%", "%Forn%"]
+
+
+def test_search_and_summary(catalog):
+    docs = catalog.search(CatalogQuery())
+    assert [d.chave for d in docs] == [KEY_2, KEY_1]  # mais recente primeiro
+
+    query = CatalogQuery(emit_cnpj="12345678000199")
+    assert [d.chave for d in catalog.search(query)] == [KEY_1]
+    assert catalog.summary(query) == (1, pytest.approx(100.5))
+    assert catalog.summary(CatalogQuery(min_value=1000)) == (1, pytest.approx(2500.0))
+
+
+def test_reindex_skips_unchanged_files(catalog, tmp_path):
+    stats = catalog.index_folder(str(tmp_path / "xmls"))
+    assert (stats.total, stats.skipped) == (0, 3)
+
+
+def test_export_csv(catalog, tmp_path):
+    path = catalog.export(CatalogQuery(), str(tmp_path / "saida.csv"))
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f, delimiter=";"))
+    assert rows[0][0] == "chave"
+    assert [row[0] for row in rows[1:]] == [KEY_1, KEY_2]
+
+
+def test_export_without_results_writes_nothing(catalog, tmp_path):
+    output = tmp_path / "vazio.csv"
+    assert catalog.export(CatalogQuery(emit_cnpj="00000000000000"), str(output)) is None
+    assert not output.exists()
+
+
+def test_export_parquet_keeps_schema_across_batches(catalog, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = catalog.export(CatalogQuery(), str(tmp_path / "saida.parquet"))
+    table = pq.read_table(path)
+    assert table.num_rows == 2
+    assert str(table.schema.field("valor_total").type) == "double"
+    assert str(table.schema.field("numero").type) == "int64"
@@ -0,0 +1,228 @@
+"""Testes da API local (montagem dos parâmetros, autenticação e rotas)."""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("auto_nfe")
+
+import services.local_api as local_api  # noqa: E402
+from services.job_queue import JobQueue  # noqa: E402
+from services.local_api import (  # noqa: E402
+    ApiError,
+    LocalApiServer,
+    build_nfe_params,
+    build_nfse_params,
+)
+from services.nfe_job import MODE_NSU, MODE_SHEET  # noqa: E402
+
+TOKEN = "segredo"
+
+NFE_BODY = {
+    "cnpj_cpf": "12.345.678/0001-99",
+    "cert_path": "C:/cert.pfx",
+    "password": "senha",
+    "sheet_path": "C:/relacao.xls",
+    "folder_path": "C:/xmls",
+}
+
+
+@pytest.fixture(autouse=True)
+def capabilities(monkeypatch):
+    """Versão do auto_nfe com todos os recursos (cada teste ajusta o que precisar)."""
+    monkeypatch.setattr(local_api, "nsu_sync_available", lambda: True)
+    monkeypatch.setattr(local_api, "worker_available", lambda: True)
+
+
+@pytest.fixture
+def config_files(tmp_path, monkeypatch):
+    empresas_nfe = tmp_path / "empresas_nfe.toml"
+    empresas_nfe.write_text(
+        '[[empresas]]\nnome = "Empresa A"\ncnpj_cpf = "12345678000199"\n'
+        'caminho_certificado = "C:/a.pfx"\nsenha = "a"\n'
+        'caminho_relacao = "C:/a.xls"\npasta_xml = "C:/a"\n',
+        encoding="utf-8",
+    )
+    empresas_nfse = tmp_path / "empresas_nfse.toml"
+    empresas_nfse.write_text(
+        '[[empresas]]\ncnpj_cpf = "111"\nselecionada = true\n'
+        '[[empresas]]\ncnpj_cpf = "222"\nselecionada = false\n',
+        encoding="utf-8",
+    )
+    profile = tmp_path / "profile.toml"
+    profile.write_text(
+        '[nfse]\nusuario = "u"\nsenha = "s"\npasta_relatorio = "C:/rel"\n',
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(local_api, "EMPRESAS_NFE_PATH", str(empresas_nfe))
+    monkeypatch.setattr(local_api, "EMPRESAS_NFSE_PATH", str(empresas_nfse))
+    monkeypatch.setattr(local_api, "PROFILE_PATH", str(profile))
+
+
+# --- Parâmetros ---
+
+
+def test_nfe_params_from_body():
+    params = build_nfe_params(NFE_BODY)
+    assert params["mode"] == MODE_SHEET
+    assert params["cnpj_cpf"] == "12345678000199"
+    assert params["profile_name"] == "12345678000199"
+    assert params["only_missing"] is False
+
+
+def test_nfe_params_from_profile(config_files):
+    params = build_nfe_params({"profile": "12.345.678/0001-99", "folder_path": "C:/b"})
+    assert params["profile_name"] == "Empresa A"
+    assert params["cert_path"] == "C:/a.pfx"
+    assert params["folder_path"] == "C:/b"  # o corpo tem prioridade
+
+
+def test_nfe_unknown_profile(config_files):
+    with pytest.raises(ApiError) as error:
+        build_nfe_params({"profile": "Empresa Z"})
+    assert error.value.status == 404
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"password": ""},
+        {"cnpj_cpf": "123"},
+        {"mode": "xyz"},
+        {"sheet_path": ""},
+    ],
+)
+def test_nfe_invalid_bodies(changes):
+    with pytest.raises(ApiError) as error:
+        build_nfe_params({**NFE_BODY, **changes})
+    assert error.value.status == 400
+
+
+def test_nsu_mode_does_not_require_sheet():
+    params = build_nfe_params({**NFE_BODY, "mode": MODE_NSU, "sheet_path": ""})
+    assert params["mode"] == MODE_NSU
+
+
+@pytest.mark.parametrize(
+    "capability, changes",
+    [
+        ("nsu_sync_available", {"mode": MODE_NSU}),
+        ("worker_available", {"isolated_process": True}),
+    ],
+)
+def test_unavailable_features_are_rejected(monkeypatch, capability, changes):
+    monkeypatch.setattr(local_api, capability, lambda: False)
+    with pytest.raises(ApiError) as error:
+        build_nfe_params({**NFE_BODY, **changes})
+    assert error.value.status == 400
+
+
+def test_nfse_params_from_config(config_files):
+    params = build_nfse_params({"data_inicial": "01/01/2024", "data_final": "31/01/2024"})
+    assert params["cnpjs"] == ["111"]
+    assert (params["usuario"], params["download_path"]) == ("u", "C:/rel")
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"cnpjs": [], "data_inicial": "01/01/2024", "data_final": "31/01/2024"},
+        {"cnpjs": ["1"], "data_inicial": "2024-01-01", "data_final": "31/01/2024"},
+        {"cnpjs": ["1"], "data_inicial": "31/01/2024", "data_final": "01/01/2024"},
+    ],
+)
+def test_nfse_invalid_bodies(config_files, body):
+    with pytest.raises(ApiError) as error:
+        build_nfse_params(body)
+    assert error.value.status == 400
+
+
+# --- HTTP ---
+
+
+async def _request(port: int, method: str, path: str, body=None, token: str | None = TOKEN):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else body if isinstance(body, bytes) else json.dumps(body).encode()
+    head = f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    writer.write(head.encode() + b"\r\n" + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status_line, _, payload = response.partition(b"\r\n\r\n")
+    return int(status_line.split()[1]), json.loads(payload)
+
+
+def _with_server(scenario):
+    async def run():
+        queue = JobQueue()
+        finished = asyncio.Event()
+
+        async def runner(ctx):
+            await finished.wait()
+
+        queue.register_runner("nfse", runner)
+        queue.start()
+        server = LocalApiServer(queue, port=0, token=TOKEN)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        try:
+            await scenario(port, queue)
+        finally:
+            finished.set()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_requests_without_valid_token_are_rejected():
+    async def scenario(port, queue):
+        assert (await _request(port, "GET", "/jobs", token=None))[0] == 401
+        assert (await _request(port, "GET", "/jobs", token="outro"))[0] == 401
+        status, _ = await _request(port, "GET", f"/jobs?token={TOKEN}", token=None)
+        assert status == 200
+
+    _with_server(scenario)
+
+
+def test_submit_get_and_cancel(config_files):
+    async def scenario(port, queue):
+        body = {"cnpjs": ["1"], "data_inicial": "01/01/2024", "data_final": "02/01/2024"}
+        status, job = await _request(port, "POST", "/jobs/nfse", body)
+        assert status == 201
+        assert job["kind"] == "nfse"
+        assert "params" not in job  # senhas não saem pela API
+
+        status, jobs = await _request(port, "GET", "/jobs?kind=nfse")
+        assert (status, [j["id"] for j in jobs]) == (200, [job["id"]])
+
+        status, same = await _request(port, "GET", f"/jobs/{job['id']}")
+        assert (status, same["id"]) == (200, job["id"])
+
+        status, _ = await _request(port, "POST", f"/jobs/{job['id']}/cancel")
+        assert status == 200
+        assert queue.get(job["id"]).cancel_event.is_set()
+
+    _with_server(scenario)
+
+
+@pytest.mark.parametrize(
+    "method, path, body, expected",
+    [
+        ("POST", "/jobs/nfse", b"{nao e json", 400),
+        ("POST", "/jobs/nfse", [1, 2], 400),
+        ("GET", "/jobs/nfse", None, 405),
+        ("POST", "/jobs", None, 405),
+        ("GET", "/jobs/999", None, 404),
+        ("GET", "/outra", None, 404),
+    ],
+)
+def test_invalid_requests(method, path, body, expected):
+    async def scenario(port, queue):
+        status, payload = await _request(port, method, path, body)
+        assert status == expected
+        assert payload["error"]
+
+    _with_server(scenario)
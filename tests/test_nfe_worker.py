@@ -0,0 +1,35 @@
+"""Testes do NfeWorkerProcess (lado do processo pai)."""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("auto_nfe")
+
+from services.nfe_worker import NfeWorkerProcess  # noqa: E402
+
+
+def make_ctx(job_id: int = 1):
+    return SimpleNamespace(
+        job=SimpleNamespace(id=job_id, params={}),
+        cancel_event=threading.Event(),
+    )
+
+
+def test_run_drops_pending_job_when_send_fails():
+    worker = NfeWorkerProcess()
+
+    async def started():
+        pass
+
+    def broken_send(*message):
+        raise BrokenPipeError("pipe fechado")
+
+    worker._ensure_started = started
+    worker._send = broken_send
+
+    with pytest.raises(BrokenPipeError):
+        asyncio.run(worker.run(make_ctx()))
+    assert worker._pending == {}
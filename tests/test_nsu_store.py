@@ -0,0 +1,63 @@
+"""Testes do NsuStore (upsert da posição e espera após ficar em dia)."""
+
+import pytest
+
+import services.nsu_store as nsu_store
+from services.nsu_store import CAUGHT_UP_WAIT_S, NsuState, NsuStore
+
+
+@pytest.fixture
+def store(tmp_path) -> NsuStore:
+    return NsuStore(str(tmp_path / "nsu.db"))
+
+
+def test_unknown_cnpj_starts_at_zero(store):
+    state = store.get("12345678000199")
+    assert state == NsuState("12345678000199")
+    assert not state.caught_up
+    assert state.next_allowed_at() == 0
+
+
+def test_save_inserts_and_updates(store):
+    store.save("1", "Empresa A", ult_nsu=100, max_nsu=500)
+    store.save("1", "Empresa B", ult_nsu=200, max_nsu=500)
+    state = store.get("1")
+    assert (state.profile, state.ult_nsu, state.max_nsu) == ("Empresa B", 200, 500)
+    assert state.synced_at is not None
+    assert store.get("2").ult_nsu == 0
+
+
+def test_nsu_never_goes_back(store):
+    store.save("1", "A", ult_nsu=300, max_nsu=500)
+    store.save("1", "A", ult_nsu=100, max_nsu=400)
+    state = store.get("1")
+    assert (state.ult_nsu, state.max_nsu) == (300, 500)
+
+
+def test_caught_up_sets_wait(store, monkeypatch):
+    monkeypatch.setattr(nsu_store.time, "time", lambda: 1000.0)
+    store.save("1", "A", ult_nsu=500, max_nsu=500)
+    state = store.get("1")
+    assert state.caught_up
+    assert state.caught_up_at == 1000.0
+    assert state.next_allowed_at() == 1000.0 + CAUGHT_UP_WAIT_S
+
+
+def test_new_documents_clear_wait(store):
+    store.save("1", "A", ult_nsu=500, max_nsu=500)
+    store.save("1", "A", ult_nsu=500, max_nsu=600)
+    state = store.get("1")
+    assert not state.caught_up
+    assert state.caught_up_at is None
+    assert state.next_allowed_at() == 0
+
+
+def test_state_persists_between_instances(tmp_path):
+    path = str(tmp_path / "nsu.db")
+    NsuStore(path).save("1", "A", ult_nsu=42, max_nsu=50)
+    assert NsuStore(path).get("1").ult_nsu == 42
+
+
+def test_summary():
+    assert "Nunca sincronizado" in NsuState("1").summary()
+    assert "Último NSU 42" in NsuState("1", ult_nsu=42, synced_at=0.0).summary()
@@ -0,0 +1,25 @@
+"""Testes do modo "somente faltantes" (diferença entre planilha e pasta)."""
+
+from services.pasta_xml import list_existing_keys, missing_keys
+
+KEY_1 = "35190112345678000199550010000000011000000010"
+KEY_2 = "35190112345678000199550010000000021000000020"
+KEY_3 = "35190112345678000199550010000000031000000030"
+
+
+def test_lists_keys_from_xml_names_recursively(tmp_path):
+    (tmp_path / f"{KEY_1}-nfe.xml").write_text("")
+    (tmp_path / "2019" / "01").mkdir(parents=True)
+    (tmp_path / "2019" / "01" / f"NFe{KEY_2}.XML").write_text("")
+    (tmp_path / f"{KEY_3}.pdf").write_text("")
+    (tmp_path / "sem_chave.xml").write_text("")
+    assert list_existing_keys(str(tmp_path)) == {KEY_1, KEY_2}
+
+
+def test_missing_folder_counts_as_empty(tmp_path):
+    assert list_existing_keys(str(tmp_path / "nao_existe")) == set()
+
+
+def test_missing_keys_preserves_sheet_order(tmp_path):
+    (tmp_path / f"{KEY_2}-nfe.xml").write_text("")
+    assert missing_keys([KEY_3, KEY_2, KEY_1], str(tmp_path)) == [KEY_3, KEY_1]
@@ -0,0 +1,168 @@
+"""Testes da extração de chaves das planilhas e do cache em disco."""
+
+import os
+
+import pytest
+
+import services.planilha_cache as planilha_cache
+from services.planilha_cache import (
+    RelationTemplate,
+    SheetParseError,
+    load_sheet_keys,
+    parse_sheet_keys,
+)
+
+KEY_1 = "35190112345678000199550010000000011000000010"
+KEY_2 = "35190112345678000199550010000000021000000020"
+KEY_3 = "35190112345678000199550010000000031000000030"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setattr(planilha_cache, "SHEET_CACHE_DIR", str(directory))
+    monkeypatch.setattr(planilha_cache, "_memory_cache", {})
+    return directory
+
+
+def write(path, text: str) -> str:
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_reads_only_the_key_column(tmp_path):
+    path = write(
+        tmp_path / "relacao.csv",
+        f"Empresa;Chave de Acesso;Referência\n"
+        f"A;{KEY_1};{KEY_3}\n"
+        f"B;{KEY_2};\n",
+    )
+    assert parse_sheet_keys(path) == [KEY_1, KEY_2]
+
+
+def test_without_header_uses_first_column_with_a_key(tmp_path):
+    path = write(tmp_path / "relacao.txt", f"{KEY_1},{KEY_3}\n{KEY_2},x\n")
+    assert parse_sheet_keys(path) == [KEY_1, KEY_2]
+
+
+def test_accepts_formatted_keys_and_drops_duplicates(tmp_path):
+    formatted = " ".join(KEY_1[i : i + 4] for i in range(0, 44, 4))
+    path = write(tmp_path / "relacao.csv", f"chave\n{formatted}\n{KEY_1}\n{KEY_2}\nxyz\n")
+    assert parse_sheet_keys(path) == [KEY_1, KEY_2]
+
+
+def test_sheet_without_keys(tmp_path):
+    path = write(tmp_path / "relacao.csv", "nome;valor\nA;10\n")
+    assert parse_sheet_keys(path) == []
+
+
+def test_excel_reads_first_sheet_only(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    path = str(tmp_path / "relacao.xlsx")
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"Chave": [KEY_1, KEY_2]}).to_excel(writer, sheet_name="A", index=False)
+        pd.DataFrame({"Chave": [KEY_3]}).to_excel(writer, sheet_name="B", index=False)
+    assert parse_sheet_keys(path) == [KEY_1, KEY_2]
+
+
+def test_missing_sheet_raises(tmp_path):
+    with pytest.raises(SheetParseError):
+        load_sheet_keys(str(tmp_path / "nao_existe.csv"))
+
+
+def test_cache_round_trip(tmp_path, cache_dir, monkeypatch):
+    path = write(tmp_path / "relacao.csv", f"chave\n{KEY_1}\n{KEY_2}\n")
+    assert load_sheet_keys(path) == [KEY_1, KEY_2]
+    assert len(os.listdir(cache_dir)) == 1
+
+    # Nova sessão: as chaves vêm do cache em disco, sem reler a planilha
+    monkeypatch.setattr(planilha_cache, "_memory_cache", {})
+    monkeypatch.setattr(
+        planilha_cache, "parse_sheet_keys", lambda p: pytest.fail("planilha relida")
+    )
+    assert load_sheet_keys(path) == [KEY_1, KEY_2]
+
+
+def test_touched_file_reuses_cache_by_hash(tmp_path, monkeypatch):
+    path = write(tmp_path / "relacao.csv", f"chave\n{KEY_1}\n")
+    load_sheet_keys(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    monkeypatch.setattr(planilha_cache, "_memory_cache", {})
+    monkeypatch.setattr(
+        planilha_cache, "parse_sheet_keys", lambda p: pytest.fail("planilha relida")
+    )
+    assert load_sheet_keys(path) == [KEY_1]
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    path = write(tmp_path / "relacao.csv", f"chave\n{KEY_1}\n")
+    assert load_sheet_keys(path) == [KEY_1]
+    stat = os.stat(path)
+    write(tmp_path / "relacao.csv", f"chave\n{KEY_1}\n{KEY_2}\n")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_sheet_keys(path) == [KEY_1, KEY_2]
+
+
+@pytest.mark.parametrize("cut", [len(planilha_cache._MAGIC) + 2, -5])
+def test_truncated_cache_is_ignored(tmp_path, cache_dir, monkeypatch, cut):
+    path = write(tmp_path / "relacao.csv", f"chave\n{KEY_1}\n{KEY_2}\n")
+    load_sheet_keys(path)
+    (cache_file,) = cache_dir.iterdir()
+    cache_file.write_bytes(cache_file.read_bytes()[:cut])
+
+    # Cache inválido: a planilha é relida e o cache regravado
+    monkeypatch.setattr(planilha_cache, "_memory_cache", {})
+    assert load_sheet_keys(path) == [KEY_1, KEY_2]
+    assert planilha_cache._read_cache(str(cache_file)) is not None
+
+
+def test_excel_keys_stored_as_numbers_are_reported(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    path = str(tmp_path / "relacao.xlsx")
+    pd.DataFrame({"Chave": [KEY_1, float(KEY_2), float(KEY_3)]}).to_excel(
+        path, index=False
+    )
+    with pytest.raises(SheetParseError, match="2 chave"):
+        parse_sheet_keys(path)
+
+
+def test_relation_keeps_layout_with_selected_keys(tmp_path):
+    path = write(
+        tmp_path / "relacao.csv",
+        f"Relação de notas\nEmpresa;Chave;Valor\n"
+        f"A;{KEY_1};10\nB;{KEY_2};20\nC;{KEY_3};30\n",
+    )
+    relation = RelationTemplate(path).write([KEY_3, KEY_1], str(tmp_path / "parcial"))
+
+    assert relation.endswith(".csv")
+    with open(relation, encoding="utf-8") as f:
+        assert f.read().splitlines() == [
+            "Relação de notas",
+            "Empresa;Chave;Valor",
+            f"C;{KEY_3};30",
+            f"A;{KEY_1};10",
+        ]
+    assert parse_sheet_keys(relation) == [KEY_3, KEY_1]
+
+
+def test_relation_from_excel_is_written_as_xlsx(tmp_path):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    path = str(tmp_path / "relacao.xlsx")
+    pd.DataFrame({"Empresa": ["A", "B"], "Chave": [KEY_1, KEY_2]}).to_excel(
+        path, index=False
+    )
+    relation = RelationTemplate(path).write([KEY_2], str(tmp_path / "parcial"))
+
+    assert relation.endswith(".xlsx")
+    assert parse_sheet_keys(relation) == [KEY_2]
+
+
+def test_relation_requires_key_column(tmp_path):
+    path = write(tmp_path / "relacao.csv", "nome;valor\nA;10\n")
+    with pytest.raises(SheetParseError):
+        RelationTemplate(path)
@@ -0,0 +1,189 @@
+"""Testes do RateLimiter (reabastecimento, reserva, consumo e devolução)."""
+
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("auto_nfe")
+
+from auto_nfe import CancelledException  # noqa: E402
+
+import services.nfe_consulta as nfe_consulta  # noqa: E402
+from services.planilha_cache import parse_sheet_keys  # noqa: E402
+from services.rate_limiter import BucketState, RateLimiter  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr("services.rate_limiter.time.time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def limiter(tmp_path, clock) -> RateLimiter:
+    return RateLimiter(str(tmp_path / "baldes.db"), capacity=10, refill_per_hour=3600)
+
+
+def test_new_bucket_starts_full(limiter):
+    state = limiter.state("1")
+    assert state.tokens == 10
+    assert state.available == 10
+
+
+def test_try_acquire_grants_at_most_available(limiter):
+    assert limiter.try_acquire("1", 4) == 4
+    assert limiter.try_acquire("1", 20) == 6
+    assert limiter.try_acquire("1", 1) == 0
+    assert limiter.state("2").available == 10
+
+
+def test_refill_is_proportional_and_capped(limiter, clock):
+    limiter.try_acquire("1", 10)
+    clock[0] += 3  # 3600/h = 1 ficha por segundo
+    assert limiter.state("1").tokens == pytest.approx(3)
+    clock[0] += 100
+    assert limiter.state("1").tokens == 10
+
+
+def test_consume_can_go_negative_down_to_minus_capacity(limiter):
+    limiter.consume("1", 15)
+    assert limiter.state("1").tokens == pytest.approx(-5)
+    limiter.consume("1", 100)
+    assert limiter.state("1").tokens == pytest.approx(-10)
+
+
+def test_refund_is_capped_and_ignores_non_positive(limiter):
+    limiter.try_acquire("1", 5)
+    limiter.refund("1", 0)
+    limiter.refund("1", -3)
+    assert limiter.state("1").tokens == pytest.approx(5)
+    limiter.refund("1", 50)
+    assert limiter.state("1").tokens == 10
+
+
+def test_drain_empties_bucket(limiter):
+    limiter.drain("1")
+    assert limiter.state("1").tokens == 0
+
+
+def test_state_persists_between_instances(tmp_path, clock):
+    path = str(tmp_path / "baldes.db")
+    RateLimiter(path, capacity=10, refill_per_hour=0).try_acquire("1", 7)
+    assert RateLimiter(path, capacity=10, refill_per_hour=0).state("1").tokens == 3
+
+
+def test_wait_for_and_summary():
+    state = BucketState("1", tokens=2.0, capacity=10, refill_per_hour=3600)
+    assert state.wait_for(2) == 0
+    assert state.wait_for(5) == pytest.approx(3.0)
+    assert "espera projetada 00:03" in state.summary(5)
+    assert "sem espera" in state.summary(1)
+
+
+def test_acquire_grants_immediately_when_available(limiter):
+    granted = asyncio.run(limiter.acquire("1", 4, threading.Event(), lambda m: None))
+    assert granted == 4
+    assert limiter.state("1").tokens == pytest.approx(6)
+
+
+def test_acquire_raises_when_cancelled(limiter):
+    limiter.drain("1")
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(CancelledException):
+        asyncio.run(limiter.acquire("1", 4, cancel_event, lambda m: None))
+
+
+class _SheetClient:
+    """Cliente falso: consulta_planilha informa `items` requisições."""
+
+    def __init__(self, items: int):
+        self._items = items
+
+    async def consulta_planilha(self, sheet, folder, callback_progress, **kwargs):
+        for current in range(1, self._items + 1):
+            callback_progress(current, self._items)
+            await asyncio.sleep(0)
+
+
+def test_sheet_query_charges_progress_outside_callbacks(limiter):
+    calls = []
+
+    async def run():
+        await nfe_consulta.consulta_nfe(
+            _SheetClient(4),
+            "planilha.xls",
+            "pasta",
+            limiter=limiter,
+            cnpj="1",
+            callback_progress=lambda current, total: calls.append(current),
+            callback_status=lambda message: None,
+            cancel_event=threading.Event(),
+        )
+
+    asyncio.run(run())
+    assert calls == [1, 2, 3, 4]
+    # 1 ficha reservada antes + 3 descontadas no acerto final
+    assert limiter.state("1").tokens == pytest.approx(6)
+
+
+def test_sheet_query_refunds_unused_reservation(limiter):
+    async def run():
+        await nfe_consulta.consulta_nfe(
+            _SheetClient(0),
+            "planilha.xls",
+            "pasta",
+            limiter=limiter,
+            cnpj="1",
+            callback_progress=lambda current, total: None,
+            callback_status=lambda message: None,
+            cancel_event=threading.Event(),
+        )
+
+    asyncio.run(run())
+    assert limiter.state("1").tokens == 10
+
+
+KEYS = [f"3519011234567800019955001{i:019d}" for i in range(5)]
+
+
+class _RelationClient:
+    """Cliente falso: lê as chaves da planilha recebida e informa cada uma."""
+
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    async def consulta_planilha(self, sheet, folder, callback_progress, **kwargs):
+        keys = parse_sheet_keys(sheet)
+        self.batches.append(keys)
+        for current in range(1, len(keys) + 1):
+            callback_progress(current, len(keys))
+            await asyncio.sleep(0)
+
+
+def test_key_list_is_sent_as_partial_sheets_in_budget_batches(tmp_path, limiter):
+    sheet = tmp_path / "relacao.csv"
+    sheet.write_text("Chave\n" + "\n".join(KEYS) + "\n", encoding="utf-8")
+    limiter.try_acquire("1", 7)  # restam 3 fichas
+    client = _RelationClient()
+    progress = []
+
+    async def run():
+        await nfe_consulta.consulta_nfe(
+            client,
+            str(sheet),
+            "pasta",
+            keys=[KEYS[4], KEYS[0], KEYS[2], KEYS[3]],
+            limiter=limiter,
+            cnpj="1",
+            callback_progress=lambda current, total: progress.append((current, total)),
+            callback_status=lambda message: None,
+            cancel_event=threading.Event(),
+        )
+
+    asyncio.run(run())
+    assert client.batches[0] == [KEYS[4], KEYS[0], KEYS[2]]
+    assert sum(client.batches, []) == [KEYS[4], KEYS[0], KEYS[2], KEYS[3]]
+    assert progress[-1] == (4, 4)
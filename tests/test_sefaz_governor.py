@@ -0,0 +1,137 @@
+"""Testes do RequestGovernor (detecção de limitação, backoff e circuito)."""
+
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("auto_nfe")
+
+from auto_nfe import CancelledException  # noqa: E402
+
+from services.sefaz_governor import RequestGovernor, is_throttling  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "cStat=656",
+        "cStat: 656 - Rejeição: Consumo Indevido",
+        "Consumo indevido, aguarde 1 hora",
+        "HTTP 429",
+        "429 Client Error: Too Many Requests for url",
+        "503 Server Error: Service Unavailable",
+        "status code 503",
+    ],
+)
+def test_throttling_messages(message):
+    assert is_throttling(message)
+
+
+@pytest.mark.parametrize(
+    "message",
+    [None, "", "503 notas baixadas", "Baixando XMLs: 429/656", "nota 656 gravada"],
+)
+def test_ordinary_messages_are_not_throttling(message):
+    assert not is_throttling(message)
+
+
+def test_backoff_delay_has_equal_jitter_and_cap():
+    governor = RequestGovernor(base_delay_s=10.0, max_delay_s=60.0)
+    for attempt in range(6):
+        delay = min(60.0, 10.0 * 2**attempt)
+        for _ in range(20):
+            assert delay / 2 <= governor.backoff_delay(attempt) <= delay
+
+
+def test_circuit_opens_after_threshold():
+    governor = RequestGovernor(circuit_threshold=3, cooldown_s=100.0)
+    governor.record_throttle("1")
+    governor.record_throttle("1")
+    assert governor.remaining_cooldown("1") == 0
+    assert governor.record_throttle("1") == 100.0
+    assert 99.0 < governor.remaining_cooldown("1") <= 100.0
+    assert governor.remaining_cooldown("2") == 0
+
+
+def test_circuit_resets_after_cooldown(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.sefaz_governor.time.time", lambda: now[0])
+    governor = RequestGovernor(base_delay_s=1.0, circuit_threshold=2, cooldown_s=100.0)
+    governor.record_throttle("1")
+    governor.record_throttle("1")
+    assert governor.remaining_cooldown("1") == 100.0
+
+    now[0] += 101.0
+    assert governor.remaining_cooldown("1") == 0
+    # Depois do resfriamento volta ao backoff curto, sem reabrir o circuito
+    assert governor.record_throttle("1") <= 1.0
+    assert governor.remaining_cooldown("1") == 0
+
+
+def test_record_success_closes_circuit():
+    governor = RequestGovernor(circuit_threshold=1, cooldown_s=100.0)
+    governor.record_throttle("1")
+    governor.record_success("1")
+    assert governor.remaining_cooldown("1") == 0
+
+
+def test_run_retries_after_throttle_status():
+    governor = RequestGovernor(base_delay_s=0.01, max_delay_s=0.01)
+    calls = []
+    throttles = []
+
+    async def attempt(stop_event, callback_status):
+        calls.append(stop_event)
+        if len(calls) == 1:
+            callback_status("cStat 656 - Consumo Indevido")
+            assert stop_event.is_set()
+            return None
+        return "ok"
+
+    result = asyncio.run(
+        governor.run(
+            "1",
+            attempt,
+            cancel_event=threading.Event(),
+            on_status=lambda message: None,
+            on_throttle=lambda: throttles.append(1),
+        )
+    )
+    assert result == "ok"
+    assert len(calls) == 2
+    assert throttles == [1]
+    assert governor.remaining_cooldown("1") == 0
+
+
+def test_run_raises_non_throttling_errors():
+    governor = RequestGovernor(base_delay_s=0.01)
+
+    async def attempt(stop_event, callback_status):
+        raise ValueError("certificado inválido")
+
+    with pytest.raises(ValueError):
+        asyncio.run(governor.run("1", attempt, threading.Event(), lambda m: None))
+
+
+def test_run_gives_up_after_max_attempts():
+    governor = RequestGovernor(base_delay_s=0.01, max_delay_s=0.01, max_attempts=2)
+
+    async def attempt(stop_event, callback_status):
+        raise RuntimeError("HTTP 429")
+
+    with pytest.raises(RuntimeError, match="429"):
+        asyncio.run(governor.run("1", attempt, threading.Event(), lambda m: None))
+
+
+def test_wait_is_cancellable():
+    governor = RequestGovernor(circuit_threshold=1, cooldown_s=60.0)
+    governor.record_throttle("1")
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    async def attempt(stop_event, callback_status):
+        return "ok"
+
+    with pytest.raises(CancelledException):
+        asyncio.run(governor.run("1", attempt, cancel_event, lambda m: None))
@@ -0,0 +1,135 @@
+"""Testes do ThroughputEstimator (EWMA, pausas, intervalo de snapshots)."""
+
+import pytest
+
+from services.throughput import ThroughputEstimator, ThroughputSnapshot
+
+
+class FakeClock:
+    """Relógio manual para os testes."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def make_estimator(clock: FakeClock, **kwargs) -> ThroughputEstimator:
+    kwargs.setdefault("min_interval_s", 0.0)
+    return ThroughputEstimator(clock=clock, **kwargs)
+
+
+def test_first_update_has_no_rate(clock):
+    estimator = make_estimator(clock)
+    snapshot = estimator.update(0, 10)
+    assert snapshot.rate_per_min is None
+    assert snapshot.eta_s is None
+    assert snapshot.elapsed_s == 0
+
+
+def test_steady_rate_and_eta(clock):
+    estimator = make_estimator(clock)
+    estimator.update(0, 10)
+    for current in range(1, 5):
+        clock.advance(2.0)
+        snapshot = estimator.update(current, 10)
+    assert snapshot.rate_per_min == pytest.approx(30.0)
+    assert snapshot.eta_s == pytest.approx(12.0)
+    assert snapshot.elapsed_s == pytest.approx(8.0)
+
+
+def test_batch_counts_as_several_steps(clock):
+    estimator = make_estimator(clock, alpha=0.5)
+    estimator.update(0, 100)
+    clock.advance(1.0)
+    estimator.update(1, 100)  # média = 1 s/item
+    clock.advance(6.0)
+    snapshot = estimator.update(4, 100)  # 3 itens de 2 s
+    # 1 - (1 - 0.5) ** 3 = 0.875 do caminho entre 1 s e 2 s
+    assert 60 / snapshot.rate_per_min == pytest.approx(1.875)
+
+
+def test_outlier_is_clipped(clock):
+    estimator = make_estimator(clock, alpha=0.5, outlier_factor=5.0)
+    estimator.update(0, 100)
+    clock.advance(1.0)
+    estimator.update(1, 100)
+    clock.advance(100.0)
+    snapshot = estimator.update(2, 100)
+    # Duração limitada a 5 s: média = 1 + 0.5 * (5 - 1)
+    assert 60 / snapshot.rate_per_min == pytest.approx(3.0)
+
+
+def test_paused_time_is_not_counted(clock):
+    estimator = make_estimator(clock)
+    estimator.update(0, 10)
+    clock.advance(2.0)
+    estimator.update(1, 10)
+
+    paused = estimator.set_paused(True)
+    assert paused.paused
+    assert "pausado" in paused.summary()
+    clock.advance(600.0)
+    resumed = estimator.set_paused(False)
+    assert not resumed.paused
+
+    clock.advance(2.0)
+    snapshot = estimator.update(2, 10)
+    assert snapshot.rate_per_min == pytest.approx(30.0)
+
+
+def test_set_paused_without_change_returns_none(clock):
+    estimator = make_estimator(clock)
+    estimator.update(0, 10)
+    assert estimator.set_paused(False) is None
+    assert estimator.set_paused(True) is not None
+    assert estimator.set_paused(True) is None
+
+
+def test_progress_during_pause_does_not_move_base_into_future(clock):
+    estimator = make_estimator(clock)
+    estimator.update(0, 10)
+    clock.advance(2.0)
+    estimator.update(1, 10)
+    estimator.set_paused(True)
+    clock.advance(10.0)
+    estimator.update(2, 10)  # progresso chegou durante a pausa
+    clock.advance(5.0)
+    estimator.set_paused(False)
+    clock.advance(2.0)
+    snapshot = estimator.update(3, 10)
+    assert snapshot.rate_per_min is not None
+    assert snapshot.rate_per_min > 0
+
+
+def test_count_reset_keeps_average(clock):
+    estimator = make_estimator(clock)
+    estimator.update(0, 10)
+    clock.advance(2.0)
+    before = estimator.update(1, 10)
+    clock.advance(50.0)
+    after = estimator.update(0, 10)  # nova tentativa recomeça a contagem
+    assert after.rate_per_min == pytest.approx(before.rate_per_min)
+
+
+def test_snapshots_respect_min_interval(clock):
+    estimator = make_estimator(clock, min_interval_s=1.0)
+    assert estimator.update(0, 10) is not None
+    clock.advance(0.5)
+    assert estimator.update(1, 10) is None
+    clock.advance(0.6)
+    assert estimator.update(2, 10) is not None
+
+
+def test_summary_formatting():
+    snapshot = ThroughputSnapshot(rate_per_min=12.5, eta_s=3725, elapsed_s=65)
+    assert snapshot.summary() == "12,5 itens/min · restante ~01:02:05 · decorrido 01:05"
@@ -0,0 +1,59 @@
+"""Testes do agrupamento de updates de UI (batch_updates / request_update)."""
+
+import pytest
+
+pytest.importorskip("flet")
+
+from components.file_input import FileInput  # noqa: E402
+from utils.ui_batch import batch_updates, update_stats  # noqa: E402
+
+
+class FakePage:
+    """Página mínima: só conta as chamadas de update()."""
+
+    def __init__(self):
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+
+@pytest.fixture
+def page() -> FakePage:
+    update_stats.reset()
+    return FakePage()
+
+
+def make_input(page: FakePage) -> tuple[FileInput, list[int]]:
+    file_input = FileInput(page, "Arquivo")
+    calls = [0]
+
+    def fake_update():
+        calls[0] += 1
+
+    file_input.text_field.update = fake_update
+    return file_input, calls
+
+
+def test_value_setter_outside_batch_updates_immediately(page):
+    file_input, calls = make_input(page)
+    file_input.value = "a.xlsx"
+    assert calls[0] == 1
+    assert page.updates == 0
+
+
+def test_value_setter_inside_batch_flushes_once(page):
+    file_input, calls = make_input(page)
+    other, other_calls = make_input(page)
+
+    with batch_updates(page):
+        file_input.value = "a.xlsx"
+        other.value = "pasta"
+        file_input.value = "b.xlsx"
+
+    assert calls[0] == 0
+    assert other_calls[0] == 0
+    assert page.updates == 1
+    assert update_stats.round_trips == 1
+    assert update_stats.deferred == 3
+    assert file_input.value == "b.xlsx"
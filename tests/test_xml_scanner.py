@@ -0,0 +1,121 @@
+"""Testes da leitura de metadados dos XMLs (busca em bytes e parse completo)."""
+
+import os
+
+from services.xml_scanner import iter_xml_files, parse_document, scan_document, scan_files
+
+KEY = "35190112345678000199550010000000011000000010"
+
+NFE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe"><NFe>'
+    f'<infNFe Id="NFe{KEY}" versao="4.00">'
+    "<ide><mod>55</mod><serie>1</serie><nNF>1</nNF>"
+    "<dhEmi>2024-01-10T10:00:00-03:00</dhEmi></ide>"
+    "<emit><CNPJ>12345678000199</CNPJ><xNome>Tom &amp; Jerry Ltda</xNome>"
+    "<enderEmit><CNPJ>00000000000000</CNPJ></enderEmit></emit>"
+    "<dest><CPF>12345678909</CPF><xNome>Cliente</xNome></dest>"
+    "<total><ICMSTot><vNF>1234.56</vNF></ICMSTot></total>"
+    "</infNFe></NFe></nfeProc>"
+)
+
+EXPECTED = {
+    "chave": KEY,
+    "modelo": "55",
+    "serie": "1",
+    "numero": 1,
+    "emissao": "2024-01-10",
+    "emit_cnpj": "12345678000199",
+    "emit_nome": "Tom & Jerry Ltda",
+    "dest_cnpj": "12345678909",
+    "dest_nome": "Cliente",
+    "valor_total": 1234.56,
+}
+
+
+def test_scan_document_reads_nfe(tmp_path):
+    path = tmp_path / "nota.xml"
+    path.write_text(NFE, encoding="utf-8")
+    assert scan_document(str(path)) == EXPECTED
+
+
+def test_scan_matches_full_parse(tmp_path):
+    path = tmp_path / "nota.xml"
+    path.write_text(NFE, encoding="utf-8")
+    assert parse_document(str(path)) == scan_document(str(path))
+
+
+def test_namespace_prefix_falls_back_to_full_parse(tmp_path):
+    prefixed = (
+        '<n:nfeProc xmlns:n="http://www.portalfiscal.inf.br/nfe"><n:NFe>'
+        f'<n:infNFe Id="NFe{KEY}"><n:ide><n:nNF>7</n:nNF></n:ide>'
+        "<n:emit><n:CNPJ>12345678000199</n:CNPJ></n:emit>"
+        "<n:total><n:ICMSTot><n:vNF>5.00</n:vNF></n:ICMSTot></n:total>"
+        "</n:infNFe></n:NFe></n:nfeProc>"
+    )
+    path = tmp_path / "nota.xml"
+    path.write_text(prefixed, encoding="utf-8")
+    data = scan_document(str(path))
+    assert (data["chave"], data["numero"], data["emit_cnpj"]) == (KEY, 7, "12345678000199")
+    assert data["valor_total"] == 5.0
+
+
+def test_resumo_nfe(tmp_path):
+    path = tmp_path / "resumo.xml"
+    path.write_text(
+        f"<resNFe><chNFe>{KEY}</chNFe><CNPJ>12345678000199</CNPJ>"
+        "<xNome>Fornecedor</xNome><dhEmi>2024-02-01T08:00:00-03:00</dhEmi>"
+        "<vNF>10.00</vNF></resNFe>",
+        encoding="utf-8",
+    )
+    data = scan_document(str(path))
+    assert data["chave"] == KEY
+    assert data["emissao"] == "2024-02-01"
+    assert data["valor_total"] == 10.0
+    assert data["dest_cnpj"] is None
+
+
+def test_non_nfe_files_are_ignored(tmp_path):
+    empty = tmp_path / "vazio.xml"
+    empty.write_bytes(b"")
+    event = tmp_path / "evento.xml"
+    event.write_text("<procEventoNFe><evento/></procEventoNFe>")
+    broken = tmp_path / "quebrado.xml"
+    broken.write_text("<nfeProc><infNFe")
+    assert scan_document(str(empty)) is None
+    assert scan_document(str(event)) is None
+    assert scan_document(str(broken)) is None
+    assert scan_document(str(tmp_path / "nao_existe.xml")) is None
+
+
+def test_iter_xml_files_and_scan_files_in_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.xml_scanner._MIN_FILES_FOR_POOL", 2)
+    monkeypatch.setattr("services.xml_scanner._POOL_CHUNK_SIZE", 2)
+    (tmp_path / "sub").mkdir()
+    for index in range(3):
+        (tmp_path / f"nota{index}.xml").write_text(NFE, encoding="utf-8")
+    (tmp_path / "sub" / "nota.XML").write_text(NFE, encoding="utf-8")
+    (tmp_path / "nota.txt").write_text(NFE, encoding="utf-8")
+
+    assert len(list(iter_xml_files(str(tmp_path), recursive=False))) == 3
+    found = list(iter_xml_files(str(tmp_path)))
+    assert len(found) == 4
+
+    paths = sorted(os.path.join(dirpath, name) for dirpath, name, _ in found)
+    results = list(scan_files(paths, max_workers=2))
+    assert [path for path, _ in results] == paths
+    assert all(data == EXPECTED for _, data in results)
+
+
+def test_scan_files_serial_without_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr("services.xml_scanner._MIN_FILES_FOR_POOL", 2)
+    monkeypatch.setattr("services.xml_scanner.process_pool_available", lambda: False)
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"nota{index}.xml"
+        path.write_text(NFE, encoding="utf-8")
+        paths.append(str(path))
+
+    results = list(scan_files(paths))
+    assert [path for path, _ in results] == paths
+    assert all(data == EXPECTED for _, data in results)